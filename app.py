@@ -1,8 +1,49 @@
-from flask import Flask, request, render_template
-from src.car import Car
-from src.field import Field
+import argparse
+import json
+from collections import deque
+from functools import partial
+from flask import Flask, Response, request, render_template, stream_with_context
+from src.budget import BudgetExceeded, SimulationBudget
+from src.cache import ResultCache, scenario_key
+from src.collisions import format_event
+from src.executor import SimulationExecutor
+from src.field import check_engine
+from src.metrics import Metrics
+from src.offload import Overloaded, SimulationOffloader
+from src.parser import (Part1Scenario, iter_lines, parse_commands, parse_part1, parse_part2, read_json_lines,
+                        read_lines, split_scenarios)
+from src.session import SessionStore, SimulationSession
+from src.simulation import (batch_item_cost, commands_executed, iter_batch_items, iter_part2_collisions,
+                            simulate_batch_item, simulate_part1 as run_simulation_part1,
+                            simulate_part2 as run_simulation_part2)
+from src.trajectory import TrajectoryRecorder
+from src.wire import encode_result, read_scenarios
 
 app = Flask(__name__)
+app.config.from_mapping(
+    SIMULATION_WORKERS=None,  # Worker processes for batch requests (defaults to the number of CPUs)
+    SIMULATION_CHUNK_SIZE=64,  # Scenarios sent to a worker at a time
+    SIMULATION_INLINE_THRESHOLD=100_000,  # Batches with fewer commands than this run in-process
+    RESULT_CACHE_ENABLED=True,  # Reuse the results of repeated Part 1/Part 2 scenarios
+    RESULT_CACHE_MAX_ENTRIES=4096,
+    RESULT_CACHE_MAX_BYTES=64 * 1024 * 1024,
+    SESSION_IDLE_TIMEOUT=600,  # Seconds after which an unused simulation session is evicted
+    SESSION_MAX_SESSIONS=1024,
+    METRICS_ENABLED=False,  # Time the parse/simulate/collision phases and count work for /metrics
+    OFFLOAD_ENABLED=False,  # Run long Part 1/Part 2 simulations on worker processes, with admission control
+    OFFLOAD_WORKERS=None,  # Worker processes for offloaded simulations (defaults to the number of CPUs)
+    OFFLOAD_MAX_QUEUE=16,  # Simulations waiting for a worker before further ones get a 503
+    OFFLOAD_THRESHOLD=100_000,  # Inputs with fewer commands than this are simulated in the request thread
+    # Limits on each simulation, by endpoint: max_seconds, max_commands and max_cars (None or missing: no limit)
+    SIMULATION_BUDGETS={'part1': {}, 'part2': {}, 'part1_batch': {}, 'part2_batch': {}, 'part1_binary': {},
+                        'part2_binary': {}, 'part2_all': {}, 'trajectory': {}, 'sessions': {}},
+)
+
+# Content types whose body is a form with an 'input' field; any other body is read as plain text
+FORM_MIMETYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+# Content types under which batch requests are read as JSON lines instead of text
+JSON_LINES_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
 
 @app.route('/')
 def index():
@@ -17,110 +58,453 @@ def simulate_part1():
     Handle the form submission for Part 1, simulate the car's movements,
     and return the final position and direction.
     """
-    input_data = request.form['input']
-    lines = input_data.strip().split('\n')
-    
-    if len(lines) != 3:
-        return "Error: Please provide exactly 3 lines of input.", 400
+    return run_part1(request_lines())
 
-    try:
-        # Parse field dimensions
-        width, height = map(int, lines[0].split())
-    except ValueError:
-        return "Error: Field dimensions must be integers.", 400
-    
-    try:
-        # Parse initial position and direction
-        x, y, direction = lines[1].split()
-        x, y = int(x), int(y)
-    except ValueError:
-        return "Error: Initial position must be integers.", 400
-    except Exception:
-        return "Error: Invalid initial position or direction format.", 400
+@app.route('/simulate_part2', methods=['POST'])
+def simulate_part2():
+    """
+    Handle the form submission for Part 2, simulate the car's movements,
+    check for collisions, and return the result.
+    With mode=all, stream every collision instead (see collisions_response).
+    """
+    if request.values.get('mode', 'first') == 'all':
+        return collisions_response(request.values.get('policy', 'freeze'), get_budget('part2_all'))
+    return run_part2(request_lines(), request.values.get('engine', 'python'))
+
+@app.route('/simulate_part1/batch', methods=['POST'])
+def simulate_part1_batch():
+    """
+    Simulate many Part 1 scenarios from one request body and stream back one result per scenario.
+    """
+    return batch_response(parse_part1, budget=get_budget('part1_batch'))
 
-    if direction not in ['N', 'E', 'S', 'W']:
-        return "Error: Initial direction must be one of 'N', 'E', 'S', or 'W'.", 400
-    
-    commands = lines[2].strip()
-    if any(c not in 'RLF' for c in commands):
-        return "Error: Commands must be a sequence of 'R', 'L', and 'F' only.", 400
+@app.route('/simulate_part2/batch', methods=['POST'])
+def simulate_part2_batch():
+    """
+    Simulate many Part 2 scenarios from one request body and stream back one result per scenario.
+    """
+    return batch_response(parse_part2, request.args.get('engine', 'python'), get_budget('part2_batch'))
+
+@app.route('/simulate_part1/binary', methods=['POST'])
+def simulate_part1_binary():
+    """
+    Simulate the Part 1 frames of a binary request body and stream back one packed result per frame.
+    """
+    return binary_response(1, budget=get_budget('part1_binary'))
+
+@app.route('/simulate_part2/binary', methods=['POST'])
+def simulate_part2_binary():
+    """
+    Simulate the Part 2 frames of a binary request body and stream back one packed result per frame.
+    """
+    return binary_response(2, request.args.get('engine', 'python'), get_budget('part2_binary'))
+
+@app.route('/simulate_part1/trajectory', methods=['POST'])
+def simulate_part1_trajectory():
+    """
+    Simulate a Part 1 input and stream the car's state after each command as "step x y D" lines.
+    """
+    return trajectory_response(parse_part1, run_simulation_part1, get_budget('trajectory'))
+
+@app.route('/simulate_part2/trajectory', methods=['POST'])
+def simulate_part2_trajectory():
+    """
+    Simulate a Part 2 input and stream each car's state after each of its commands
+    as "id step x y D" lines, up to the first collision.
+    """
+    return trajectory_response(parse_part2, run_simulation_part2, get_budget('trajectory'))
 
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """
+    Start a resumable Part 2 simulation from a Part 2 input and return its state as JSON,
+    including the session identifier to send further commands to.
+    """
     try:
-        # Initialize field and car for Part 1
-        field = Field(width, height)
-        car = Car(x, y, direction)
-        
-        car.execute_commands(commands, field)
+        session = SimulationSession.from_scenario(parse_part2(request_lines()), get_budget('sessions'))
+    except BudgetExceeded as e:
+        return budget_exceeded_response(e, 'sessions')
+    except Exception as e:
+        return f"Error: {str(e)}", 400
+    session_id = get_session_store().add(session)
+    return session_state(session_id, session), 201
 
-        output = car.get_position()
-        return output
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """
+    Return the state of a session as JSON, with every car's current position.
+    """
+    session = get_session_store().get(session_id)
+    if session is None:
+        return f"Error: Unknown session {session_id}.", 404
+    with session.lock:
+        state = session_state(session_id, session)
+        state['cars'] = session.positions()
+    return state
 
+@app.route('/sessions/<session_id>/commands', methods=['POST'])
+def append_session_commands(session_id):
+    """
+    Append commands to the cars of a session, given as "id commands" lines, continue the
+    simulation from where it stopped and return the session's state as JSON.
+    """
+    session = get_session_store().get(session_id)
+    if session is None:
+        return f"Error: Unknown session {session_id}.", 404
+    try:
+        updates = parse_commands(request_lines())
+        with session.lock:
+            session.append_commands(updates, get_budget('sessions'))
+            return session_state(session_id, session)
+    except BudgetExceeded as e:
+        return budget_exceeded_response(e, 'sessions')
     except Exception as e:
         return f"Error: {str(e)}", 400
 
-@app.route('/simulate_part2', methods=['POST'])
-def simulate_part2():
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
     """
-    Handle the form submission for Part 2, simulate the car's movements,
-    check for collisions, and return the result.
+    End a session.
     """
-    input_data = request.form['input']
-    lines = [line.strip() for line in input_data.strip().split('\n') if line.strip()]
+    if not get_session_store().remove(session_id):
+        return f"Error: Unknown session {session_id}.", 404
+    return '', 204
 
-    # Validate that the input has the correct format:
-    # The number of lines must be 3 * number_of_cars + 1 (for the field dimensions line).
-    # There must be at least 2 cars.
-    if len(lines) < 7 or (len(lines) - 1) % 3 != 0:
-        return "Error: Invalid input format. Please provide field size and details for each car.", 400
+def collisions_response(policy, budget=None):
+    """
+    Simulate a Part 2 input through every collision and stream one "ids... x y step" line
+    per collision as it is found, or "no collision". The cars involved in a collision are
+    frozen or removed according to the policy. If the simulation runs out of its budget,
+    the collisions found so far are followed by the partial result.
+    """
+    metrics = get_metrics()
+    try:
+        events = iter_part2_collisions(parse_part2(request_lines()), policy, budget)
+    except Exception as e:
+        return f"Error: {str(e)}", 400
 
-    number_of_cars = (len(lines) - 1) // 3
+    def generate():
+        found = False
+        try:
+            for event in events:
+                found = True
+                yield format_event(event) + '\n'
+        except BudgetExceeded as e:
+            metrics.increment('budget_exceeded_total', endpoint='part2_all', reason=e.reason)
+            yield e.partial_result() + '\n'
+            return
+        if not found:
+            yield "no collision\n"
+
+    return Response(generate(), mimetype='text/plain')
+
+def session_state(session_id, session):
+    """
+    Return the JSON-serializable state of a session.
+    """
+    return {'session': session_id, 'step': session.step, 'result': session.result}
 
-    # Ensure that there are at least two cars
-    if number_of_cars < 2:
-        return "Error: There must be at least two cars provided.", 400
+def request_lines():
+    """
+    Return the lines of the simulation input: the 'input' form field,
+    or the request body read incrementally when it is sent as plain text.
+    """
+    if request.mimetype in FORM_MIMETYPES:
+        return iter_lines(request.form['input'])
+    return read_lines(request.stream)
 
+def trajectory_range():
+    """
+    Read the requested trajectory view from the query string: the 'start' and 'stop' steps
+    and the downsampling interval 'every'. Raises ValueError if they are invalid.
+    """
     try:
-        # Parse field dimensions
-        width, height = map(int, lines[0].split())
+        start = int(request.args.get('start', 0))
+        stop = request.args.get('stop')
+        stop = int(stop) if stop is not None else None
+        every = int(request.args.get('every', 1))
     except ValueError:
-        return "Error: Field dimensions must be integers.", 400
+        raise ValueError("Trajectory range must be integers.")
+    if start < 0 or (stop is not None and stop < 0) or every < 1:
+        raise ValueError("Trajectory start and stop must be non-negative and 'every' at least 1.")
+    return start, stop, every
 
-    cars_with_commands = []
-    for i in range(1, len(lines), 3):
-        if i + 2 >= len(lines):
-            return "Error: Invalid input format. Each car must have an identifier, position, and command sequence.", 400
-        
-        try:
-            car_id = lines[i]
-            position_line = lines[i + 1].split()
+def trajectory_response(parse, simulate, budget=None):
+    """
+    Simulate the request's input with a trajectory recorder and stream the requested
+    range of the recorded trajectories, optionally for a single 'car'.
+    Only the requested steps are expanded from the compact recording.
+    A simulation that runs out of its budget returns its partial result instead.
+    """
+    try:
+        start, stop, every = trajectory_range()
+        scenario = parse(request_lines())
+        recorder = TrajectoryRecorder()
+        simulate(scenario, recorder=recorder, budget=budget)
+    except BudgetExceeded as e:
+        return budget_exceeded_response(e, 'trajectory')
+    except Exception as e:
+        return f"Error: {str(e)}", 400
+
+    tracks = recorder.tracks
+    car = request.args.get('car')
+    if car is not None:
+        if car not in tracks:
+            return f"Error: Unknown car {car}.", 400
+        tracks = {car: tracks[car]}
+
+    def generate():
+        for identifier, track in tracks.items():
+            prefix = f"{identifier} " if identifier is not None else ""
+            for step, x, y, direction in track.states(start, stop, every):
+                yield f"{prefix}{step} {x} {y} {direction}\n"
+
+    return Response(generate(), mimetype='text/plain')
+
+@app.route('/metrics')
+def metrics():
+    """
+    Return the recorded metrics and the result cache statistics in the Prometheus text format.
+    """
+    gauges = {}
+    cache = app.extensions.get('result_cache')
+    if cache is not None:
+        gauges.update((f"result_cache_{name}", value) for name, value in cache.stats().items())
+    offloader = app.extensions.get('simulation_offloader')
+    if offloader is not None:
+        gauges.update((f"offload_{name}", value) for name, value in offloader.stats().items())
+    return Response(get_metrics().render(gauges), mimetype='text/plain; version=0.0.4')
+
+def get_metrics():
+    """
+    Return the metrics shared by all requests, enabled according to METRICS_ENABLED.
+    """
+    metrics = app.extensions.get('metrics')
+    if metrics is None:
+        metrics = app.extensions.setdefault('metrics', Metrics())
+    metrics.enabled = app.config['METRICS_ENABLED']
+    return metrics
+
+def get_session_store():
+    """
+    Return the store of simulation sessions, creating it on first use.
+    """
+    store = app.extensions.get('session_store')
+    if store is None:
+        store = app.extensions.setdefault('session_store', SessionStore(
+            idle_timeout=app.config['SESSION_IDLE_TIMEOUT'],
+            max_sessions=app.config['SESSION_MAX_SESSIONS'],
+        ))
+    return store
+
+def get_executor():
+    """
+    Return the executor shared by all batch requests, creating it on first use.
+    """
+    executor = app.extensions.get('simulation_executor')
+    if executor is None:
+        executor = app.extensions.setdefault('simulation_executor', SimulationExecutor(
+            max_workers=app.config['SIMULATION_WORKERS'],
+            chunk_size=app.config['SIMULATION_CHUNK_SIZE'],
+            inline_threshold=app.config['SIMULATION_INLINE_THRESHOLD'],
+        ))
+    return executor
+
+def get_offloader():
+    """
+    Return the offloader shared by the Part 1/Part 2 requests, creating it on first use,
+    or None when offloading is disabled.
+    """
+    if not app.config['OFFLOAD_ENABLED']:
+        return None
+    offloader = app.extensions.get('simulation_offloader')
+    if offloader is None:
+        offloader = app.extensions.setdefault('simulation_offloader', SimulationOffloader(
+            max_workers=app.config['OFFLOAD_WORKERS'],
+            max_queue=app.config['OFFLOAD_MAX_QUEUE'],
+        ))
+    return offloader
+
+def get_budget(endpoint):
+    """
+    Return the SimulationBudget configured for an endpoint in SIMULATION_BUDGETS,
+    or None when it has no limits.
+    """
+    limits = {name: limit for name, limit in app.config['SIMULATION_BUDGETS'].get(endpoint, {}).items()
+              if limit is not None}
+    return SimulationBudget(**limits) if limits else None
+
+def get_result_cache():
+    """
+    Return the result cache shared by all requests, creating it on first use,
+    or None when caching is disabled.
+    """
+    if not app.config['RESULT_CACHE_ENABLED']:
+        return None
+    cache = app.extensions.get('result_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('result_cache', ResultCache(
+            max_entries=app.config['RESULT_CACHE_MAX_ENTRIES'],
+            max_bytes=app.config['RESULT_CACHE_MAX_BYTES'],
+        ))
+    return cache
+
+def cached_simulation(simulate, scenario, *args):
+    """
+    Return simulate(scenario, *args), reusing the result of an identical earlier scenario if cached.
+    The arguments (such as the engine) are not part of the cache key, so they must not change the result.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return simulate(scenario, *args)
+
+    key = scenario_key(scenario)
+    output = cache.get(key)
+    if output is None:
+        output = simulate(scenario, *args)
+        cache.put(key, output)
+    return output
+
+def offloaded_simulation(simulate, scenario, *args, metrics=None, budget=None):
+    """
+    Return simulate(scenario, *args, metrics=metrics, budget=budget). Inputs of at least
+    OFFLOAD_THRESHOLD commands are simulated on the offloader when offloading is enabled, so the
+    request thread only waits for them; their executed commands are counted here, but not their
+    collision checks. Raises Overloaded if the offloader refuses the simulation.
+    """
+    offloader = get_offloader()
+    if offloader is None or batch_item_cost((scenario, None)) < app.config['OFFLOAD_THRESHOLD']:
+        return simulate(scenario, *args, metrics=metrics, budget=budget)
 
-            # Ensure the position line has exactly 3 parts: x, y, and direction
-            if len(position_line) != 3:
-                return f"Error: Invalid position format for car {car_id}.", 400
+    output = offloader.run(partial(simulate, budget=budget), scenario, *args)
+    if metrics is not None:
+        if isinstance(scenario, Part1Scenario):
+            metrics.increment('commands_executed_total', len(scenario.commands))
+        else:
+            metrics.increment('commands_executed_total',
+                              commands_executed([commands for *_, commands in scenario.cars], output))
+    return output
 
-            x, y, direction = position_line
-            x, y = int(x), int(y)
-            commands = lines[i + 2].strip()
+def budget_exceeded_response(error, endpoint):
+    """
+    Return the partial result of a simulation that ran out of its budget, counting it for the endpoint.
+    """
+    get_metrics().increment('budget_exceeded_total', endpoint=endpoint, reason=error.reason)
+    return error.partial_result(), 200
+
+def overloaded_response(error):
+    """
+    Return the 503 response for a simulation refused by the offloader.
+    """
+    return f"Error: {str(error)}", 503, {'Retry-After': '1'}
+
+def batch_response(parse, default_engine='python', budget=None):
+    """
+    Build a streamed JSON lines response with one record per scenario in the request body.
+
+    The body is either JSON lines (one {"input": ...} object per line, with an optional "id")
+    or Part 1/Part 2 text inputs separated by '---' lines, sent as plain text or in the 'input'
+    form field. Each record carries the scenario's
+    index and either its "result" or its "error", so one bad scenario does not fail the batch.
+    Scenarios are parsed as the body is read and simulated in chunks on the shared executor,
+    each within the budget if one is given.
+    """
+    lines = request_lines()
+    if request.mimetype in JSON_LINES_MIMETYPES:
+        scenarios = read_json_lines(lines)
+    else:
+        scenarios = ({'input': scenario_lines} for scenario_lines in split_scenarios(lines))
 
-            if direction not in ['N', 'E', 'S', 'W']:
-                return f"Error: Invalid direction for car {car_id}. Must be one of 'N', 'E', 'S', 'W'.", 400
+    records = deque()
+    items = iter_batch_items(scenarios, parse, default_engine, records)
+    simulate = simulate_batch_item if budget is None else partial(simulate_batch_item, budget=budget)
 
-            if any(c not in 'RLF' for c in commands):
-                return f"Error: Invalid commands for car {car_id}. Must be 'R', 'L', 'F' only.", 400
+    def generate():
+        for outcome, output in get_executor().imap(simulate, items, cost=batch_item_cost):
+            record = records.popleft()
+            record[outcome] = output
+            yield json.dumps(record) + '\n'
 
-            car = Car(x, y, direction, car_id)
-            cars_with_commands.append((car, commands))
-        except ValueError:
-            return f"Error: Invalid position or command format for car {car_id}.", 400
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
+def binary_response(part, default_engine='python', budget=None):
+    """
+    Build a streamed binary response with one result record per scenario frame in the request body
+    (see src/wire.py). Frames are decoded as the body is read and simulated in chunks on the
+    shared executor, each within the budget if one is given.
+    """
+    scenarios = deque()
+
+    def items():
+        for scenario in read_scenarios(request.stream, part):
+            scenarios.append(scenario)
+            yield scenario, default_engine
+
+    simulate = simulate_batch_item if budget is None else partial(simulate_batch_item, budget=budget)
+
+    def generate():
+        for outcome, output in get_executor().imap(simulate, items(), cost=batch_item_cost):
+            yield encode_result(scenarios.popleft(), outcome, output)
+
+    return Response(stream_with_context(generate()), mimetype='application/octet-stream')
+
+def run_part1(lines):
+    """
+    Parse and simulate a Part 1 input (a string or an iterable of lines)
+    and return a (response body, status code) pair.
+    """
+    metrics = get_metrics()
+    metrics.increment('requests_total', endpoint='part1')
     try:
-        # Initialize the field and simulate Part 2
-        field = Field(width, height)
-        result = field.simulate_multiple_cars(cars_with_commands)
-        return result
+        with metrics.timer('parse_seconds', endpoint='part1'):
+            scenario = parse_part1(lines)
+        simulate = partial(offloaded_simulation, run_simulation_part1,
+                           metrics=metrics if metrics.enabled else None, budget=get_budget('part1'))
+        with metrics.timer('simulate_seconds', endpoint='part1'):
+            return cached_simulation(simulate, scenario), 200
+    except BudgetExceeded as e:
+        return budget_exceeded_response(e, 'part1')
+    except Overloaded as e:
+        metrics.increment('requests_rejected_total', endpoint='part1')
+        return overloaded_response(e)
+    except Exception as e:
+        return f"Error: {str(e)}", 400
 
+def run_part2(lines, engine='python'):
+    """
+    Parse and simulate a Part 2 input (a string or an iterable of lines)
+    and return a (response body, status code) pair.
+    """
+    metrics = get_metrics()
+    metrics.increment('requests_total', endpoint='part2')
+    try:
+        with metrics.timer('parse_seconds', endpoint='part2'):
+            scenario = parse_part2(lines)
+        metrics.observe('cars_per_request', len(scenario.cars))
+        # Checked before the result cache, which is shared by the engines, so an unknown engine is
+        # refused even for a cached scenario
+        check_engine(engine)
+        budget = get_budget('part2')
+        if budget is not None:
+            # Checked before the result cache, so the cars limit applies to repeated inputs too
+            budget.check_cars(len(scenario.cars))
+        simulate = partial(offloaded_simulation, run_simulation_part2,
+                           metrics=metrics if metrics.enabled else None, budget=budget)
+        with metrics.timer('simulate_seconds', endpoint='part2'):
+            return cached_simulation(simulate, scenario, engine), 200
+    except BudgetExceeded as e:
+        return budget_exceeded_response(e, 'part2')
+    except Overloaded as e:
+        metrics.increment('requests_rejected_total', endpoint='part2')
+        return overloaded_response(e)
     except Exception as e:
         return f"Error: {str(e)}", 400
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Auto Driving Car Simulator development server.")
+    parser.add_argument('--offload', action='store_true',
+                        help="Simulate long inputs on worker processes and refuse them with a 503 when overloaded.")
+    args = parser.parse_args()
+    if args.offload:
+        app.config['OFFLOAD_ENABLED'] = True
+    app.run(debug=True, threaded=True)
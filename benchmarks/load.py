@@ -0,0 +1,300 @@
+"""
+Load generator for the Flask endpoints.
+
+Usage:
+    python -m benchmarks.load [--transport client|server] [--concurrency N] [--requests N]
+                              [--mix NAME=WEIGHT ...] [--quick] [--cache]
+                              [--output results.json] [--compare baseline.json] [--tolerance 0.25]
+
+Requests are drawn from a weighted mix of request shapes built with the benchmark scenario
+generators, in a seeded order, and sent by --concurrency threads. With --transport client they
+go through Flask's test client; with --transport server, over HTTP to the app served by an
+in-process WSGI server. The report gives, for each request shape and each endpoint, the
+throughput, p50/p95/p99 latency and error rate. --output stores it as a JSON baseline;
+--compare flags shapes and endpoints whose median latency regressed beyond the tolerance
+and exits with status 1 if any did. It refuses a baseline recorded with other settings
+(see COMPARED_SETTINGS), and warns when it was recorded on another platform.
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+from benchmarks.run import compare, percentile
+from benchmarks.scenarios import fleet_scenario, format_part1, format_part2, single_car_scenario
+
+
+# A request shape: build(seed, scale) returns the text input of one request to the endpoint
+RequestShape = namedtuple('RequestShape', ['name', 'endpoint', 'build'])
+
+REQUEST_SHAPES = [
+    RequestShape('part1_short', '/simulate_part1',
+                 lambda seed, scale: format_part1(single_car_scenario(seed, 100, 100, 'random'))),
+    RequestShape('part1_long', '/simulate_part1',
+                 lambda seed, scale: format_part1(single_car_scenario(seed, 1000, int(100_000 * scale), 'forward'))),
+    RequestShape('part2_pair', '/simulate_part2',
+                 lambda seed, scale: format_part2(fleet_scenario(seed, 100, 2, 50))),
+    RequestShape('part2_fleet', '/simulate_part2',
+                 lambda seed, scale: format_part2(fleet_scenario(seed, 100_000, int(200 * scale), int(200 * scale)))),
+    RequestShape('part2_crowd', '/simulate_part2',
+                 lambda seed, scale: format_part2(fleet_scenario(seed, 1000, int(100 * scale), 100, 'crowd'))),
+]
+
+# Default request mix: mostly small requests, with a few large ones
+DEFAULT_MIX = {'part1_short': 10, 'part1_long': 1, 'part2_pair': 10, 'part2_fleet': 1, 'part2_crowd': 2}
+
+# Number of distinct seeded inputs generated for each request shape
+INPUTS_PER_SHAPE = 8
+
+# Settings of a run that a baseline must share to be compared with it
+COMPARED_SETTINGS = ('quick', 'mix', 'transport', 'concurrency', 'cache')
+
+
+def parse_mix(values):
+    """
+    Parses NAME=WEIGHT strings into a request mix. Raises ValueError if one is invalid.
+    """
+    shapes = {shape.name for shape in REQUEST_SHAPES}
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in shapes:
+            raise ValueError(f"Unknown request shape '{name}'. Must be one of: {', '.join(sorted(shapes))}.")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight for request shape '{name}'.")
+        if mix[name] < 0:
+            raise ValueError(f"Invalid weight for request shape '{name}'.")
+    if not any(mix.values()):
+        raise ValueError("The request mix must have a positive weight.")
+    return mix
+
+
+def build_requests(mix, count, scale, seed=0):
+    """
+    Returns `count` (shape, input) pairs drawn from the mix in a seeded order. Each shape's
+    inputs are generated once and reused, so generation stays out of the timed requests.
+    """
+    rng = random.Random(seed)
+    shapes = [shape for shape in REQUEST_SHAPES if mix.get(shape.name)]
+    inputs = {shape.name: [shape.build(seed * 1000 + number, scale) for number in range(INPUTS_PER_SHAPE)]
+              for shape in shapes}
+    chosen = rng.choices(shapes, weights=[mix[shape.name] for shape in shapes], k=count)
+    return [(shape, rng.choice(inputs[shape.name])) for shape in chosen]
+
+
+class ClientTransport:
+    """
+    Sends requests through Flask's test client, one client per thread.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, endpoint, input_data):
+        """
+        Posts an input as the 'input' form field and returns the status code.
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(endpoint, data={'input': input_data})
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerTransport:
+    """
+    Serves the app on an in-process WSGI server on a free local port and sends requests over HTTP,
+    on one keep-alive connection per thread.
+    """
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.port = self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def post(self, endpoint, input_data):
+        """
+        Posts an input as the 'input' form field and returns the status code.
+        """
+        body = urlencode({'input': input_data})
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection('127.0.0.1', self.port)
+            try:
+                connection.request('POST', endpoint, body, headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the kept-alive connection: retry once on a new one
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+    def close(self):
+        self.server.shutdown()
+        self._thread.join()
+
+
+def run_load(app, requests, concurrency, transport='client'):
+    """
+    Sends the (shape, input) requests from `concurrency` threads and returns
+    (wall-clock seconds, samples), with one (shape name, endpoint, latency, ok) sample per request.
+    """
+    sender = ClientTransport(app) if transport == 'client' else ServerTransport(app)
+    samples = []
+    position = iter(range(len(requests)))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                return
+            shape, input_data = requests[index]
+            start = time.perf_counter()
+            try:
+                ok = sender.post(shape.endpoint, input_data) == 200
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - start
+            with lock:
+                samples.append((shape.name, shape.endpoint, latency, ok))
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        sender.close()
+    return elapsed, samples
+
+
+def summarize(elapsed, samples):
+    """
+    Returns a result record per request shape and per endpoint: request and error counts,
+    error rate, throughput over the whole run and latency percentiles in seconds.
+    """
+    groups = {}
+    for name, endpoint, latency, ok in samples:
+        for key in (name, endpoint):
+            groups.setdefault(key, []).append((latency, ok))
+
+    results = {}
+    for key, group in groups.items():
+        latencies = sorted(latency for latency, _ in group)
+        errors = sum(1 for _, ok in group if not ok)
+        results[key] = {
+            'requests': len(group),
+            'errors': errors,
+            'error_rate': errors / len(group),
+            'requests_per_second': len(group) / elapsed if elapsed else None,
+            'mean': sum(latencies) / len(latencies),
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+        }
+    return results
+
+
+def main(argv=None):
+    """
+    Runs the load generator from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Load test the simulator's endpoints.")
+    parser.add_argument('--transport', choices=('client', 'server'), default='client',
+                        help="Send requests through Flask's test client or over HTTP to an in-process server.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Number of concurrent senders.")
+    parser.add_argument('--requests', type=int, default=500, help="Total number of requests.")
+    parser.add_argument('--mix', nargs='+', metavar='NAME=WEIGHT',
+                        help=f"Request shapes and their weights (default: "
+                             f"{' '.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items())}).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the generated inputs and their order.")
+    parser.add_argument('--quick', action='store_true', help="Use small inputs (for smoke testing).")
+    parser.add_argument('--cache', action='store_true', help="Keep the result cache enabled.")
+    parser.add_argument('--output', help="Save the results as a JSON baseline.")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with a saved JSON baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown of the median before a result is flagged (default 0.25 = 25%%).")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or args.requests < 1:
+        parser.error("Concurrency and requests must be at least 1.")
+    try:
+        mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    except ValueError as e:
+        parser.error(str(e))
+
+    meta = {'python': platform.python_version(), 'platform': platform.platform(), 'quick': args.quick,
+            'transport': args.transport, 'concurrency': args.concurrency, 'requests': args.requests,
+            'mix': mix, 'seed': args.seed, 'cache': args.cache}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        recorded = baseline.get('meta', {})
+        different = [name for name in COMPARED_SETTINGS if recorded.get(name) != meta[name]]
+        if different:
+            parser.error(f"The baseline was recorded with a different {', '.join(different)}; "
+                         "compare runs with the same settings.")
+        if recorded.get('platform') != meta['platform']:
+            print(f"Warning: the baseline was recorded on {recorded.get('platform', 'an unknown platform')}, not "
+                  f"{meta['platform']}; latencies may also differ because of the machine.", file=sys.stderr)
+
+    from app import app
+    app.config['RESULT_CACHE_ENABLED'] = args.cache
+    requests = build_requests(mix, args.requests, 0.1 if args.quick else 1, args.seed)
+    elapsed, samples = run_load(app, requests, args.concurrency, args.transport)
+    results = summarize(elapsed, samples)
+
+    print(f"{'shape / endpoint':<22}{'requests':>10}{'errors':>8}{'req/s':>10}"
+          f"{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+    for key, result in sorted(results.items(), key=lambda item: (item[0].startswith('/'), item[0])):
+        print(f"{key:<22}{result['requests']:>10}{result['error_rate']:>8.1%}{result['requests_per_second']:>10,.1f}"
+              f"{result['p50']:>10.4f}{result['p95']:>10.4f}{result['p99']:>10.4f}")
+    print(f"{len(samples)} requests in {elapsed:.2f}s ({len(samples) / elapsed:,.1f} req/s)")
+
+    report = {'meta': meta, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: p50 {before:.4f}s -> {after:.4f}s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
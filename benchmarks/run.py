@@ -0,0 +1,264 @@
+"""
+Benchmark suite for the simulator.
+
+Usage:
+    python -m benchmarks.run [--quick] [--repeat N] [--only NAME ...]
+                             [--output results.json] [--compare baseline.json] [--tolerance 0.25]
+
+Each case is timed --repeat times on freshly generated (seeded) scenarios. Each timing covers
+as many runs as fill MIN_SAMPLE_SECONDS, so that even small workloads are timed above the timer's
+noise, and is reported per run. The report gives timing percentiles and throughput in commands and
+steps per second. --output stores the report as a JSON baseline; --compare flags cases whose
+median time regressed beyond the tolerance and exits with status 1 if any did, warning when the
+baseline was recorded on another platform. benchmarks/baseline.json is a baseline recorded with
+--quick, to compare quick runs against.
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+from collections import namedtuple
+from benchmarks.scenarios import fleet_scenario, format_part1, format_part2, single_car_scenario
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+
+
+# Shortest time a timing may cover: runs of a case faster than this are timed in batches
+MIN_SAMPLE_SECONDS = 0.05
+
+# A benchmark case: prepare(scale) builds the workload, scaled by a factor, and returns a function
+# running it once that returns the (commands, steps) it simulated
+Benchmark = namedtuple('Benchmark', ['name', 'prepare'])
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of an already sorted list.
+    """
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def collision_steps(output, cars_with_commands):
+    """
+    Returns (commands, steps) actually simulated by a multi-car run, given its output.
+    """
+    lengths = [len(commands) for commands in cars_with_commands]
+    steps = max(lengths) if output == "no collision" else int(output.rsplit('\n', 1)[1])
+    return sum(min(length, steps) for length in lengths), steps
+
+
+def prepare_single_car(run_length, shape):
+    """
+    Returns a prepare function for a single car executing a long command sequence.
+    """
+    def prepare(scale):
+        scenario = single_car_scenario(1, 1000, int(200_000 * scale), shape)
+
+        def run():
+            car = Car(scenario.x, scenario.y, scenario.direction)
+            car.execute_commands(scenario.commands, Field(scenario.width, scenario.height), run_length=run_length)
+            return len(scenario.commands), len(scenario.commands)
+        return run
+    return prepare
+
+
+def prepare_fleet(engine, shape, use_fleet=False):
+    """
+    Returns a prepare function for a multi-car simulation on the given engine.
+    """
+    def prepare(scale):
+        cars, length = (int(1000 * scale), int(500 * scale)) if shape != 'crowd' else (int(300 * scale), int(300 * scale))
+        size = 100_000 if shape != 'crowd' else 1000
+        scenario = fleet_scenario(2, size, cars, length, shape)
+        commands = [commands for *_, commands in scenario.cars]
+
+        def run():
+            cars_with_commands = [(Car(x, y, direction, car_id), commands)
+                                  for car_id, x, y, direction, commands in scenario.cars]
+            if use_fleet:
+                cars_with_commands = CarFleet.from_cars(cars_with_commands)
+            output = Field(scenario.width, scenario.height).simulate_multiple_cars(cars_with_commands, engine=engine)
+            return collision_steps(output, commands)
+        return run
+    return prepare
+
+
+def prepare_check_collision(scale):
+    """
+    Prepares collision checks against a field with many occupied positions.
+    """
+    cars = int(10_000 * scale)
+    field = Field(cars, cars)
+    for number in range(cars):
+        field.occupy_position(f"C{number}", number, number)
+    probes = [Car(number, (number * 7) % cars, 'N', f"P{number}") for number in range(cars)]
+
+    def run():
+        for step, car in enumerate(probes):
+            field.check_collision(car, step)
+        return len(probes), len(probes)
+    return run
+
+
+def prepare_endpoint(endpoint):
+    """
+    Returns a prepare function posting a generated input to a Flask endpoint through the test client.
+    """
+    def prepare(scale):
+        from app import app
+        app.config['RESULT_CACHE_ENABLED'] = False
+        client = app.test_client()
+        if endpoint == '/simulate_part1':
+            scenario = single_car_scenario(3, 1000, int(100_000 * scale), 'forward')
+            input_data = format_part1(scenario)
+            work = (len(scenario.commands), len(scenario.commands))
+        else:
+            scenario = fleet_scenario(4, 100_000, int(200 * scale), int(200 * scale))
+            input_data = format_part2(scenario)
+            work = collision_steps("no collision", [commands for *_, commands in scenario.cars])
+
+        def run():
+            response = client.post(endpoint, data={'input': input_data})
+            if response.status_code != 200:
+                raise RuntimeError(f"{endpoint} returned {response.status_code}: {response.data[:200]!r}")
+            return work
+        return run
+    return prepare
+
+
+BENCHMARKS = [
+    Benchmark('car_execute_commands', prepare_single_car(False, 'random')),
+    Benchmark('car_execute_commands_run_length', prepare_single_car(True, 'forward')),
+    Benchmark('field_python_sparse', prepare_fleet('python', 'random')),
+    Benchmark('field_python_fleet_sparse', prepare_fleet('python', 'random', use_fleet=True)),
+    Benchmark('field_numpy_sparse', prepare_fleet('numpy', 'random')),
+    Benchmark('field_event_sparse', prepare_fleet('event', 'random')),
+    Benchmark('field_event_forward', prepare_fleet('event', 'forward')),
+    Benchmark('field_python_crowd', prepare_fleet('python', 'crowd')),
+    Benchmark('field_numpy_crowd', prepare_fleet('numpy', 'crowd')),
+    Benchmark('field_check_collision', prepare_check_collision),
+    Benchmark('endpoint_part1', prepare_endpoint('/simulate_part1')),
+    Benchmark('endpoint_part2', prepare_endpoint('/simulate_part2')),
+]
+
+
+def run_benchmark(benchmark, repeat, scale):
+    """
+    Times a benchmark case and returns its result record.
+    """
+    run = benchmark.prepare(scale)
+    run()  # Warm up caches and lazy imports outside the timed runs
+    # Time one more run to find how many runs fill a timing
+    start = time.perf_counter()
+    run()
+    loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(time.perf_counter() - start, 1e-9)))
+
+    timings = []
+    commands = steps = 0
+    for _ in range(repeat):
+        gc.collect()  # Start each timing without the garbage left by the previous one
+        start = time.perf_counter()
+        for _ in range(loops):
+            commands, steps = run()
+        timings.append((time.perf_counter() - start) / loops)
+
+    timings.sort()
+    median = percentile(timings, 0.5)
+    return {
+        'repeat': repeat,
+        'loops': loops,
+        'mean': sum(timings) / len(timings),
+        'p50': median,
+        'p90': percentile(timings, 0.9),
+        'p99': percentile(timings, 0.99),
+        'commands': commands,
+        'steps': steps,
+        'commands_per_second': commands / median if median else None,
+        'steps_per_second': steps / median if median else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a baseline report. Returns a list of (name, baseline p50, current p50, ratio)
+    for every case slower than the baseline by more than the tolerance (a fraction, e.g. 0.25).
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or not previous['p50']:
+            continue
+        ratio = result['p50'] / previous['p50']
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous['p50'], result['p50'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmark suite from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the car simulator.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case.")
+    parser.add_argument('--quick', action='store_true', help="Use small workloads (for smoke testing).")
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="Run only the named cases.")
+    parser.add_argument('--output', help="Save the results as a JSON baseline.")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with a saved JSON baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown of the median before a case is flagged (default 0.25 = 25%%).")
+    args = parser.parse_args(argv)
+
+    # Quick mode shrinks every workload to about a tenth of its normal size
+    scale = 0.1 if args.quick else 1
+    benchmarks = BENCHMARKS
+    if args.only:
+        unknown = set(args.only) - {benchmark.name for benchmark in BENCHMARKS}
+        if unknown:
+            parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.name in args.only]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        meta = baseline.get('meta', {})
+        if meta.get('quick', False) != args.quick:
+            parser.error("The baseline was recorded " + ("with" if not args.quick else "without")
+                         + " --quick; compare runs of the same scale.")
+        if meta.get('platform') != platform.platform():
+            print(f"Warning: the baseline was recorded on {meta.get('platform', 'an unknown platform')}, not "
+                  f"{platform.platform()}; timings may also differ because of the machine.", file=sys.stderr)
+
+    results = {}
+    print(f"{'benchmark':<34}{'p50 (s)':>10}{'p90 (s)':>10}{'p99 (s)':>10}{'commands/s':>14}{'steps/s':>14}")
+    for benchmark in benchmarks:
+        result = run_benchmark(benchmark, args.repeat, scale)
+        results[benchmark.name] = result
+        print(f"{benchmark.name:<34}{result['p50']:>10.4f}{result['p90']:>10.4f}{result['p99']:>10.4f}"
+              f"{result['commands_per_second'] or 0:>14,.0f}{result['steps_per_second'] or 0:>14,.0f}")
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'quick': args.quick},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: p50 {before:.4f}s -> {after:.4f}s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import math
+import random
+from src.parser import Part1Scenario, Part2Scenario
+
+
+# Route shapes understood by the generators
+ROUTE_SHAPES = ('random', 'forward', 'crowd')
+
+
+def generate_route(rng, length, shape='random'):
+    """
+    Generates a command sequence of the given length.
+
+    'random': uniformly mixed moves and turns.
+    'forward': long runs of 'F' with occasional turns, like real routes.
+    'crowd': short back-and-forth moves that keep a car near its start.
+    """
+    if shape == 'random':
+        return ''.join(rng.choice('FLR') for _ in range(length))
+    if shape == 'forward':
+        parts = []
+        remaining = length
+        while remaining > 0:
+            run = min(remaining, rng.randint(50, 2000))
+            parts.append('F' * (run - 1) + rng.choice('LR'))
+            remaining -= run
+        return ''.join(parts)[:length]
+    if shape == 'crowd':
+        pieces = []
+        total = 0
+        while total < length:
+            piece = rng.choice(('F', 'F', 'L', 'R', 'RRF', 'LLF'))
+            pieces.append(piece)
+            total += len(piece)
+        return ''.join(pieces)[:length]
+    raise ValueError(f"Unknown route shape '{shape}'. Must be one of: {', '.join(ROUTE_SHAPES)}.")
+
+
+def single_car_scenario(seed, size, length, shape='random'):
+    """
+    Generates a Part 1 scenario on a size x size field.
+    """
+    rng = random.Random(seed)
+    return Part1Scenario(size, size, rng.randrange(size), rng.randrange(size), rng.choice('NESW'),
+                         generate_route(rng, length, shape))
+
+
+def fleet_scenario(seed, size, cars, length, shape='random'):
+    """
+    Generates a Part 2 scenario with the given number of cars on a size x size field.
+    'crowd' scenarios pack the cars into a small area in the middle of the field, where they are likely to collide.
+    Starting positions are distinct whenever the area has room for every car.
+    """
+    rng = random.Random(seed)
+    side = size
+    if shape == 'crowd':
+        side = min(size, max(2, math.ceil(math.sqrt(cars * 4))))
+    low = (size - side) // 2
+
+    if cars <= side * side:
+        cells = rng.sample(range(side * side), cars)
+    else:
+        cells = [rng.randrange(side * side) for _ in range(cars)]
+
+    car_specs = tuple(
+        (f"C{number}", low + cell % side, low + cell // side, rng.choice('NESW'), generate_route(rng, length, shape))
+        for number, cell in enumerate(cells)
+    )
+    return Part2Scenario(size, size, car_specs)
+
+
+def format_part1(scenario):
+    """
+    Formats a Part 1 scenario in the text input format.
+    """
+    return f"{scenario.width} {scenario.height}\n{scenario.x} {scenario.y} {scenario.direction}\n{scenario.commands}"
+
+
+def format_part2(scenario):
+    """
+    Formats a Part 2 scenario in the text input format.
+    """
+    lines = [f"{scenario.width} {scenario.height}"]
+    for car_id, x, y, direction, commands in scenario.cars:
+        lines.extend(('', car_id, f"{x} {y} {direction}", commands))
+    return '\n'.join(lines)
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+# Directions in clockwise order, matching Car.directions
+DIRECTIONS = 'NESW'
+
+# Change in coordinates for each direction code
+DELTA_X = np.array([0, 1, 0, -1], dtype=np.int64)
+DELTA_Y = np.array([1, 0, -1, 0], dtype=np.int64)
+
+# Byte values of the commands in an encoded command matrix; any other byte is ignored
+FORWARD, LEFT, RIGHT = ord('F'), ord('L'), ord('R')
+
+
+def encode_directions(directions):
+    """
+    Converts a sequence of 'N', 'E', 'S', 'W' strings into an array of direction codes.
+    Raises ValueError for an invalid direction.
+    """
+    codes = np.empty(len(directions), dtype=np.int64)
+    for i, direction in enumerate(directions):
+        if direction not in DIRECTIONS or len(direction) != 1:
+            raise ValueError("Invalid direction. Must be 'N', 'E', 'S', or 'W'.")
+        codes[i] = DIRECTIONS.index(direction)
+    return codes
+
+
+def encode_commands(command_strings, length=None):
+    """
+    Packs command strings into a padded uint8 matrix with one row per car.
+    Shorter rows are padded with zeros, which the engine ignores.
+    """
+    if length is None:
+        length = max((len(commands) for commands in command_strings), default=0)
+    matrix = np.zeros((len(command_strings), length), dtype=np.uint8)
+    for row, commands in enumerate(command_strings):
+        encoded = np.frombuffer(commands.encode('ascii'), dtype=np.uint8)
+        matrix[row, :len(encoded)] = encoded[:length]
+    return matrix
+
+
+def simulate_single_cars(widths, heights, xs, ys, directions, commands):
+    """
+    Simulates many independent single-car scenarios at once.
+
+    widths, heights: Field size of each scenario.
+    xs, ys: Starting coordinates of each car.
+    directions: Starting direction of each car, as 'N'/'E'/'S'/'W' strings or direction codes.
+    commands: A padded command matrix (see encode_commands) with one row per car.
+
+    Returns the final position of each car as "x y D" strings, as Car.get_position would.
+    """
+    widths = np.asarray(widths, dtype=np.int64)
+    heights = np.asarray(heights, dtype=np.int64)
+    x = np.array(xs, dtype=np.int64)
+    y = np.array(ys, dtype=np.int64)
+    if len(directions) and isinstance(directions[0], str):
+        heading = encode_directions(directions)
+    else:
+        heading = np.array(directions, dtype=np.int64)
+    commands = np.asarray(commands, dtype=np.uint8)
+
+    if not (len(widths) == len(heights) == len(x) == len(y) == len(heading) == len(commands)):
+        raise ValueError("All scenario arrays must have the same length.")
+    if (widths < 0).any() or (heights < 0).any():
+        raise ValueError("Width and height must be non-negative.")
+    if (x < 0).any() or (y < 0).any():
+        raise ValueError("Coordinates must be non-negative.")
+
+    # Step through the commands column by column, over a contiguous copy
+    for column in np.ascontiguousarray(commands.T):
+        heading = (heading - (column == LEFT) + (column == RIGHT)) % 4
+
+        forward = column == FORWARD
+        new_x = x + DELTA_X[heading]
+        new_y = y + DELTA_Y[heading]
+        move = forward & (new_x >= 0) & (new_x < widths) & (new_y >= 0) & (new_y < heights)
+        x = np.where(move, new_x, x)
+        y = np.where(move, new_y, y)
+
+    direction_names = np.array(list(DIRECTIONS))[heading]
+    return [f"{x_} {y_} {d}" for x_, y_, d in zip(x.tolist(), y.tolist(), direction_names.tolist())]
@@ -0,0 +1,108 @@
+import copy
+import time
+
+
+# Number of commands a single car executes between two budget checks
+CHECK_INTERVAL = 1 << 16
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised when a simulation runs out of its budget. The simulation stops at a step boundary:
+    `step` steps (commands, for a single car) have been fully executed.
+
+    reason: 'time' or 'commands', the limit that was reached.
+    positions: The cars' positions at that step, as get_position(_with_id) strings. Engines raise
+    the exception without them; src.simulation fills them in.
+    state: The (x, y, heading) reached by a program that returns the car's state instead of
+    updating the car (see RepeatedProgram.execute), or None.
+    """
+
+    def __init__(self, reason, step, positions=()):
+        super().__init__(reason, step, tuple(positions))
+        self.reason = reason
+        self.step = step
+        self.positions = tuple(positions)
+        self.state = None
+
+    def __str__(self):
+        return f"Simulation {self.reason} budget exceeded at step {self.step}."
+
+    def partial_result(self):
+        """
+        Returns the partial result: a "budget exceeded" line naming the limit,
+        the step reached, then one position per line.
+        """
+        return '\n'.join([f"budget exceeded: {self.reason}", str(self.step), *self.positions])
+
+
+class SimulationBudget:
+    """
+    Limits on the work of one simulation: wall-clock time, total commands and number of cars.
+    Any limit can be None for no limit.
+
+    The number of cars is checked before simulating. The commands limit is applied by running
+    only as many steps as it allows. The time limit is checked by the engines at step boundaries
+    (see check), once the budget has been started.
+    """
+
+    def __init__(self, max_seconds=None, max_commands=None, max_cars=None, clock=time.monotonic):
+        """
+        max_seconds: Wall-clock time a simulation may take.
+        max_commands: Total number of commands a simulation may execute, over all cars.
+        max_cars: Number of cars a simulation may have.
+        clock: Function returning the current time in seconds.
+        """
+        for name, limit in (('Time', max_seconds), ('Commands', max_commands), ('Cars', max_cars)):
+            if limit is not None and limit < 0:
+                raise ValueError(f"{name} budget must be non-negative.")
+
+        self.max_seconds = max_seconds
+        self.max_commands = max_commands
+        self.max_cars = max_cars
+        self.clock = clock
+        self.deadline = None
+
+    def start(self):
+        """
+        Returns a copy of the budget whose time limit runs from now.
+        """
+        budget = copy.copy(self)
+        if self.max_seconds is not None:
+            budget.deadline = self.clock() + self.max_seconds
+        return budget
+
+    def check(self, step):
+        """
+        Raises BudgetExceeded if the time limit has passed. Called by the engines at step boundaries,
+        with the number of steps fully executed.
+        """
+        if self.deadline is not None and self.clock() > self.deadline:
+            raise BudgetExceeded('time', step)
+
+    def check_cars(self, count):
+        """
+        Raises ValueError if there are more cars than the budget allows.
+        """
+        if self.max_cars is not None and count > self.max_cars:
+            raise ValueError(f"At most {self.max_cars} cars can be simulated.")
+
+    def step_limit(self, lengths):
+        """
+        Returns the number of lockstep steps whose commands fit in the commands limit, for cars
+        with the given numbers of commands, or None if every command fits.
+        """
+        lengths = sorted(lengths)
+        if self.max_commands is None or sum(lengths) <= self.max_commands:
+            return None
+
+        # Each step costs one command per car that still has commands: find the last affordable one
+        remaining = self.max_commands
+        previous = 0
+        for done, length in enumerate(lengths):
+            cars = len(lengths) - done
+            if (length - previous) * cars > remaining:
+                return previous + remaining // cars
+            remaining -= (length - previous) * cars
+            previous = length
+        return previous
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from src.parser import Part1Scenario
+
+
+# Approximate bookkeeping cost of one cache entry in bytes, on top of its key and value
+ENTRY_OVERHEAD = 128
+
+
+def scenario_key(scenario):
+    """
+    Returns a canonical cache key for a parsed Part1Scenario or Part2Scenario. The key is a
+    digest of the scenario's fields, so long command sequences are not kept in memory twice.
+    The engine is not part of the key: every engine gives the same result.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    if isinstance(scenario, Part1Scenario):
+        digest.update(f"part1 {scenario.width} {scenario.height} {scenario.x} {scenario.y} "
+                      f"{scenario.direction}\n".encode())
+        digest.update(str(scenario.commands).encode())
+    else:
+        digest.update(f"part2 {scenario.width} {scenario.height} {len(scenario.cars)}\n".encode())
+        for car_id, x, y, direction, commands in scenario.cars:
+            # Length-prefix the free-form fields so different scenarios never share an encoding
+            digest.update(f"{len(car_id)} {car_id} {x} {y} {direction} {len(commands)}\n".encode())
+            digest.update(commands.encode())
+    return digest.digest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of simulation results, bounded by entry count and total size in bytes.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024):
+        """
+        max_entries: Maximum number of cached results.
+        max_bytes: Maximum approximate size of the cached keys and results.
+        """
+        if max_entries < 0 or max_bytes < 0:
+            raise ValueError("Cache limits must be non-negative.")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (result, size), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Returns the number of cached results.
+        """
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the cached result for the key, or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        """
+        Caches a result, evicting the least recently used results to stay within the limits.
+        Results too large to ever fit are not cached.
+        """
+        size = len(key) + len(result) + ENTRY_OVERHEAD
+        if size > self.max_bytes or self.max_entries == 0:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self.total_bytes += size
+
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes every cached result. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """
+        Returns the cache counters and current size as a dictionary.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+            }
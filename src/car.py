@@ -1,8 +1,30 @@
+import re
+from bisect import bisect_right
+from src.budget import CHECK_INTERVAL, BudgetExceeded
+
+
+# A run of forward moves, or a run of turns (which can be collapsed into one rotation)
+COMMAND_RUNS = re.compile(r'F+|[LR]+')
+
+# Direction codes: the index of each direction in clockwise order
+DIRECTION_CODES = {'N': 0, 'E': 1, 'S': 2, 'W': 3}
+
+# Change in coordinates for each direction code
+DELTAS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+# Direction code after turning left or right, indexed by the current direction code
+TURN_LEFT = (3, 0, 1, 2)
+TURN_RIGHT = (1, 2, 3, 0)
+
+
 class Car:
     """
     Represents the car with position and direction.
+    The direction is stored as an integer code (heading) indexing Car.directions.
     """
 
+    __slots__ = ('x', 'y', 'heading', 'identifier')
+
     # Directions in clockwise order: North, East, South, West
     directions = ['N', 'E', 'S', 'W']
 
@@ -19,66 +41,189 @@ class Car:
         Initializes the car's position, direction, and optionally, an identifier (if used multiple-car simulation).
         Raises ValueError if coordinates are negative or direction is invalid.
         """
+        self.reset(x, y, direction, identifier)
+
+    def reset(self, x, y, direction, identifier=None):
+        """
+        Reinitializes the car's state, as __init__ does, so the car can be reused.
+        Raises ValueError if coordinates are negative or direction is invalid.
+        """
+        self.validate(x, y, direction)
+        
+        self.x = x
+        self.y = y
+        self.heading = DIRECTION_CODES[direction]
+        self.identifier = identifier  # Optional identifier for the car
+        return self
+
+    @classmethod
+    def validate(cls, x, y, direction):
+        """
+        Checks that the coordinates and direction describe a valid car state.
+        Raises ValueError if coordinates are negative or direction is invalid.
+        """
         if not isinstance(x, int) or not isinstance(y, int):
             raise ValueError("Coordinates must be integers.")
         if x < 0 or y < 0:
             raise ValueError("Coordinates must be non-negative.")
+        if direction not in cls.directions:
+            raise ValueError("Invalid direction. Must be 'N', 'E', 'S', or 'W'.")
+
+    @property
+    def direction(self):
+        """
+        The car's direction as 'N', 'E', 'S' or 'W'.
+        """
+        return self.directions[self.heading]
+
+    @direction.setter
+    def direction(self, direction):
         if direction not in self.directions:
             raise ValueError("Invalid direction. Must be 'N', 'E', 'S', or 'W'.")
-        
-        self.x = x
-        self.y = y
-        self.direction = direction
-        self.identifier = identifier  # Optional identifier for the car
+        self.heading = DIRECTION_CODES[direction]
 
     def get_position(self):
         """
         Returns the current coordinates and direction of the car as a string.
         """
-        return f"{self.x} {self.y} {self.direction}"
+        return f"{self.x} {self.y} {self.directions[self.heading]}"
 
     def get_position_with_id(self):
         """
         Returns the current coordinates, direction, and identifier of the car as a string.
         """
         if self.identifier:
-            return f"{self.identifier} {self.x} {self.y} {self.direction}"
+            return f"{self.identifier} {self.x} {self.y} {self.directions[self.heading]}"
         return self.get_position()
 
     def rotate_left(self):
         """
         Rotates the car 90 degrees to the left.
         """
-        current_index = self.directions.index(self.direction)
-        self.direction = self.directions[(current_index - 1) % 4]
+        self.heading = TURN_LEFT[self.heading]
 
     def rotate_right(self):
         """
         Rotates the car 90 degrees to the right.
         """
-        current_index = self.directions.index(self.direction)
-        self.direction = self.directions[(current_index + 1) % 4]
+        self.heading = TURN_RIGHT[self.heading]
+
+    def turn(self, quarter_turns):
+        """
+        Rotates the car by the given number of 90 degree turns to the right
+        (negative values turn left).
+        """
+        self.heading = (self.heading + quarter_turns) % 4
 
     def move_forward(self, field):
         """
-        Moves the car forward by one grid point, if within field boundaries.
-        Boundary checking is delegated to the Field class.
+        Moves the car forward by one grid point, if within field boundaries and not blocked.
+        Boundary and obstacle checking is delegated to the Field class.
         """
-        delta_x, delta_y = self.direction_delta[self.direction]
+        delta_x, delta_y = DELTAS[self.heading]
         potential_x, potential_y = self.x + delta_x, self.y + delta_y
         
-        if field.is_within_bounds(potential_x, potential_y):
+        if field.is_open(potential_x, potential_y):
             self.x, self.y = potential_x, potential_y
 
-    def execute_commands(self, commands, field):
+    def move_forward_steps(self, steps, field):
+        """
+        Moves the car forward by the given number of grid points in one jump,
+        stopping at the field boundary or before an obstacle.
+        """
+        delta_x, delta_y = DELTAS[self.heading]
+        self.x, self.y = field.advance(self.x, self.y, delta_x, delta_y, steps)
+
+    def execute_commands(self, commands, field, run_length=False, recorder=None):
         """
         Executes a sequence of commands to control the car.
         Ignores any invalid commands.
+
+        The commands can also be a CommandProgram (see src/program.py), compiled once and shared
+        by any number of cars; it runs segment by segment whatever the run_length setting.
+
+        With run_length=True, consecutive 'F' commands are applied as a single jump
+        and consecutive turns as a single rotation, so the cost depends on the
+        number of runs rather than the length of the sequence.
+
+        recorder: Optional TrajectoryRecorder that records the car's state after every command
+        (this executes the commands one at a time, still checking the field's budget).
+
+        If the field has a budget (see src/budget.py), long command strings and programs are
+        executed in chunks of CHECK_INTERVAL commands, checking the budget before each (a
+        RepeatedProgram checks it between its iterations). Raises BudgetExceeded with the car
+        left where the last chunk took it.
         """
+        if recorder is not None:
+            self._execute_recorded(commands, field, recorder.track(self))
+            return
+        if field.budget is not None and len(commands) > CHECK_INTERVAL and hasattr(commands, '__getitem__'):
+            self._execute_budgeted(commands, field, run_length)
+            return
+        if not isinstance(commands, str) and hasattr(commands, 'execute'):
+            try:
+                self.x, self.y, self.heading = commands.execute(self.x, self.y, self.heading, field)
+            except BudgetExceeded as e:
+                # A RepeatedProgram ran out of budget part-way: leave the car where it got to
+                if e.state is not None:
+                    self.x, self.y, self.heading = e.state
+                raise
+            return
+        if run_length:
+            self._execute_runs(commands, field)
+            return
+
         for command in commands:
             if command == 'L':
-                self.rotate_left()
+                self.heading = TURN_LEFT[self.heading]
             elif command == 'R':
-                self.rotate_right()
+                self.heading = TURN_RIGHT[self.heading]
             elif command == 'F':
-                self.move_forward(field)
\ No newline at end of file
+                self.move_forward(field)
+
+    def _execute_recorded(self, commands, field, track):
+        """
+        Executes the commands one at a time, recording the state after each one on the track.
+        Checks the field's budget, if any, every CHECK_INTERVAL commands.
+        """
+        budget = field.budget
+        for step, command in enumerate(commands):
+            if budget is not None and not step % CHECK_INTERVAL:
+                budget.check(step)
+            self.execute_commands(command, field)
+            track.record(self.x, self.y, self.heading)
+
+    def _execute_budgeted(self, commands, field, run_length):
+        """
+        Executes the commands (a string or a CommandProgram) in chunks of up to CHECK_INTERVAL commands,
+        checking the field's budget before each one. A CommandProgram runs its own segments a range
+        at a time, so it is never recompiled.
+        """
+        budget = field.budget
+        if isinstance(commands, str):
+            for start in range(0, len(commands), CHECK_INTERVAL):
+                budget.check(start)
+                self.execute_commands(commands[start:start + CHECK_INTERVAL], field, run_length)
+            return
+
+        offsets = commands.segment_offsets
+        count = len(offsets) - 1
+        segment = 0
+        while segment < count:
+            budget.check(offsets[segment])
+            # The segments starting within CHECK_INTERVAL commands (at least one, however long)
+            stop = max(bisect_right(offsets, offsets[segment] + CHECK_INTERVAL, segment + 1, count + 1) - 1,
+                       segment + 1)
+            self.x, self.y, self.heading = commands.execute(self.x, self.y, self.heading, field, segment, stop)
+            segment = stop
+
+    def _execute_runs(self, commands, field):
+        """
+        Executes the commands run by run. Invalid commands split runs but are otherwise ignored.
+        """
+        for run in COMMAND_RUNS.finditer(commands):
+            if commands[run.start()] == 'F':
+                self.move_forward_steps(run.end() - run.start(), field)
+            else:
+                turns = run.group()
+                self.turn(turns.count('R') - turns.count('L'))
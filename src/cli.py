@@ -0,0 +1,120 @@
+"""
+Command-line batch runner: simulates the scenarios of text or JSON lines files without
+the web application, so short batch jobs do not pay for importing Flask (nor the process
+pool, which is only loaded once an input is large enough to need workers).
+
+    python -m src.cli --part 2 scenarios.txt > results.txt
+    cat scenarios.jsonl | python -m src.cli --part 1 --jsonl
+"""
+import argparse
+import json
+import mmap
+import sys
+from collections import deque
+from src.parser import SCENARIO_SEPARATOR, parse_part1, parse_part2, read_json_lines, read_lines, split_scenarios
+from src.simulation import batch_item_cost, iter_batch_items, simulate_batch_item
+
+
+# Size in characters of the output gathered before each write
+OUTPUT_BUFFER = 1 << 20
+
+
+def read_file_lines(path, encoding='utf-8'):
+    """
+    Yields the lines of a file through a read-only memory mapping, decoded one at a time.
+    Lines are only split on '\\n', as the web endpoints split request bodies.
+    """
+    with open(path, 'rb') as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # Empty files cannot be mapped
+    with data:
+        for line in iter(data.readline, b''):
+            yield line.decode(encoding)
+
+
+def iter_scenarios(lines, jsonl):
+    """
+    Yields the {'input': ...} or {'error': ...} dictionary of each scenario in the lines,
+    either JSON lines or text scenarios separated by '---' lines.
+    """
+    if jsonl:
+        return read_json_lines(lines)
+    return ({'input': scenario_lines} for scenario_lines in split_scenarios(lines))
+
+
+def run(lines, output, part=1, jsonl=False, engine='python', executor=None):
+    """
+    Simulates every scenario in the lines and writes the results to the output stream in
+    large writes: JSON lines records for JSON lines input, otherwise one result per scenario
+    separated by '---' lines. Returns the number of scenarios that failed.
+    """
+    parse = parse_part1 if part == 1 else parse_part2
+    if executor is None:
+        from src.executor import SimulationExecutor
+        executor = SimulationExecutor()
+    records = deque()
+    pending = []
+    pending_size = 0
+    failures = 0
+
+    items = iter_batch_items(iter_scenarios(lines, jsonl), parse, engine, records)
+    results = executor.imap(simulate_batch_item, items, cost=batch_item_cost)
+    for number, (outcome, result) in enumerate(results):
+        record = records.popleft()
+        failures += outcome == 'error'
+        if jsonl:
+            record[outcome] = result
+            chunk = json.dumps(record) + '\n'
+        else:
+            chunk = (f"{SCENARIO_SEPARATOR}\n" if number else "") + result + '\n'
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= OUTPUT_BUFFER:
+            output.write(''.join(pending))
+            pending, pending_size = [], 0
+
+    output.write(''.join(pending))
+    output.flush()
+    return failures
+
+
+def main(argv=None):
+    """
+    Runs the batch runner from the command line. Returns 1 if any scenario failed.
+    """
+    parser = argparse.ArgumentParser(description="Simulate car scenarios from files or stdin.")
+    parser.add_argument('files', nargs='*', metavar='FILE', help="Input files ('-' or none for stdin).")
+    parser.add_argument('--part', type=int, choices=(1, 2), default=1, help="Input format: Part 1 or Part 2.")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="Read JSON lines ({\"input\": ...} per line) and write JSON lines records.")
+    parser.add_argument('--engine', default='python', help="Engine for Part 2 scenarios.")
+    parser.add_argument('--workers', type=int, help="Worker processes for large inputs (defaults to the CPUs).")
+    parser.add_argument('--output', '-o', help="Output file (defaults to stdout).")
+    args = parser.parse_args(argv)
+
+    def lines():
+        for number, path in enumerate(args.files or ['-']):
+            if number and not args.jsonl:
+                # Keep the last scenario of a file apart from the first one of the next
+                yield f"{SCENARIO_SEPARATOR}\n"
+            if path == '-':
+                yield from read_lines(sys.stdin.buffer)
+            else:
+                yield from read_file_lines(path)
+
+    from src.executor import SimulationExecutor
+    executor = SimulationExecutor(max_workers=args.workers)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        failures = run(lines(), output, args.part, args.jsonl, args.engine, executor)
+    finally:
+        executor.shutdown()
+        if args.output:
+            output.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
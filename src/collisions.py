@@ -0,0 +1,134 @@
+from collections import namedtuple
+from src.budget import BudgetExceeded
+from src.car import DELTAS, TURN_LEFT, TURN_RIGHT
+from src.fleet import CarFleet
+from src.program import command_string
+
+
+# What happens to the cars involved in a collision: 'freeze' leaves them parked where they collided,
+# 'remove' takes them off the field at the end of the step
+COLLISION_POLICIES = ('freeze', 'remove')
+
+# A collision: the sorted identifiers of every car involved, the grid point and the (1-based) step
+CollisionEvent = namedtuple('CollisionEvent', ['car_ids', 'x', 'y', 'step'])
+
+
+def iter_collisions(field, cars_with_commands, policy='freeze'):
+    """
+    Simulates multiple cars through every collision and yields a CollisionEvent per collision,
+    at the end of the step it happened in.
+
+    Follows the rules of Field.simulate_multiple_cars, but carries on after a collision. The cars
+    involved stop executing commands at once and are then frozen or removed according to the
+    policy. All the cars that meet on a grid point in the same step are reported as one event,
+    including cars already frozen there. Each step only visits the cars still executing commands
+    and looks collisions up in field.position_index, so the cost does not grow with the number
+    of stopped cars. Car identifiers are assumed to be unique.
+
+    cars_with_commands: A list of (Car, commands) tuples, or a CarFleet.
+    policy: One of COLLISION_POLICIES.
+
+    The field's budget is checked at every step boundary; if it runs out, BudgetExceeded is
+    raised with the cars left at the step reached.
+    """
+    if policy not in COLLISION_POLICIES:
+        raise ValueError(f"Unknown collision policy '{policy}'. Must be one of: {', '.join(COLLISION_POLICIES)}.")
+
+    if isinstance(cars_with_commands, CarFleet):
+        return _iter_collisions(field, cars_with_commands, None, policy)
+    fleet = CarFleet.from_cars(cars_with_commands)
+    return _iter_collisions(field, fleet, [car for car, _ in cars_with_commands], policy)
+
+
+def _iter_collisions(field, fleet, cars, policy):
+    """
+    Generator behind iter_collisions, so that invalid arguments are reported on the call.
+    Copies the final states back to the Car objects, if any, once exhausted or out of budget.
+    """
+    identifiers, xs, ys, headings = fleet.identifiers, fleet.xs, fleet.ys, fleet.headings
+    indices = {car_id: index for index, car_id in enumerate(identifiers)}
+    occupied_positions, position_index = field.occupied_positions, field.position_index
+    is_open = field.is_open
+    stopped = bytearray(len(fleet))
+    active = [(index, command_string(commands)) for index, commands in enumerate(fleet.commands) if commands]
+
+    budget = field.budget
+    step = 0
+    while active:
+        if budget is not None:
+            try:
+                budget.check(step)
+            except BudgetExceeded:
+                _copy_states(fleet, cars)
+                raise
+        events = {}  # (x, y) -> identifiers of the cars involved, in order of arrival
+        still_active = []
+        for index, commands in active:
+            if stopped[index]:
+                continue
+            command = commands[step]
+            car_id = identifiers[index]
+            x, y = xs[index], ys[index]
+
+            # Execute the command
+            moved = False
+            if command == 'F':
+                delta_x, delta_y = DELTAS[headings[index]]
+                if is_open(x + delta_x, y + delta_y):
+                    x, y = x + delta_x, y + delta_y
+                    xs[index], ys[index] = x, y
+                    moved = True
+            elif command == 'L':
+                headings[index] = TURN_LEFT[headings[index]]
+            elif command == 'R':
+                headings[index] = TURN_RIGHT[headings[index]]
+
+            if moved or car_id not in occupied_positions:
+                field.release_position(car_id)
+                occupants = position_index.get((x, y))
+                if occupants:
+                    involved = events.get((x, y))
+                    if involved is None:
+                        involved = events[(x, y)] = list(occupants)
+                        for other_car_id in involved:
+                            stopped[indices[other_car_id]] = 1
+                    involved.append(car_id)
+                    stopped[index] = 1
+                field.occupy_position(car_id, x, y)
+
+            if not stopped[index] and step + 1 < len(commands):
+                still_active.append((index, commands))
+
+        active = still_active
+        step += 1
+        for (x, y), involved in events.items():
+            if policy == 'remove':
+                for car_id in involved:
+                    field.release_position(car_id)
+            yield CollisionEvent(tuple(sorted(involved)), x, y, step)
+
+    _copy_states(fleet, cars)
+
+
+def _copy_states(fleet, cars):
+    """
+    Copies the cars' states from the fleet back to the Car objects, if any.
+    """
+    if cars is not None:
+        for index, car in enumerate(cars):
+            car.x, car.y, car.heading = fleet.xs[index], fleet.ys[index], fleet.headings[index]
+
+
+def simulate_all_collisions(field, cars_with_commands, policy='freeze'):
+    """
+    Simulates multiple cars through every collision and returns the list of CollisionEvents.
+    See iter_collisions.
+    """
+    return list(iter_collisions(field, cars_with_commands, policy))
+
+
+def format_event(event):
+    """
+    Formats a collision event as one "ids... x y step" line.
+    """
+    return f"{' '.join(event.car_ids)} {event.x} {event.y} {event.step}"
@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+
+
+class SimulationContext:
+    """
+    The Field, Car and CarFleet of one simulation, kept to be reset and reused by the next one
+    instead of being built anew for every request. Only the objects are reused: emptying the
+    fleet releases its arrays' storage, so a thread never holds on to a large fleet.
+    """
+
+    def __init__(self):
+        """
+        Initializes a context with an empty field, a car and an empty fleet.
+        """
+        self.field = Field(0, 0)
+        self.car = Car(0, 0, 'N')
+        self.fleet = CarFleet()
+        self.in_use = False
+
+    def clear(self):
+        """
+        Drops the state of the last simulation: its cars, their commands and the field's
+        occupied positions, budget and instrumentation.
+        """
+        self.field.reset(0, 0)
+        self.car.reset(0, 0, 'N')
+        self.fleet.clear()
+
+
+_contexts = threading.local()
+
+
+@contextmanager
+def simulation_context():
+    """
+    Lends the calling thread's SimulationContext for one simulation and clears it afterwards,
+    so no state is kept between simulations. A simulation run while the thread's context is
+    already lent (a simulation nested in another) gets a context of its own.
+
+    The field, car and fleet must be reset or filled before use, and must not be kept
+    once the block exits.
+    """
+    context = getattr(_contexts, 'context', None)
+    if context is None:
+        context = _contexts.context = SimulationContext()
+    if context.in_use:
+        context = SimulationContext()
+
+    context.in_use = True
+    try:
+        yield context
+    finally:
+        context.clear()
+        context.in_use = False
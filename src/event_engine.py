@@ -0,0 +1,204 @@
+from bisect import bisect_left, bisect_right, insort
+from math import isqrt
+from src.car import COMMAND_RUNS, DELTAS
+from src.fleet import CarFleet
+from src.program import CommandProgram, command_string
+
+
+# Bounds of the number of steps simulated per window
+MIN_WINDOW = 1
+MAX_WINDOW = 4096
+
+
+def simulate_multiple_cars(field, cars_with_commands):
+    """
+    Time-skipping multi-car simulation for sparse fleets over long horizons.
+
+    Every step a car moves at most one grid point, so two cars d grid points apart
+    (Manhattan distance) cannot meet within (d - 1) // 2 steps. The simulation runs in
+    windows: at the start of each, every moving car gets the first step at which another
+    car could reach it, from the distance to its nearest neighbour. A car keeps that bound
+    for the whole window and is set aside, off field.occupied_positions, until the bound is
+    reached; it is then advanced there at once, run by run (or segment by segment for a
+    CommandProgram whose segments are built), without collision checks, and stepped exactly
+    with Field._simulate_fleet for the rest of the window. The cars are only bucketed once
+    per window; the first window is sized from the spacing of the cars, and it then grows
+    while cars are far apart and shrinks as they get close.
+
+    Returns the same output as Field.simulate_multiple_cars. The cars (or CarFleet) and
+    field.occupied_positions are left as the loop-based engine leaves them, except that
+    after a collision the cars away from it are left as they were at the start of the
+    collision step. Car identifiers are assumed to be unique.
+
+    The field's budget is checked at window boundaries; if it runs out, BudgetExceeded is
+    raised with every car at the step reached.
+    """
+    if isinstance(cars_with_commands, CarFleet):
+        fleet = cars_with_commands
+        cars = None
+    else:
+        fleet = CarFleet.from_cars(cars_with_commands)
+        cars = [car for car, _ in cars_with_commands]
+
+    try:
+        return _simulate(field, fleet)
+    finally:
+        if cars is not None:
+            for index, car in enumerate(cars):
+                car.x, car.y, car.heading = fleet.xs[index], fleet.ys[index], fleet.headings[index]
+
+
+def _simulate(field, fleet):
+    """
+    Runs the windowed simulation on a CarFleet and returns the output.
+    """
+    command_sequences = fleet.commands
+    identifiers = fleet.identifiers
+    max_steps = max(len(commands) for commands in command_sequences)
+
+    # Step 0 places the cars on the field, so it is always stepped exactly
+    first_commands = [(index, commands[:1]) for index, commands in enumerate(command_sequences) if commands]
+    output = field._simulate_fleet(fleet, active=first_commands, first_step=0)
+    if output != "no collision":
+        return output
+
+    occupying = [index for index, _ in first_commands]
+    step = 1
+    window = _initial_window(fleet, occupying)
+    while step < max_steps:
+        if field.budget is not None:
+            field.budget.check(step)
+        window = min(window, max_steps - step)
+        end = step + window
+        moving = [index for index in occupying if len(command_sequences[index]) > step]
+        bounds = _contact_bounds(fleet, occupying, moving, step, 2 * window)
+
+        # Cars that no other car can reach yet are set aside until their bound (or the end of the window)
+        near = [index for index, bound in zip(moving, bounds) if bound <= step]
+        waiting = sorted((min(bound, end), index) for index, bound in zip(moving, bounds) if bound > step)
+        for _, index in waiting:
+            field.release_position(identifiers[index])
+
+        reached = step
+        position = 0
+        while reached < end:
+            until = waiting[position][0] if position < len(waiting) else end
+            if near and until > reached:
+                output = field._simulate_fleet(
+                    fleet, active=[(index, command_sequences[index][reached:until]) for index in near],
+                    first_step=reached,
+                )
+                if output != "no collision":
+                    # The output ends with the (1-based) step of the collision
+                    _advance_cars(field, fleet, [index for _, index in waiting[position:]],
+                                  step, int(output.split()[-1]) - 1)
+                    return output
+            reached = until
+
+            # Bring the cars whose bound is reached up to date, and step them exactly from now on
+            joining = []
+            while position < len(waiting) and waiting[position][0] == reached:
+                joining.append(waiting[position][1])
+                position += 1
+            _advance_cars(field, fleet, joining, step, reached)
+            if reached < end:
+                for index in joining:
+                    insort(near, index)
+
+        # Grow the window while few cars need exact stepping, shrink it when many do
+        step = end
+        if len(near) * 16 <= len(moving):
+            window = min(window * 2, MAX_WINDOW)
+        elif len(near) * 4 > len(moving):
+            window = max(window // 2, MIN_WINDOW)
+
+    return "no collision"
+
+
+def _initial_window(fleet, indices):
+    """
+    Returns a first window suited to the spacing of the given cars: a quarter of the side of
+    the area each car has on average within their bounding box, in rotated coordinates.
+    """
+    xs, ys = fleet.xs, fleet.ys
+    us = [xs[index] + ys[index] for index in indices]
+    vs = [xs[index] - ys[index] for index in indices]
+    area = (max(us) - min(us) + 1) * (max(vs) - min(vs) + 1)
+    return max(MIN_WINDOW, min(isqrt(area // len(indices)) // 4, MAX_WINDOW))
+
+
+def _contact_bounds(fleet, occupying, moving, step, reach):
+    """
+    Returns, for each moving car, the first step at which it could collide: a car whose nearest
+    neighbour on the field is d grid points away cannot meet it before step + (d - 1) // 2.
+    Neighbours farther than `reach` are not looked for, so the bound is at most step + reach // 2.
+
+    Distances are compared in rotated coordinates (x + y, x - y), where the Manhattan distance
+    is the larger coordinate difference, so only cars in neighbouring buckets need checking.
+    """
+    xs, ys = fleet.xs, fleet.ys
+    size = reach + 1
+    rotated = {}
+    buckets = {}
+    for index in occupying:
+        u, v = xs[index] + ys[index], xs[index] - ys[index]
+        rotated[index] = (u, v)
+        buckets.setdefault((u // size, v // size), []).append(index)
+
+    bounds = []
+    for index in moving:
+        u, v = rotated[index]
+        bucket_u, bucket_v = u // size, v // size
+        nearest = size
+        for neighbour_u in (bucket_u - 1, bucket_u, bucket_u + 1):
+            for neighbour_v in (bucket_v - 1, bucket_v, bucket_v + 1):
+                for other in buckets.get((neighbour_u, neighbour_v), ()):
+                    if other != index:
+                        other_u, other_v = rotated[other]
+                        nearest = min(nearest, max(abs(u - other_u), abs(v - other_v)))
+        bounds.append(step + (nearest - 1) // 2)
+    return bounds
+
+
+def _advance_cars(field, fleet, indices, start, stop):
+    """
+    Executes the commands of the given cars from step `start` up to (excluding) `stop`,
+    without collision checks, and occupies their positions.
+    """
+    xs, ys, headings, identifiers = fleet.xs, fleet.ys, fleet.headings, fleet.identifiers
+    for index in indices:
+        commands = fleet.commands[index]
+        x, y, heading = xs[index], ys[index], headings[index]
+        resume = start
+        if isinstance(commands, CommandProgram) and commands.has_segments:
+            # Run the whole segments within the range at once
+            offsets = commands.segment_offsets
+            first, last = bisect_left(offsets, start), bisect_right(offsets, stop) - 1
+            if first < last:
+                x, y, heading = _run_commands(field, commands.commands, x, y, heading, start, offsets[first])
+                x, y, heading = commands.execute(x, y, heading, field, first, last)
+                resume = offsets[last]
+        x, y, heading = _run_commands(field, command_string(commands), x, y, heading, resume, stop)
+        xs[index], ys[index], headings[index] = x, y, heading
+        field.occupy_position(identifiers[index], x, y)
+
+
+def _run_commands(field, commands, x, y, heading, start, stop):
+    """
+    Executes the commands from index `start` up to (excluding) `stop`, run by run,
+    and returns the final (x, y, heading). On a field without obstacles, a run that starts
+    and ends on the field is applied without Field.advance.
+    """
+    width, height = field.width, field.height
+    clear = field.obstacles is None
+    for run in COMMAND_RUNS.findall(commands, start, stop):
+        if run[0] == 'F':
+            delta_x, delta_y = DELTAS[heading]
+            next_x, next_y = x + delta_x * len(run), y + delta_y * len(run)
+            if clear and 0 <= next_x < width and 0 <= next_y < height and 0 <= x < width and 0 <= y < height:
+                x, y = next_x, next_y
+            else:
+                x, y = field.advance(x, y, delta_x, delta_y, len(run))
+        else:
+            heading = (heading + run.count('R') - run.count('L')) % 4
+    return x, y, heading
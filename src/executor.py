@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import deque
+from itertools import islice
+
+
+class SimulationExecutor:
+    """
+    Runs batches of simulations on a reusable pool of worker processes.
+    Small jobs are run in the calling process, where pickling would cost more than the work.
+    """
+
+    def __init__(self, max_workers=None, chunk_size=64, inline_threshold=100_000, mp_context=None):
+        """
+        max_workers: Number of worker processes (defaults to the number of CPUs).
+        chunk_size: Number of items sent to a worker at a time.
+        inline_threshold: Jobs whose total estimated cost is below this are run in-process.
+        mp_context: Optional multiprocessing context used to start the workers.
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.inline_threshold = inline_threshold
+        self.mp_context = mp_context
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def map(self, func, items, cost=None):
+        """
+        Returns [func(item) for item in items], computed in chunks on the worker pool.
+        """
+        return list(self.imap(func, items, cost))
+
+    def imap(self, func, items, cost=None):
+        """
+        Yields func(item) for each item, in input order, as the chunks complete.
+
+        func must be a picklable module-level function. cost, if given, estimates the
+        work of an item (e.g. its number of commands); otherwise every item costs 1.
+        """
+        items = iter(items)
+        chunks = iter(lambda: list(islice(items, self.chunk_size)), [])
+
+        # Look ahead until the job is known to be worth sending to the workers
+        buffered = []
+        total_cost = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            total_cost += sum(map(cost, chunk)) if cost else len(chunk)
+            if total_cost >= self.inline_threshold:
+                break
+        else:
+            for chunk in buffered:
+                yield from _run_chunk(func, chunk)
+            return
+
+        pool = self._get_pool()
+        pending = deque()
+        for chunk in _chain_chunks(buffered, chunks):
+            pending.append(pool.submit(_run_chunk, func, chunk))
+            # Bound the number of chunks in flight, yielding completed chunks in order
+            while len(pending) >= self.max_workers * 2:
+                yield from self._result(pending.popleft())
+        while pending:
+            yield from self._result(pending.popleft())
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker processes. The pool is recreated if the executor is used again.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_pool(self):
+        """
+        Returns the shared worker pool, starting it on first use. The process pool modules are
+        only imported here, so jobs that always run in-process never load them.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+            return self._pool
+
+    def _result(self, future):
+        """
+        Returns the results of a chunk, discarding the pool if a worker died so the next job gets a fresh one.
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self.shutdown(wait=False)
+            raise
+
+
+def _chain_chunks(buffered, chunks):
+    """
+    Yields the look-ahead chunks followed by the remaining ones.
+    """
+    yield from buffered
+    yield from chunks
+
+
+def _run_chunk(func, chunk):
+    """
+    Runs one chunk of items in a worker.
+    """
+    return [func(item) for item in chunk]
@@ -1,21 +1,69 @@
+from src.car import DELTAS, TURN_LEFT, TURN_RIGHT
+from src.fleet import CarFleet
+from src.program import command_string
+
+
+# Engines accepted by Field.simulate_multiple_cars
+ENGINES = ('python', 'numpy', 'event', 'tiled')
+
+# Attributes set on Field instances over their class's (the is_open shortcut and the
+# instrumentation of Metrics.instrument_field), dropped by Field.reset
+INSTANCE_OVERRIDES = ('is_open', 'check_collision_at', 'collision_stats')
+
+
+def check_engine(engine):
+    """
+    Raises ValueError if the engine is not one of ENGINES.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Must be one of: {', '.join(ENGINES)}.")
+
+
 class Field:
     """
     Represents a rectangular field for the car to move within.
     """
 
-    def __init__(self, width, height):
+    def __init__(self, width, height, obstacles=None, budget=None):
         """
         Initializes the field with the given width and height.
         Raises ValueError if width or height is negative or not an integer.
+
+        obstacles: Optional ObstacleMap of the same size. Cars treat a blocked grid point
+        like the field edge.
+        budget: Optional started SimulationBudget (see src/budget.py). The simulations run on the
+        field check it at step boundaries and raise BudgetExceeded once its time is up.
+        """
+        self.occupied_positions = {}  # Dictionary to keep track of occupied positions by car identifiers
+        self.position_index = {}  # Reverse index: (x, y) -> {car identifier: None}, in insertion order
+        self.reset(width, height, obstacles, budget)
+
+    def reset(self, width, height, obstacles=None, budget=None):
+        """
+        Reinitializes the field for a new simulation, as __init__ does, reusing its dictionaries.
+        Every car is removed, and the instrumentation of Metrics.instrument_field is dropped, so
+        nothing carries over from the previous simulation. Attributes added by subclasses are kept.
+        Raises ValueError as __init__ does, leaving the field unchanged.
         """
         if not isinstance(width, int) or not isinstance(height, int):
             raise ValueError("Width and height must be integers.")
         if width < 0 or height < 0:
             raise ValueError("Width and height must be non-negative.")
-        
+        if obstacles is not None and (obstacles.width, obstacles.height) != (width, height):
+            raise ValueError("Obstacle map size must match the field size.")
+
         self.width = width
         self.height = height
-        self.occupied_positions = {}  # Dictionary to keep track of occupied positions by car identifiers
+        self.obstacles = obstacles
+        self.budget = budget
+        self.occupied_positions.clear()
+        self.position_index.clear()
+        for name in INSTANCE_OVERRIDES:
+            self.__dict__.pop(name, None)
+        if obstacles is None:
+            # Without obstacles every grid point on the field is open, so skip the bitmap lookup
+            self.is_open = self.is_within_bounds
+        return self
 
     def is_within_bounds(self, x, y):
         """
@@ -23,35 +71,186 @@ class Field:
         """
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def simulate_multiple_cars(self, cars_with_commands):
+    def is_open(self, x, y):
+        """
+        Checks if a car can drive onto the given (x, y) position: it is within the field
+        boundaries and not blocked by an obstacle.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        index = y * self.width + x
+        return not (self.obstacles.data[index >> 3] >> (index & 7)) & 1
+
+    def advance(self, x, y, delta_x, delta_y, steps):
+        """
+        Returns the position reached by moving up to `steps` grid points from (x, y)
+        along (delta_x, delta_y), stopping at the field boundary or before an obstacle.
+        Matches calling Car.move_forward `steps` times, in constant time on a field without obstacles.
+        """
+        if steps <= 0:
+            return x, y
+
+        if not self.is_within_bounds(x, y):
+            # A position off the field can only change by stepping onto the field
+            if not self.is_open(x + delta_x, y + delta_y):
+                return x, y
+            x, y = x + delta_x, y + delta_y
+            steps -= 1
+
+        if delta_x > 0:
+            steps = min(steps, self.width - 1 - x)
+        elif delta_x < 0:
+            steps = min(steps, x)
+        elif delta_y > 0:
+            steps = min(steps, self.height - 1 - y)
+        else:
+            steps = min(steps, y)
+        if self.obstacles is not None:
+            steps = self.obstacles.open_run(x, y, delta_x, delta_y, steps)
+        return x + delta_x * steps, y + delta_y * steps
+
+    def occupy_position(self, car_id, x, y):
+        """
+        Records that the car with the given identifier occupies (x, y).
+        Keeps occupied_positions and position_index in sync.
+        """
+        self.release_position(car_id)
+        self.occupied_positions[car_id] = (x, y)
+        self.position_index.setdefault((x, y), {})[car_id] = None
+
+    def release_position(self, car_id):
+        """
+        Removes the car with the given identifier from the field, if present.
+        """
+        position = self.occupied_positions.pop(car_id, None)
+        if position is not None:
+            occupants = self.position_index[position]
+            del occupants[car_id]
+            if not occupants:
+                del self.position_index[position]
+
+    def simulate_multiple_cars(self, cars_with_commands, engine='python', recorder=None):
         """
         Simulates the movement of multiple cars and checks for collisions.
         
-        cars_with_commands: A list of tuples, each containing a Car instance and a string of commands.
+        cars_with_commands: A list of tuples, each containing a Car instance and a string of commands
+        (or a CommandProgram from src/program.py), or a CarFleet.
+        engine: 'python' for the loop-based simulation, 'numpy' for the vectorized engine in
+        src/vector_engine.py (suited to large fleets), or 'event' for the time-skipping engine in
+        src/event_engine.py (suited to sparse fleets over long horizons), or 'tiled' for the sharded
+        engine in src/tile_engine.py (suited to very large fleets, across all cores). All give the same result.
+        recorder: Optional TrajectoryRecorder that records every car's state after each of its
+        commands (python engine only).
+
+        Raises BudgetExceeded if the field's budget runs out, with the cars left at the step reached.
         """
+        check_engine(engine)
+        if recorder is not None and engine != 'python':
+            raise ValueError("Trajectory recording requires the python engine.")
+        if engine == 'numpy':
+            from src.vector_engine import simulate_multiple_cars
+            return simulate_multiple_cars(self, cars_with_commands)
+        if engine == 'event':
+            from src.event_engine import simulate_multiple_cars
+            return simulate_multiple_cars(self, cars_with_commands)
+        if engine == 'tiled':
+            from src.tile_engine import simulate_multiple_cars
+            return simulate_multiple_cars(self, cars_with_commands)
+        if isinstance(cars_with_commands, CarFleet):
+            return self._simulate_fleet(cars_with_commands, recorder, budget=self.budget)
+
+        cars_with_commands = [(car, command_string(commands)) for car, commands in cars_with_commands]
         max_steps = max(len(commands) for _, commands in cars_with_commands)
+        tracks = [recorder.track(car) for car, _ in cars_with_commands] if recorder is not None else None
+        budget = self.budget
 
         for step in range(max_steps):
-            for car, commands in cars_with_commands:
+            if budget is not None:
+                budget.check(step)
+            for index, (car, commands) in enumerate(cars_with_commands):
                 if step < len(commands):
                     command = commands[step]
                     
-                    # Capture the car's current position before moving
-                    previous_position = (car.x, car.y)
-                    
-                    # Remove the car's old position from the occupied_positions
-                    self.occupied_positions.pop(car.identifier, None)
+                    # Remove the car's old position from the occupied positions
+                    self.release_position(car.identifier)
                     
                     # Execute the command
                     car.execute_commands(command, self)
+                    if tracks is not None:
+                        tracks[index].record(car.x, car.y, car.heading)
 
                     # Check if the new position collides with any other car's position
                     collision, output = self.check_collision(car, step)
                     if collision:
                         return output
 
-                    # Update the car's new position in the occupied_positions
-                    self.occupied_positions[car.identifier] = (car.x, car.y)
+                    # Update the car's new position in the occupied positions
+                    self.occupy_position(car.identifier, car.x, car.y)
+
+        return "no collision"
+
+    def _simulate_fleet(self, fleet, recorder=None, active=None, first_step=0, budget=None):
+        """
+        Runs the loop-based simulation directly on a CarFleet's arrays, with the same rules and result.
+
+        active: Optional list of (index, commands) pairs, in fleet order, giving the cars to run
+        and their commands. Defaults to every car of the fleet with its own commands.
+        first_step: Step at which the commands start, so a simulation can be resumed where it stopped.
+        budget: Optional started SimulationBudget checked at every step boundary.
+
+        A car that stays on the grid point it already occupies cannot collide there (any other car
+        would have collided on arriving), so its occupied position is left untouched.
+        """
+        identifiers, xs, ys, headings = fleet.identifiers, fleet.xs, fleet.ys, fleet.headings
+        if active is None:
+            active = list(enumerate(fleet.commands))
+        active = [(index, command_string(commands)) for index, commands in active]
+        max_steps = max((len(commands) for _, commands in active), default=0)
+        occupied_positions = self.occupied_positions
+        is_open = self.is_open
+        tracks = None
+        if recorder is not None:
+            tracks = [recorder.start(identifiers[index], xs[index], ys[index], headings[index])
+                      for index in range(len(fleet))]
+
+        for offset in range(max_steps):
+            step = first_step + offset
+            if budget is not None:
+                budget.check(step)
+            for index, commands in active:
+                if offset < len(commands):
+                    command = commands[offset]
+                    car_id = identifiers[index]
+                    x, y = xs[index], ys[index]
+
+                    # Execute the command
+                    moved = False
+                    if command == 'F':
+                        delta_x, delta_y = DELTAS[headings[index]]
+                        if is_open(x + delta_x, y + delta_y):
+                            x, y = x + delta_x, y + delta_y
+                            xs[index], ys[index] = x, y
+                            moved = True
+                    elif command == 'L':
+                        headings[index] = TURN_LEFT[headings[index]]
+                    elif command == 'R':
+                        headings[index] = TURN_RIGHT[headings[index]]
+
+                    if tracks is not None:
+                        tracks[index].record(x, y, headings[index])
+                    if not moved and car_id in occupied_positions:
+                        continue
+
+                    # Remove the car's old position from the occupied positions
+                    self.release_position(car_id)
+
+                    # Check if the new position collides with any other car's position
+                    collision, output = self.check_collision_at(car_id, x, y, step)
+                    if collision:
+                        return output
+
+                    # Update the car's new position in the occupied positions
+                    self.occupy_position(car_id, x, y)
 
         return "no collision"
 
@@ -62,11 +261,19 @@ class Field:
         car: The car that was just moved.
         step: The current step in the simulation.
         """
-        # Check if the car's new position is already occupied by another car
-        for other_car_id, position in self.occupied_positions.items():
-            if position == (car.x, car.y):
-                if other_car_id != car.identifier:
-                    car_ids = sorted([car.identifier, other_car_id])
-                    return True, f"{car_ids[0]} {car_ids[1]}\n{car.x} {car.y}\n{step + 1}"
+        return self.check_collision_at(car.identifier, car.x, car.y, step)
+
+    def check_collision_at(self, car_id, x, y, step):
+        """
+        Checks if a car arriving at (x, y) collides with another car occupying that position.
+        Returns (True, output) for a collision, otherwise (False, None).
+        """
+        # Look up the cars already occupying the new position
+        occupants = self.position_index.get((x, y))
+        if occupants:
+            for other_car_id in occupants:
+                if other_car_id != car_id:
+                    car_ids = sorted([car_id, other_car_id])
+                    return True, f"{car_ids[0]} {car_ids[1]}\n{x} {y}\n{step + 1}"
         
-        return False, None
\ No newline at end of file
+        return False, None
@@ -0,0 +1,84 @@
+from array import array
+from src.car import DIRECTION_CODES, Car
+
+
+class CarFleet:
+    """
+    Stores many cars as flat typed arrays: identifiers, x, y and direction codes,
+    along with each car's command sequence (a string or a CommandProgram). Uses far less memory
+    per car than Car objects.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty fleet.
+        """
+        self.identifiers = []
+        self.xs = array('q')
+        self.ys = array('q')
+        self.headings = array('b')  # Direction codes indexing Car.directions
+        self.commands = []
+
+    @classmethod
+    def from_cars(cls, cars_with_commands):
+        """
+        Builds a fleet from a list of (Car, commands) tuples.
+        """
+        fleet = cls()
+        for car, commands in cars_with_commands:
+            fleet.identifiers.append(car.identifier)
+            fleet.xs.append(car.x)
+            fleet.ys.append(car.y)
+            fleet.headings.append(car.heading)
+            fleet.commands.append(commands)
+        return fleet
+
+    def clear(self):
+        """
+        Removes every car so the fleet object can be reused. The lists and arrays are emptied in
+        place, which releases their storage.
+        """
+        self.identifiers.clear()
+        del self.xs[:], self.ys[:], self.headings[:]
+        self.commands.clear()
+        return self
+
+    def __len__(self):
+        """
+        Returns the number of cars in the fleet.
+        """
+        return len(self.identifiers)
+
+    def add(self, x, y, direction, identifier=None, commands=''):
+        """
+        Adds a car to the fleet.
+        Raises ValueError if coordinates are negative or direction is invalid.
+        """
+        Car.validate(x, y, direction)
+        self.identifiers.append(identifier)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.headings.append(DIRECTION_CODES[direction])
+        self.commands.append(commands)
+
+    def car(self, index):
+        """
+        Returns a Car with the current state of the car at the given index.
+        """
+        return Car(self.xs[index], self.ys[index], Car.directions[self.headings[index]], self.identifiers[index])
+
+    def get_position(self, index):
+        """
+        Returns the coordinates and direction of the car at the given index, as Car.get_position does.
+        """
+        return f"{self.xs[index]} {self.ys[index]} {Car.directions[self.headings[index]]}"
+
+    def get_position_with_id(self, index):
+        """
+        Returns the coordinates, direction, and identifier of the car at the given index,
+        as Car.get_position_with_id does.
+        """
+        identifier = self.identifiers[index]
+        if identifier:
+            return f"{identifier} {self.get_position(index)}"
+        return self.get_position(index)
@@ -0,0 +1,193 @@
+import threading
+import time
+from contextlib import nullcontext
+
+
+# Upper bounds (in seconds) of the histogram buckets used for timings
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Buckets of the histograms that do not record durations, by name
+COUNT_BUCKETS = {
+    'cars_per_request': (1, 2, 5, 10, 100, 1000, 10_000, 100_000),
+}
+
+# Shared no-op context manager returned by Metrics.timer when instrumentation is disabled
+NULL_TIMER = nullcontext()
+
+# Help text of the metrics recorded by the app, by name
+DESCRIPTIONS = {
+    'requests_total': "Simulation requests handled.",
+    'requests_rejected_total': "Simulation requests refused because the offload queue was full.",
+    'budget_exceeded_total': "Simulations stopped because they ran out of their budget.",
+    'parse_seconds': "Time spent parsing simulation inputs.",
+    'simulate_seconds': "Time spent simulating, including collision checks.",
+    'collision_seconds': "Time spent in collision checks.",
+    'collision_checks_total': "Collision checks performed.",
+    'commands_executed_total': "Commands executed by simulated cars.",
+    'cars_per_request': "Number of cars in each simulated input.",
+}
+
+
+class Metrics:
+    """
+    Thread-safe counters and histograms, rendered in the Prometheus text format.
+
+    When disabled, timer() returns a shared no-op context manager and the other methods
+    return immediately, so instrumented code costs close to nothing.
+    """
+
+    def __init__(self, enabled=True, prefix='simulator_', buckets=DEFAULT_BUCKETS):
+        """
+        enabled: Whether measurements are recorded.
+        prefix: Prefix added to every metric name when rendering.
+        buckets: Upper bounds of the histogram buckets.
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket bounds, bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        """
+        Adds value to a counter.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Records a value (such as a duration in seconds) in a histogram.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                buckets = COUNT_BUCKETS.get(name, self.buckets)
+                histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0, 0]
+            for index, bound in enumerate(histogram[0]):
+                if value <= bound:
+                    histogram[1][index] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def timer(self, name, **labels):
+        """
+        Returns a context manager that records the duration of its block in a histogram.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def instrument_field(self, field):
+        """
+        Makes a Field count and time its collision checks. The field's class is untouched,
+        so fields that are not instrumented pay nothing.
+        """
+        if not self.enabled:
+            return field
+        check_collision_at = field.check_collision_at
+        clock = time.perf_counter
+        state = {'checks': 0, 'seconds': 0.0}
+
+        def timed_check_collision_at(car_id, x, y, step):
+            start = clock()
+            result = check_collision_at(car_id, x, y, step)
+            state['seconds'] += clock() - start
+            state['checks'] += 1
+            return result
+
+        field.check_collision_at = timed_check_collision_at
+        field.collision_stats = state
+        return field
+
+    def record_field(self, field):
+        """
+        Records the collision checks counted on an instrumented Field.
+        """
+        state = getattr(field, 'collision_stats', None)
+        if not self.enabled or state is None:
+            return
+        self.increment('collision_checks_total', state['checks'])
+        self.observe('collision_seconds', state['seconds'])
+
+    def render(self, gauges=None):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        gauges: Optional {name: value} of extra current values to include.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {self.prefix}{name} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{self.prefix}{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), (buckets, bucket_counts, total, count) in histograms:
+            header(name, 'histogram')
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                lines.append(f"{self.prefix}{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+            lines.append(f"{self.prefix}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.prefix}{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.prefix}{name}_count{_format_labels(labels)} {count}")
+
+        for name, value in sorted((gauges or {}).items()):
+            header(name, 'gauge')
+            lines.append(f"{self.prefix}{name} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    """
+    Context manager recording the duration of its block.
+    """
+
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def _format_labels(labels):
+    """
+    Formats label pairs as {name="value",...}, escaping the values.
+    """
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    """
+    Escapes a label value for the Prometheus text format.
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
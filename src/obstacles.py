@@ -0,0 +1,130 @@
+import mmap
+
+
+class ObstacleMap:
+    """
+    Blocked grid points of a field, stored as a packed bitmap: one bit per grid point,
+    row by row from y = 0, least significant bit first. Bit y * width + x is set when
+    (x, y) is blocked.
+
+    The bitmap can be any buffer of bytes: a bytearray, or a read-only memory-mapped
+    file, so large maps are never parsed into Python objects.
+    """
+
+    def __init__(self, width, height, data=None):
+        """
+        width, height: Size of the field the map covers.
+        data: Optional buffer holding the packed bitmap. Defaults to a map with no obstacles.
+        Raises ValueError if the buffer is too small for the field.
+        """
+        if not isinstance(width, int) or not isinstance(height, int) or width < 0 or height < 0:
+            raise ValueError("Width and height must be non-negative integers.")
+        size = (width * height + 7) // 8
+        if data is None:
+            data = bytearray(size)
+        elif len(data) < size:
+            raise ValueError(f"Obstacle bitmap must hold at least {size} bytes for a {width}x{height} field.")
+
+        self.width = width
+        self.height = height
+        self.data = data
+
+    @classmethod
+    def from_cells(cls, width, height, cells):
+        """
+        Builds a map with the given (x, y) grid points blocked.
+        """
+        obstacles = cls(width, height)
+        for x, y in cells:
+            obstacles.block(x, y)
+        return obstacles
+
+    @classmethod
+    def from_file(cls, path, width, height):
+        """
+        Memory-maps a file holding a packed bitmap, read-only. Only the pages that are
+        looked at are read from disk. Call close() to release the mapping.
+        """
+        if width * height == 0:
+            return cls(width, height)
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(width, height, data)
+        except ValueError:
+            data.close()
+            raise
+
+    def save(self, path):
+        """
+        Writes the packed bitmap to a file that from_file can map.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.data[:(self.width * self.height + 7) // 8])
+
+    def close(self):
+        """
+        Releases the memory mapping of a map loaded with from_file.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def is_blocked(self, x, y):
+        """
+        Checks if the grid point (x, y), which must be on the field, is blocked.
+        """
+        index = y * self.width + x
+        return (self.data[index >> 3] >> (index & 7)) & 1 == 1
+
+    def block(self, x, y):
+        """
+        Marks the grid point (x, y) as blocked. Raises ValueError if it is off the field.
+        """
+        self._check_bounds(x, y)
+        index = y * self.width + x
+        self.data[index >> 3] |= 1 << (index & 7)
+
+    def unblock(self, x, y):
+        """
+        Marks the grid point (x, y) as open. Raises ValueError if it is off the field.
+        """
+        self._check_bounds(x, y)
+        index = y * self.width + x
+        self.data[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def open_run(self, x, y, delta_x, delta_y, limit):
+        """
+        Returns how many grid points after (x, y) along (delta_x, delta_y) are open in a row,
+        up to `limit`. The grid points must be on the field. Horizontal runs are scanned
+        a whole slice of the row at a time.
+        """
+        if limit <= 0:
+            return 0
+        if delta_y == 0:
+            row = y * self.width
+            if delta_x > 0:
+                bits = self._bits(row + x + 1, limit)
+                return (bits & -bits).bit_length() - 1 if bits else limit
+            bits = self._bits(row + x - limit, limit)
+            return limit - bits.bit_length()
+
+        for run in range(limit):
+            y += delta_y
+            if self.is_blocked(x, y):
+                return run
+        return limit
+
+    def _bits(self, start, count):
+        """
+        Returns bits start to start + count - 1 of the bitmap as an integer, bit `start` lowest.
+        """
+        first, last = start >> 3, (start + count - 1) >> 3
+        value = int.from_bytes(self.data[first:last + 1], 'little') >> (start & 7)
+        return value & ((1 << count) - 1)
+
+    def _check_bounds(self, x, y):
+        """
+        Raises ValueError if (x, y) is off the field.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"Obstacle ({x}, {y}) is outside the field.")
@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class Overloaded(Exception):
+    """
+    Raised when a simulation is refused because the offload queue is full.
+    """
+
+
+class SimulationOffloader:
+    """
+    Runs long simulations of interactive requests on a bounded pool of worker processes,
+    so the threads serving requests only wait on them and stay free (and hold no GIL)
+    to answer small requests.
+
+    Admission control bounds the work in flight: at most max_workers simulations run and
+    max_queue wait for a worker. Any simulation beyond that is refused at once with
+    Overloaded, instead of queueing behind the others.
+    """
+
+    def __init__(self, max_workers=None, max_queue=16, mp_context=None):
+        """
+        max_workers: Number of worker processes (defaults to the number of CPUs).
+        max_queue: Number of simulations allowed to wait for a busy worker.
+        mp_context: Optional multiprocessing context used to start the workers.
+        """
+        if max_queue < 0:
+            raise ValueError("Queue size must be non-negative.")
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.mp_context = mp_context
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def run(self, func, *args):
+        """
+        Returns func(*args), computed in a worker process once admitted.
+        func must be a picklable module-level function (or a partial of one).
+        Raises Overloaded if max_workers + max_queue simulations are already in flight.
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded("The server is busy. Please try again later.")
+            self.in_flight += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+            pool = self._pool
+
+        try:
+            future = pool.submit(func, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Discard the pool so the next simulation gets a fresh one
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def stats(self):
+        """
+        Returns the number of simulations running and waiting, and the number refused so far.
+        """
+        with self._lock:
+            running = min(self.in_flight, self.max_workers)
+            return {'running': running, 'queued': self.in_flight - running, 'rejected_total': self.rejected}
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker processes. The pool is recreated if the offloader is used again.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _release(self, future):
+        """
+        Frees the place of a finished simulation.
+        """
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,342 @@
+import io
+import json
+import re
+import sys
+from collections import namedtuple
+from itertools import chain, dropwhile, groupby
+from src.car import Car
+from src.program import RepeatedProgram, compile_commands
+
+
+# Matches any character that is not a valid command, so a whole sequence is validated in one search
+INVALID_COMMAND = re.compile(r'[^RLF]')
+
+# Matches any character that cannot appear in commands written with repetitions, such as "(FFR)1000"
+INVALID_REPEATED_COMMAND = re.compile(r'[^RLF()0-9]')
+
+# A token of the repetition syntax: plain commands, an opening parenthesis, or a closing one with its count
+REPETITION_TOKEN = re.compile(r'([RLF]+)|(\()|\)([0-9]{1,18})')
+
+# Largest number of commands a repeated command sequence may stand for
+MAX_REPEATED_LENGTH = sys.maxsize
+
+# Deepest nesting of repeated blocks
+MAX_REPETITION_DEPTH = 32
+
+# Largest number of commands a Part 2 car's repetitions may expand to: cars move in lockstep,
+# so their commands are executed (and stored) one by one
+MAX_EXPANDED_COMMANDS = 1 << 20
+
+# Largest number of commands the repetitions of all the cars of a Part 2 input (or of a session
+# update) may expand to together
+MAX_TOTAL_EXPANDED_COMMANDS = 1 << 22
+
+# Line separating scenarios in a text batch
+SCENARIO_SEPARATOR = '---'
+
+# A parsed Part 1 input: field size, the car's starting state and its commands
+# (a string, or a RepeatedProgram for commands written with repetitions)
+Part1Scenario = namedtuple('Part1Scenario', ['width', 'height', 'x', 'y', 'direction', 'commands'])
+
+# A parsed Part 2 input: field size and a tuple of (identifier, x, y, direction, commands) per car
+Part2Scenario = namedtuple('Part2Scenario', ['width', 'height', 'cars'])
+
+
+class InputError(ValueError):
+    """
+    Raised when an input does not follow the expected format.
+    The message is the one reported back to the user.
+    """
+
+
+def iter_lines(text):
+    """
+    Yields the lines of a string (keeping their line breaks) without building a list of lines.
+    """
+    start = 0
+    end = text.find('\n')
+    while end != -1:
+        yield text[start:end + 1]
+        start = end + 1
+        end = text.find('\n', start)
+    if start < len(text):
+        yield text[start:]
+
+
+def read_lines(stream, encoding='utf-8'):
+    """
+    Returns an iterator over the lines of a binary stream, decoded incrementally.
+    Lines are only split on '\\n', as str.split('\\n') would.
+    """
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding=encoding, newline='\n')
+
+
+def is_blank(line):
+    """
+    Checks if a line is empty or contains only whitespace, without copying it.
+    """
+    return not line or line.isspace()
+
+
+def is_separator(line):
+    """
+    Checks if a line is a scenario separator. Long lines are rejected without being copied.
+    """
+    return len(line) <= 64 and line.strip() == SCENARIO_SEPARATOR
+
+
+def parse_part1(lines):
+    """
+    Parses a Part 1 input (a string or an iterable of lines) into a Part1Scenario.
+    Raises InputError if the input is invalid.
+    """
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
+
+    # Keep the first three lines, counting every line between the first and last non-blank ones
+    kept = []
+    line_count = 0
+    blank_run = 0
+    for line in lines:
+        if is_blank(line):
+            if line_count:
+                blank_run += 1
+            continue
+        if blank_run:
+            kept.extend([''] * min(blank_run, max(3 - len(kept), 0)))
+            line_count += blank_run
+            blank_run = 0
+        line_count += 1
+        if len(kept) < 3:
+            kept.append(line)
+
+    if line_count != 3:
+        raise InputError("Please provide exactly 3 lines of input.")
+
+    try:
+        # Parse field dimensions
+        width, height = map(int, kept[0].split())
+    except ValueError:
+        raise InputError("Field dimensions must be integers.")
+
+    try:
+        # Parse initial position and direction
+        x, y, direction = kept[1].split()
+        x, y = int(x), int(y)
+    except ValueError:
+        raise InputError("Initial position must be integers.")
+
+    if direction not in ['N', 'E', 'S', 'W']:
+        raise InputError("Initial direction must be one of 'N', 'E', 'S', or 'W'.")
+
+    commands = kept[2].strip()
+    if INVALID_COMMAND.search(commands):
+        if INVALID_REPEATED_COMMAND.search(commands):
+            raise InputError("Commands must be a sequence of 'R', 'L', and 'F' only.")
+        commands = parse_repetitions(commands)
+
+    return Part1Scenario(width, height, x, y, direction, commands)
+
+
+def parse_part2(lines):
+    """
+    Parses a Part 2 input (a string or an iterable of lines) into a Part2Scenario.
+    Raises InputError if the input is invalid.
+
+    Cars are parsed as their lines arrive. Since the overall format is validated first,
+    the first error found is only raised once the whole input has been read.
+    """
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
+
+    width = height = None
+    cars = []
+    error = None
+    available = MAX_TOTAL_EXPANDED_COMMANDS
+    line_count = 0
+    car_lines = []
+
+    for line in lines:
+        if is_blank(line):
+            continue
+        line_count += 1
+        if error is not None:
+            continue
+
+        if line_count == 1:
+            try:
+                # Parse field dimensions
+                width, height = map(int, line.split())
+            except ValueError:
+                error = InputError("Field dimensions must be integers.")
+            continue
+
+        car_lines.append(line)
+        if len(car_lines) == 3:
+            try:
+                cars.append(parse_car(*car_lines, available=available))
+            except InputError as e:
+                error = e
+            else:
+                if '(' in car_lines[2]:
+                    available -= len(cars[-1][4])
+            car_lines = []
+
+    # Validate that the input has the correct format:
+    # The number of lines must be 3 * number_of_cars + 1 (for the field dimensions line).
+    # There must be at least 2 cars.
+    if line_count < 7 or (line_count - 1) % 3 != 0:
+        raise InputError("Invalid input format. Please provide field size and details for each car.")
+    if error is not None:
+        raise error
+
+    return Part2Scenario(width, height, tuple(cars))
+
+
+def parse_car(id_line, position_line, commands_line, available=MAX_TOTAL_EXPANDED_COMMANDS):
+    """
+    Parses the three lines describing one car of a Part 2 input into
+    an (identifier, x, y, direction, commands) tuple.
+    Raises InputError if the car is invalid.
+
+    available: Number of commands the car's repetitions may still expand to, out of the input's
+    MAX_TOTAL_EXPANDED_COMMANDS.
+    """
+    car_id = id_line.strip()
+    try:
+        position = position_line.split()
+
+        # Ensure the position line has exactly 3 parts: x, y, and direction
+        if len(position) != 3:
+            raise InputError(f"Invalid position format for car {car_id}.")
+
+        x, y, direction = position
+        x, y = int(x), int(y)
+        commands = commands_line.strip()
+
+        if direction not in ['N', 'E', 'S', 'W']:
+            raise InputError(f"Invalid direction for car {car_id}. Must be one of 'N', 'E', 'S', 'W'.")
+
+        if INVALID_COMMAND.search(commands):
+            commands = expand_car_commands(car_id, commands, available)
+
+        Car.validate(x, y, direction)
+    except InputError:
+        raise
+    except ValueError:
+        raise InputError(f"Invalid position or command format for car {car_id}.")
+
+    return car_id, x, y, direction, commands
+
+
+def parse_repetitions(commands):
+    """
+    Parses commands written with repetitions, where "(block)count" stands for the block
+    repeated count times and blocks can be nested, into a RepeatedProgram.
+    Raises InputError if the repetitions are malformed.
+    """
+    stack = [[]]
+    position = 0
+    while position < len(commands):
+        token = REPETITION_TOKEN.match(commands, position)
+        if token is None:
+            raise InputError("Repeated commands must be written as (commands)count.")
+        plain, opening, count = token.groups()
+        if plain:
+            stack[-1].append(compile_commands(plain))
+        elif opening:
+            if len(stack) > MAX_REPETITION_DEPTH:
+                raise InputError(f"Repeated commands can be nested at most {MAX_REPETITION_DEPTH} deep.")
+            stack.append([])
+        else:
+            if len(stack) == 1:
+                raise InputError("Repeated commands must be written as (commands)count.")
+            parts = stack.pop()
+            stack[-1].append(RepeatedProgram(parts, int(count)))
+        position = token.end()
+
+    if len(stack) != 1:
+        raise InputError("Repeated commands must be written as (commands)count.")
+    program = RepeatedProgram(stack[0])
+    if program.length > MAX_REPEATED_LENGTH:
+        raise InputError("Repeated commands stand for too many commands.")
+    return program
+
+
+def expand_car_commands(car_id, commands, available=MAX_TOTAL_EXPANDED_COMMANDS):
+    """
+    Expands the repetitions in a Part 2 car's commands into a command string.
+    Raises InputError if the commands are invalid, expand to more than MAX_EXPANDED_COMMANDS
+    commands or to more than the `available` commands left for the whole input.
+    """
+    if INVALID_REPEATED_COMMAND.search(commands):
+        raise InputError(f"Invalid commands for car {car_id}. Must be 'R', 'L', 'F' only.")
+    program = parse_repetitions(commands)
+    if program.length > MAX_EXPANDED_COMMANDS:
+        raise InputError(f"Commands for car {car_id} must expand to at most {MAX_EXPANDED_COMMANDS} commands.")
+    if program.length > available:
+        raise InputError(f"Repeated commands must expand to at most {MAX_TOTAL_EXPANDED_COMMANDS} "
+                         "commands over all cars.")
+    return program.expand()
+
+
+def parse_commands(lines):
+    """
+    Parses the lines of a session update (a string or an iterable of lines) into
+    (identifier, commands) pairs. Each non-blank line holds a car identifier and the
+    commands to append to it, separated by whitespace. Raises InputError if a line is invalid.
+    Repetitions are expanded, to at most MAX_TOTAL_EXPANDED_COMMANDS commands over all lines.
+    """
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
+
+    updates = []
+    available = MAX_TOTAL_EXPANDED_COMMANDS
+    for line in lines:
+        if is_blank(line):
+            continue
+        parts = line.rsplit(None, 1)
+        if len(parts) != 2:
+            raise InputError("Each line must hold a car identifier and its commands.")
+        car_id, commands = parts[0].strip(), parts[1]
+        if INVALID_COMMAND.search(commands):
+            commands = expand_car_commands(car_id, commands, available)
+            available -= len(commands)
+        updates.append((car_id, commands))
+    return updates
+
+
+def split_scenarios(lines):
+    """
+    Splits the lines of a text batch into one line iterator per scenario.
+    Scenarios are separated by '---' lines; blank scenarios are skipped.
+    Each iterator must be consumed before moving on to the next one.
+    """
+    for separator, group in groupby(lines, key=is_separator):
+        if separator:
+            continue
+        group = dropwhile(is_blank, group)
+        first_line = next(group, None)
+        if first_line is not None:
+            yield chain((first_line,), group)
+
+
+def read_json_lines(lines):
+    """
+    Parses the lines of a JSON lines batch into scenario dictionaries with a string 'input'.
+    Lines that are not such an object become {'error': message} entries.
+    """
+    for line in lines:
+        if is_blank(line):
+            continue
+        try:
+            scenario = json.loads(line)
+        except ValueError:
+            yield {'error': "Invalid JSON line."}
+            continue
+        if not isinstance(scenario, dict) or not isinstance(scenario.get('input'), str):
+            yield {'error': "Each JSON line must be an object with a string 'input'."}
+            continue
+        yield scenario
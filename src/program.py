@@ -0,0 +1,472 @@
+import threading
+from collections import OrderedDict
+from src.budget import CHECK_INTERVAL, BudgetExceeded
+from src.car import COMMAND_RUNS, DELTAS
+
+
+# Maximum number of compiled programs kept by compile_commands
+PROGRAM_CACHE_SIZE = 1024
+
+# Maximum total number of commands of the cached programs. A program whose segments and frames
+# are built takes about 65 bytes per command, so the cache stays within about 17 MB.
+PROGRAM_CACHE_COMMANDS = 1 << 18
+
+# Longest command string kept in the program cache; longer ones are compiled on every call
+# and dropped, with their segments, once the caller is done with them
+MAX_CACHED_LENGTH = 1 << 14
+
+# Maximum number of runs per segment. Smaller segments are more likely to stay clear of the walls.
+SEGMENT_RUNS = 8
+
+# Frames of an empty program: no displacement and no rotation from any direction
+IDENTITY_FRAMES = ((0, 0, 0, 0, 0, 0, 0),) * 4
+
+
+class CommandProgram:
+    """
+    A command string compiled once for any number of cars.
+
+    opcodes: The commands as bytes, one per command: ord('F'), ord('L') or ord('R'), any other
+    byte being ignored like an invalid command (the encoding of src.batch and src.vector_engine).
+    segments: The commands split into segments of up to SEGMENT_RUNS runs, each a
+    (runs, quarter_turns, frames) tuple. runs holds (forward steps, quarter turns) pairs with
+    turns collapsed into one rotation; frames gives, for each starting direction code, the net
+    displacement (dx, dy) and the bounding box (min_x, min_y, max_x, max_y) of the segment's path
+    relative to its start. A car whose box fits on a field without obstacles never reaches a wall,
+    so the whole segment is applied as its net displacement and rotation.
+    segment_offsets: The index of the command each segment starts at, followed by the number of commands.
+
+    Programs index, slice, iterate and measure like their command string, so the step-synchronous
+    engines accept them in place of strings.
+    """
+
+    __slots__ = ('commands', 'opcodes', '_segments', '_offsets', '_frames')
+
+    def __init__(self, commands):
+        """
+        Compiles a command string. Segments are only built the first time they are used.
+        """
+        self.commands = commands
+        self.opcodes = commands.encode('ascii', 'replace')
+        self._segments = None
+        self._offsets = None
+        self._frames = None
+
+    def __len__(self):
+        """
+        Returns the number of commands, which is the number of steps the program takes.
+        """
+        return len(self.commands)
+
+    def __getitem__(self, index):
+        """
+        Returns the command (or slice of commands) at the given index, as a string.
+        """
+        return self.commands[index]
+
+    def __iter__(self):
+        """
+        Iterates over the commands as one-character strings.
+        """
+        return iter(self.commands)
+
+    def __str__(self):
+        """
+        Returns the command string.
+        """
+        return self.commands
+
+    def __repr__(self):
+        return f"CommandProgram({self.commands[:32]!r}{'...' if len(self.commands) > 32 else ''})"
+
+    def __reduce__(self):
+        # Rebuild from the commands so pickling (e.g. for worker processes) skips the derived data
+        return CommandProgram, (self.commands,)
+
+    @property
+    def segments(self):
+        """
+        The program's segments (see the class docstring).
+        """
+        if self._segments is None:
+            self._segments, self._offsets = _build_segments(self.commands)
+        return self._segments
+
+    @property
+    def has_segments(self):
+        """
+        Whether the segments are built already. Building them costs more than running the
+        commands once, so callers with a single run to do may prefer the command string.
+        """
+        return self._segments is not None
+
+    @property
+    def segment_offsets(self):
+        """
+        The command index at which each segment starts, followed by the number of commands.
+        """
+        if self._offsets is None:
+            self._segments, self._offsets = _build_segments(self.commands)
+        return self._offsets
+
+    @property
+    def frames(self):
+        """
+        The net effect of the whole program on an unbounded field for each starting direction code,
+        as (dx, dy, min_x, min_y, max_x, max_y, quarter_turns) tuples (see compose_frames).
+        """
+        if self._frames is None:
+            frames = IDENTITY_FRAMES
+            for _, quarter_turns, segment_frames in self.segments:
+                frames = compose_frames(frames, tuple(frame + (quarter_turns,) for frame in segment_frames))
+            self._frames = frames
+        return self._frames
+
+    def execute(self, x, y, heading, field, start=0, stop=None):
+        """
+        Runs the program from the given state on the field and returns the final (x, y, heading).
+        Matches executing the commands one at a time.
+
+        start, stop: Optional range of segments to run, so a long program can be run in parts
+        (see segment_offsets for the commands they cover).
+        """
+        width, height = field.width, field.height
+        clear = field.obstacles is None
+        segments = self.segments
+        if start or stop is not None:
+            segments = segments[start:stop]
+        for runs, quarter_turns, frames in segments:
+            delta_x, delta_y, min_x, min_y, max_x, max_y = frames[heading]
+            if clear and x + min_x >= 0 and y + min_y >= 0 and x + max_x < width and y + max_y < height:
+                x, y = x + delta_x, y + delta_y
+                heading = (heading + quarter_turns) % 4
+                continue
+
+            # The segment reaches a wall or obstacle (or starts off the field): run it run by run
+            for steps, turns in runs:
+                if steps:
+                    step_x, step_y = DELTAS[heading]
+                    x, y = field.advance(x, y, step_x, step_y, steps)
+                else:
+                    heading = (heading + turns) % 4
+        return x, y, heading
+
+
+def _build_segments(commands):
+    """
+    Splits a command string into segments of collapsed runs with their net effect for each direction.
+    Returns the segments and their offsets (see CommandProgram).
+    """
+    runs = []
+    starts = []
+    for run in COMMAND_RUNS.finditer(commands):
+        starts.append(run.start())
+        if commands[run.start()] == 'F':
+            runs.append((run.end() - run.start(), 0))
+        else:
+            turns = run.group()
+            runs.append((0, turns.count('R') - turns.count('L')))
+
+    segments = []
+    for start in range(0, len(runs), SEGMENT_RUNS):
+        segment_runs = tuple(runs[start:start + SEGMENT_RUNS])
+        frames = tuple(_trace(segment_runs, heading) for heading in range(4))
+        segments.append((segment_runs, sum(turns for _, turns in segment_runs) % 4, frames))
+    offsets = [0] + starts[SEGMENT_RUNS::SEGMENT_RUNS] + [len(commands)]
+    return tuple(segments), tuple(offsets)
+
+
+def _trace(runs, heading):
+    """
+    Follows runs from (0, 0) on an unbounded field and returns the net displacement and
+    bounding box of the path as (dx, dy, min_x, min_y, max_x, max_y).
+    """
+    x = y = min_x = min_y = max_x = max_y = 0
+    for steps, turns in runs:
+        if steps:
+            step_x, step_y = DELTAS[heading]
+            x, y = x + step_x * steps, y + step_y * steps
+            min_x, min_y, max_x, max_y = min(min_x, x), min(min_y, y), max(max_x, x), max(max_y, y)
+        else:
+            heading = (heading + turns) % 4
+    return x, y, min_x, min_y, max_x, max_y
+
+
+class RepeatedProgram:
+    """
+    A sequence of parts (CommandPrograms or nested RepeatedPrograms) executed `count` times,
+    written `(parts)count` in the command format. A whole command line with repetitions is a
+    RepeatedProgram with a count of 1.
+
+    Executing a repeated block skips the iterations it can predict:
+    - on a field without obstacles, iterations that leave the car's direction unchanged are
+      applied together as one displacement. The two axes move independently there: along each
+      one, the car either stays clear of the walls, or is held where the last iteration left it
+      (such as a car sliding along a wall);
+    - a car's state (x, y, direction) on a finite field can only take finitely many values, so
+      the states at the start of the iterations eventually cycle. Once a state comes back, whole
+      periods of the cycle are skipped.
+    Other iterations, such as those on a field with obstacles before the states cycle, are
+    stepped through one at a time.
+    """
+
+    __slots__ = ('parts', 'count', 'length', '_frames')
+
+    def __init__(self, parts, count=1):
+        """
+        parts: Sequence of CommandPrograms and RepeatedPrograms.
+        count: Number of times the parts are executed.
+        """
+        self.parts = tuple(parts)
+        self.count = count
+        self.length = count * sum(part.length if isinstance(part, RepeatedProgram) else len(part)
+                                  for part in self.parts)
+        self._frames = None
+
+    def __len__(self):
+        """
+        Returns the number of commands once expanded, which is the number of steps the program takes.
+        """
+        return self.length
+
+    def __iter__(self):
+        """
+        Iterates over the expanded commands as one-character strings, without expanding them in memory.
+        """
+        for _ in range(self.count):
+            for part in self.parts:
+                yield from part
+
+    def __str__(self):
+        """
+        Returns the program in the command format, with its repetitions.
+        """
+        return self._body() if self.count == 1 else f"({self._body()}){self.count}"
+
+    def _body(self):
+        return ''.join(str(part) if isinstance(part, CommandProgram) else f"({part._body()}){part.count}"
+                       for part in self.parts)
+
+    def __repr__(self):
+        return f"RepeatedProgram({str(self)[:32]!r}{'...' if len(str(self)) > 32 else ''})"
+
+    def expand(self):
+        """
+        Returns the expanded command string.
+        """
+        return ''.join(part.commands if isinstance(part, CommandProgram) else part.expand()
+                       for part in self.parts) * self.count
+
+    def head(self, count):
+        """
+        Returns a RepeatedProgram of the first `count` commands, keeping the repetitions.
+        """
+        if count >= self.length:
+            return self
+        body_length = self.length // self.count
+        iterations, rest = divmod(count, body_length)
+        parts = [RepeatedProgram(self.parts, iterations)] if iterations else []
+        for part in self.parts:
+            if not rest:
+                break
+            if len(part) <= rest:
+                parts.append(part)
+                rest -= len(part)
+            else:
+                parts.append(part.head(rest) if isinstance(part, RepeatedProgram) else CommandProgram(part[:rest]))
+                rest = 0
+        return RepeatedProgram(parts)
+
+    @property
+    def frames(self):
+        """
+        The net effect of the whole program on an unbounded field for each starting direction code
+        (see CommandProgram.frames).
+        """
+        if self._frames is None:
+            self._frames = power_frames(self.body_frames(), self.count)
+        return self._frames
+
+    def body_frames(self):
+        """
+        Returns the net effect of one iteration of the parts.
+        """
+        frames = IDENTITY_FRAMES
+        for part in self.parts:
+            frames = compose_frames(frames, part.frames)
+        return frames
+
+    def execute(self, x, y, heading, field, first_step=0):
+        """
+        Runs the program from the given state on the field and returns the final (x, y, heading).
+        Matches executing the expanded commands one at a time.
+
+        If the field has a budget, it is checked between iterations, once every CHECK_INTERVAL
+        commands or more. Raises BudgetExceeded with the step reached (counted from first_step, the step
+        the program starts at) and the state reached as its `state`.
+        """
+        width, height = field.width, field.height
+        clear = field.obstacles is None
+        body_frames = self.body_frames() if clear and self.count > 1 else None
+        body_length = self.length // self.count if self.count else 0
+        budget = field.budget
+        next_check = first_step + CHECK_INTERVAL
+        seen = {}  # (x, y, heading) at the start of an iteration -> remaining iterations at that point
+        last_start = None  # (x, y) at the start of the last iteration, if it left the heading unchanged
+        remaining = self.count
+        while remaining:
+            step = first_step + (self.count - remaining) * body_length
+            if budget is not None and step >= next_check:
+                try:
+                    budget.check(step)
+                except BudgetExceeded as e:
+                    e.state = (x, y, heading)
+                    raise
+                next_check = step + CHECK_INTERVAL
+
+            if body_frames is not None:
+                delta_x, delta_y, min_x, min_y, max_x, max_y, quarter_turns = body_frames[heading]
+                if quarter_turns == 0:
+                    # Each iteration shifts the car by (delta_x, delta_y) along the axes it stays clear of
+                    # the walls on, and not at all along the others: jump while that holds
+                    start_x, start_y = last_start or (None, None)
+                    limit_x, shift_x = _axis_drift(x, min_x, max_x, delta_x, width, start_x)
+                    limit_y, shift_y = _axis_drift(y, min_y, max_y, delta_y, height, start_y)
+                    iterations = min(remaining, limit_x, limit_y)
+                    if iterations:
+                        x, y = x + shift_x * iterations, y + shift_y * iterations
+                        remaining -= iterations
+                        if not remaining:
+                            break
+                last_start = (x, y) if quarter_turns == 0 else None
+
+            if seen is not None:
+                state = (x, y, heading)
+                previous = seen.get(state)
+                if previous is None:
+                    seen[state] = remaining
+                else:
+                    # The iterations since the state was last seen repeat: skip whole periods
+                    remaining %= previous - remaining
+                    seen = None
+                    if not remaining:
+                        break
+
+            step = first_step + (self.count - remaining) * body_length
+            for part in self.parts:
+                if isinstance(part, RepeatedProgram):
+                    x, y, heading = part.execute(x, y, heading, field, step)
+                else:
+                    x, y, heading = part.execute(x, y, heading, field)
+                step += len(part)
+            remaining -= 1
+        return x, y, heading
+
+
+def _axis_drift(position, low, high, delta, size, previous):
+    """
+    Returns (iterations, shift): how many iterations of a body that leaves the direction unchanged
+    move the car predictably along one axis of a field without obstacles, and by how much each.
+    While the span [position + low, position + high] of the path stays within [0, size), each
+    iteration shifts the car by `delta`. Otherwise, if the last iteration (started at `previous`)
+    ended where it started, every later one does too: moves along an axis only depend on the
+    position along it. Returns (0, 0) if neither holds.
+    """
+    if position + low >= 0 and position + high < size:
+        return _drift_limit(position, low, high, delta, size), delta
+    return (float('inf') if position == previous else 0), 0
+
+
+def _drift_limit(position, low, high, delta, size):
+    """
+    Returns how many iterations shifting by `delta` keep the span [position + low, position + high]
+    within [0, size), given that the first one does (infinity if the span never moves).
+    """
+    if delta > 0:
+        return (size - 1 - position - high) // delta + 1
+    if delta < 0:
+        return (position + low) // -delta + 1
+    return float('inf')
+
+
+def compose_frames(first, second):
+    """
+    Returns the frames of running the program described by `first` followed by `second`.
+    Frames are (dx, dy, min_x, min_y, max_x, max_y, quarter_turns) tuples indexed by the starting
+    direction code: the net displacement, the bounding box of the path relative to the start and
+    the net rotation.
+    """
+    frames = []
+    for heading in range(4):
+        delta_x, delta_y, min_x, min_y, max_x, max_y, turns = first[heading]
+        (next_x, next_y, next_min_x, next_min_y, next_max_x, next_max_y,
+         next_turns) = second[(heading + turns) % 4]
+        frames.append((delta_x + next_x, delta_y + next_y,
+                       min(min_x, delta_x + next_min_x), min(min_y, delta_y + next_min_y),
+                       max(max_x, delta_x + next_max_x), max(max_y, delta_y + next_max_y),
+                       (turns + next_turns) % 4))
+    return tuple(frames)
+
+
+def power_frames(frames, count):
+    """
+    Returns the frames of running the program described by `frames` `count` times,
+    with O(log count) compositions.
+    """
+    result = IDENTITY_FRAMES
+    while count:
+        if count & 1:
+            result = compose_frames(result, frames)
+        frames = compose_frames(frames, frames)
+        count >>= 1
+    return result
+
+
+_programs = OrderedDict()  # command string -> CommandProgram, least recently used first
+_programs_commands = 0
+_programs_lock = threading.Lock()
+
+
+def cached_program(commands):
+    """
+    Returns the cached CommandProgram of a command string, or None if it is not cached.
+    """
+    with _programs_lock:
+        program = _programs.get(commands)
+        if program is not None:
+            _programs.move_to_end(commands)
+        return program
+
+
+def compile_commands(commands):
+    """
+    Returns the CommandProgram of a command string, shared by every caller compiling the same
+    string while it stays in a bounded LRU cache (see PROGRAM_CACHE_SIZE and
+    PROGRAM_CACHE_COMMANDS). Strings longer than MAX_CACHED_LENGTH are compiled on every call.
+    Programs (including RepeatedPrograms) are returned as they are.
+    """
+    global _programs_commands
+    if not isinstance(commands, str):
+        return commands
+    program = cached_program(commands)
+    if program is not None or len(commands) > MAX_CACHED_LENGTH:
+        return program or CommandProgram(commands)
+
+    program = CommandProgram(commands)
+    with _programs_lock:
+        if commands in _programs:
+            # Compiled by another thread in the meantime
+            return _programs[commands]
+        _programs[commands] = program
+        _programs_commands += len(commands)
+        while len(_programs) > PROGRAM_CACHE_SIZE or _programs_commands > PROGRAM_CACHE_COMMANDS:
+            _, evicted = _programs.popitem(last=False)
+            _programs_commands -= len(evicted)
+    return program
+
+
+def command_string(commands):
+    """
+    Returns the command string of a CommandProgram, or the commands themselves if they are a string.
+    """
+    return commands.commands if isinstance(commands, CommandProgram) else commands
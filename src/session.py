@@ -0,0 +1,210 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from src.budget import BudgetExceeded
+from src.field import Field
+from src.fleet import CarFleet
+from src.parser import INVALID_COMMAND
+
+
+class SimulationSession:
+    """
+    A Part 2 simulation that can be continued with more commands.
+
+    The session keeps the field, the cars and their occupied positions, and the current step.
+    Commands appended to cars run from the current step, in lockstep like the cars of a
+    Part 2 input; cars without new commands stay where they are. Each update only costs
+    the new commands, whatever the length of the history.
+    """
+
+    def __init__(self, width, height):
+        """
+        Initializes a session with an empty field of the given size.
+        Raises ValueError if width or height is invalid.
+        """
+        self.field = Field(width, height)
+        self.fleet = CarFleet()
+        self.indices = {}  # Car identifier -> index in the fleet
+        self.step = 0  # Steps simulated so far
+        self.commands_executed = 0
+        self.result = "no collision"
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_scenario(cls, scenario, budget=None):
+        """
+        Starts a session from a parsed Part2Scenario and runs the cars' commands.
+        Raises ValueError if the field or a car is invalid.
+
+        budget: Optional SimulationBudget for the cars' commands (see append_commands).
+        Raises ValueError if there are more cars than it allows.
+        """
+        if budget is not None:
+            budget.check_cars(len(scenario.cars))
+        session = cls(scenario.width, scenario.height)
+        for car_id, x, y, direction, _ in scenario.cars:
+            session.add_car(car_id, x, y, direction)
+        session.append_commands(((car_id, commands) for car_id, _, _, _, commands in scenario.cars), budget)
+        return session
+
+    @property
+    def collided(self):
+        """
+        Whether the session has ended in a collision.
+        """
+        return self.result != "no collision"
+
+    def add_car(self, car_id, x, y, direction):
+        """
+        Adds a car to the session. Like the cars of a Part 2 input, it only occupies
+        its position once it has executed a command.
+        Raises ValueError if the identifier is already used or the car is invalid.
+        """
+        if car_id in self.indices:
+            raise ValueError(f"Duplicate car {car_id}.")
+        self.fleet.add(x, y, direction, car_id)
+        self.indices[car_id] = len(self.fleet) - 1
+
+    def append_commands(self, updates, budget=None):
+        """
+        Runs new commands from the current step and returns the first collision, or "no collision".
+
+        updates: Iterable of (car identifier, commands) pairs. Commands given for the same car
+        more than once are run one after the other.
+        Raises ValueError if the session has already ended in a collision, or a car or
+        its commands are invalid.
+
+        budget: Optional SimulationBudget for the new commands. Only the steps whose commands it
+        allows are run; if it runs out before a collision, BudgetExceeded is raised with every car's
+        position at the step reached. The session stays at that step, and the commands beyond it
+        are dropped.
+        """
+        if self.collided:
+            raise ValueError("Session has already ended in a collision.")
+
+        new_commands = {}
+        for car_id, commands in updates:
+            if car_id not in self.indices:
+                raise ValueError(f"Unknown car {car_id}.")
+            if INVALID_COMMAND.search(commands):
+                raise ValueError(f"Invalid commands for car {car_id}. Must be 'R', 'L', 'F' only.")
+            index = self.indices[car_id]
+            new_commands[index] = new_commands.get(index, '') + commands
+
+        active = sorted((index, commands) for index, commands in new_commands.items() if commands)
+        if not active:
+            return self.result
+
+        limit = None
+        if budget is not None:
+            budget = budget.start()
+            limit = budget.step_limit(len(commands) for _, commands in active)
+            if limit is not None:
+                active = [(index, commands[:limit]) for index, commands in active if commands[:limit]]
+
+        try:
+            self.result = self.field._simulate_fleet(self.fleet, active=active, first_step=self.step, budget=budget)
+        except BudgetExceeded as e:
+            self._advance(active, e.step - self.step)
+            raise BudgetExceeded(e.reason, e.step, self.positions()) from None
+        if self.collided:
+            # The output ends with the (1-based) step of the collision
+            steps = int(self.result.split()[-1]) - self.step
+        else:
+            steps = max((len(commands) for _, commands in active), default=0)
+        self._advance(active, steps)
+        if limit is not None and not self.collided:
+            raise BudgetExceeded('commands', self.step, self.positions())
+        return self.result
+
+    def _advance(self, active, steps):
+        """
+        Moves the session on by the given number of steps of the active (index, commands) pairs.
+        """
+        self.step += steps
+        self.commands_executed += sum(min(len(commands), steps) for _, commands in active)
+
+    def positions(self):
+        """
+        Returns every car's current position as "id x y D" strings, in the order the cars were added.
+        """
+        return [self.fleet.get_position_with_id(index) for index in range(len(self.fleet))]
+
+
+class SessionStore:
+    """
+    Thread-safe registry of simulation sessions. Sessions left idle for longer than the
+    timeout are evicted, as is the least recently used session when the store is full.
+    """
+
+    def __init__(self, idle_timeout=600, max_sessions=1024, clock=time.monotonic):
+        """
+        idle_timeout: Seconds after its last use at which a session is evicted.
+        max_sessions: Maximum number of sessions kept at a time.
+        clock: Function returning the current time in seconds.
+        """
+        if idle_timeout <= 0 or max_sessions < 1:
+            raise ValueError("Idle timeout and maximum sessions must be positive.")
+
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.evictions = 0
+        self._sessions = OrderedDict()  # session id -> [session, last use], least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Returns the number of live sessions.
+        """
+        with self._lock:
+            self._evict_idle()
+            return len(self._sessions)
+
+    def add(self, session):
+        """
+        Stores a session and returns its new identifier.
+        """
+        session_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._evict_idle()
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            self._sessions[session_id] = [session, self.clock()]
+        return session_id
+
+    def get(self, session_id):
+        """
+        Returns the session with the given identifier and marks it as used, or None if it
+        does not exist or has been evicted.
+        """
+        with self._lock:
+            self._evict_idle()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] = self.clock()
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def remove(self, session_id):
+        """
+        Removes a session. Returns whether it existed.
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_idle(self):
+        """
+        Removes the sessions idle for longer than the timeout. Must be called with the lock held.
+        """
+        deadline = self.clock() - self.idle_timeout
+        sessions = self._sessions
+        while sessions:
+            session_id, (_, last_used) = next(iter(sessions.items()))
+            if last_used > deadline:
+                break
+            del sessions[session_id]
+            self.evictions += 1
@@ -0,0 +1,230 @@
+from src.budget import BudgetExceeded
+from src.collisions import iter_collisions
+from src.context import simulation_context
+from src.field import Field
+from src.fleet import CarFleet
+from src.parser import MAX_EXPANDED_COMMANDS, InputError, Part1Scenario, Part2Scenario
+from src.program import RepeatedProgram, cached_program, compile_commands
+
+
+def simulate_part1(scenario, recorder=None, metrics=None, budget=None):
+    """
+    Simulates a parsed Part 1 scenario and returns the car's final position and direction.
+    Raises ValueError if the field or car is invalid. A route is run run-length encoded the
+    first time it is seen and cached as a CommandProgram, so repeating it runs its segments
+    (whose building costs more than one run-length pass).
+
+    recorder: Optional TrajectoryRecorder to record the car's state after every command.
+    Commands written with repetitions are only recorded up to MAX_EXPANDED_COMMANDS commands.
+    metrics: Optional Metrics to count the executed commands in.
+    budget: Optional SimulationBudget. Only the commands it allows are executed; raises
+    BudgetExceeded, with the car's position at the command reached, if it runs out.
+
+    The field and car are the calling thread's reusable ones (see src/context.py).
+    """
+    if budget is not None:
+        budget = budget.start()
+    with simulation_context() as context:
+        field = context.field.reset(scenario.width, scenario.height, budget=budget)
+        car = context.car.reset(scenario.x, scenario.y, scenario.direction)
+        return _simulate_part1(scenario, field, car, recorder, metrics, budget)
+
+
+def _simulate_part1(scenario, field, car, recorder, metrics, budget):
+    """
+    Runs simulate_part1 on a reset field and car.
+    """
+    if recorder is not None and len(scenario.commands) > MAX_EXPANDED_COMMANDS:
+        raise InputError(f"Recorded commands must expand to at most {MAX_EXPANDED_COMMANDS} commands.")
+
+    commands = scenario.commands
+    limited = budget is not None and budget.max_commands is not None and len(commands) > budget.max_commands
+    if limited:
+        commands = (commands.head(budget.max_commands) if isinstance(commands, RepeatedProgram)
+                    else commands[:budget.max_commands])
+    program = cached_program(commands) if isinstance(commands, str) else commands
+    try:
+        if program is None:
+            car.execute_commands(commands, field, run_length=True, recorder=recorder)
+            compile_commands(commands)
+        else:
+            car.execute_commands(program, field, recorder=recorder)
+    except BudgetExceeded as e:
+        if metrics is not None:
+            metrics.increment('commands_executed_total', e.step)
+        raise BudgetExceeded(e.reason, e.step, [car.get_position()]) from None
+
+    if metrics is not None:
+        metrics.increment('commands_executed_total', len(commands))
+    if limited:
+        raise BudgetExceeded('commands', len(commands), [car.get_position()])
+    return car.get_position()
+
+
+def simulate_part2(scenario, engine='python', recorder=None, metrics=None, budget=None):
+    """
+    Simulates a parsed Part 2 scenario and returns the first collision, or "no collision".
+    Raises ValueError if the field or a car is invalid. Cars sharing a route share its
+    compiled CommandProgram.
+
+    recorder: Optional TrajectoryRecorder to record every car's state after each of its commands.
+    metrics: Optional Metrics to count the executed commands and record the collision checks in
+    (collision checks are only recorded by the python engine).
+    budget: Optional SimulationBudget. Raises ValueError if there are more cars than it allows.
+    Only the steps whose commands it allows are run; raises BudgetExceeded, with every car's
+    position at the step reached, if it runs out before a collision.
+
+    The field and fleet are the calling thread's reusable ones (see src/context.py).
+    """
+    steps = None
+    if budget is not None:
+        budget.check_cars(len(scenario.cars))
+        budget = budget.start()
+        steps = budget.step_limit(len(commands) for *_, commands in scenario.cars)
+    with simulation_context() as context:
+        field = context.field.reset(scenario.width, scenario.height, budget=budget)
+        return _simulate_part2(scenario, field, context.fleet, engine, recorder, metrics, steps)
+
+
+def _simulate_part2(scenario, field, fleet, engine, recorder, metrics, steps):
+    """
+    Runs simulate_part2 on a reset field and an empty fleet, running at most `steps` steps if it is not None.
+    """
+    for car_id, x, y, direction, commands in scenario.cars:
+        fleet.add(x, y, direction, car_id, compile_commands(commands if steps is None else commands[:steps]))
+
+    if metrics is not None:
+        metrics.instrument_field(field)
+    try:
+        output = field.simulate_multiple_cars(fleet, engine=engine, recorder=recorder)
+    except BudgetExceeded as e:
+        if metrics is not None:
+            metrics.record_field(field)
+            metrics.increment('commands_executed_total',
+                              sum(min(len(commands), e.step) for commands in fleet.commands))
+        raise BudgetExceeded(e.reason, e.step, fleet_positions(fleet)) from None
+    if metrics is not None:
+        metrics.record_field(field)
+        metrics.increment('commands_executed_total', commands_executed(fleet.commands, output))
+
+    if steps is not None and output == "no collision":
+        raise BudgetExceeded('commands', steps, fleet_positions(fleet))
+    return output
+
+
+def fleet_positions(fleet):
+    """
+    Returns the position of every car of a fleet, with its identifier, in fleet order.
+    """
+    return [fleet.get_position_with_id(index) for index in range(len(fleet))]
+
+
+def iter_part2_collisions(scenario, policy='freeze', budget=None):
+    """
+    Simulates a parsed Part 2 scenario through every collision and yields a CollisionEvent
+    per collision. Raises ValueError if the field or a car is invalid.
+
+    policy: 'freeze' or 'remove', what happens to the cars involved in a collision.
+    budget: Optional SimulationBudget, started now. Raises ValueError if there are more cars than
+    it allows. Only the steps whose commands it allows are run; if it runs out while a car still
+    has commands, the collisions found so far are followed by BudgetExceeded, with every car's
+    position at the step reached.
+    """
+    steps = None
+    if budget is not None:
+        budget.check_cars(len(scenario.cars))
+        budget = budget.start()
+        steps = budget.step_limit(len(commands) for *_, commands in scenario.cars)
+    field = Field(scenario.width, scenario.height, budget=budget)
+    fleet = CarFleet()
+    for car_id, x, y, direction, commands in scenario.cars:
+        fleet.add(x, y, direction, car_id, commands if steps is None else commands[:steps])
+    events = iter_collisions(field, fleet, policy)
+    if budget is None:
+        return events
+    return _budgeted_collisions(events, scenario, fleet, steps)
+
+
+def _budgeted_collisions(events, scenario, fleet, steps):
+    """
+    Yields the collision events of a budgeted iter_part2_collisions, then raises BudgetExceeded
+    if the commands limit cut short a car that no collision had stopped.
+    """
+    stopped = set()
+    try:
+        for event in events:
+            stopped.update(event.car_ids)
+            yield event
+    except BudgetExceeded as e:
+        raise BudgetExceeded(e.reason, e.step, fleet_positions(fleet)) from None
+    if steps is not None and any(len(commands) > steps and car_id not in stopped
+                                 for car_id, *_, commands in scenario.cars):
+        raise BudgetExceeded('commands', steps, fleet_positions(fleet))
+
+
+def commands_executed(command_sequences, output):
+    """
+    Returns the number of commands the cars executed to produce a Part 2 output.
+    For a collision, every command up to the end of the reported step is counted.
+    """
+    if output == "no collision":
+        return sum(len(commands) for commands in command_sequences)
+    step = int(output.split()[-1])
+    return sum(min(len(commands), step) for commands in command_sequences)
+
+
+def simulate_batch_item(item, budget=None):
+    """
+    Simulates one (scenario, engine) item of a batch and returns a ('result', output)
+    or ('error', message) pair. The scenario is either a parsed Part1Scenario or Part2Scenario,
+    or the exception raised while parsing it, which is reported as the item's error.
+    Runs in the batch worker processes, so it never raises.
+
+    budget: Optional SimulationBudget applied to the scenario. A scenario that runs out of it
+    gets its partial result (see BudgetExceeded.partial_result) as its output.
+    """
+    scenario, engine = item
+    try:
+        if isinstance(scenario, Exception):
+            raise scenario
+        if isinstance(scenario, Part1Scenario):
+            return 'result', simulate_part1(scenario, budget=budget)
+        return 'result', simulate_part2(scenario, engine, budget=budget)
+    except BudgetExceeded as e:
+        return 'result', e.partial_result()
+    except Exception as e:
+        return 'error', f"Error: {str(e)}"
+
+
+def iter_batch_items(scenarios, parse, default_engine, records):
+    """
+    Parses batch scenarios ({'input': ...} or {'error': ...} dictionaries) into
+    (scenario, engine) items for simulate_batch_item, appending each scenario's output
+    record ({'index': ..., 'id': ...}) to `records` as it goes. A scenario that fails
+    to parse becomes an item carrying its error.
+    """
+    for index, scenario in enumerate(scenarios):
+        record = {'index': index}
+        if 'id' in scenario:
+            record['id'] = scenario['id']
+        records.append(record)
+
+        if 'error' in scenario:
+            yield InputError(scenario['error']), None
+            continue
+        try:
+            yield parse(scenario['input']), scenario.get('engine', default_engine)
+        except Exception as e:
+            yield e, None
+
+
+def batch_item_cost(item):
+    """
+    Estimates the work of a batch item as its number of commands.
+    """
+    scenario, _ = item
+    if isinstance(scenario, Part1Scenario):
+        return len(scenario.commands)
+    if isinstance(scenario, Part2Scenario):
+        return sum(len(commands) for *_, commands in scenario.cars)
+    return 0
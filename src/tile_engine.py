@@ -0,0 +1,237 @@
+import math
+import multiprocessing
+import threading
+from bisect import bisect_right
+from src.budget import BudgetExceeded
+from src.executor import SimulationExecutor
+from src.field import Field
+from src.fleet import CarFleet
+from src.obstacles import ObstacleMap
+from src.program import command_string
+
+
+# Number of steps simulated by the tiles between two exchanges of cars
+EPOCH_STEPS = 64
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+# Executor used in worker processes (batch items, offloaded requests): a single tile run in
+# the process itself, so worker pools are never nested
+_worker_executor = SimulationExecutor(max_workers=1, chunk_size=1, inline_threshold=math.inf)
+
+
+def simulate_multiple_cars(field, cars_with_commands, executor=None, tiles=None, epoch_steps=EPOCH_STEPS):
+    """
+    Sharded multi-car simulation for very large fleets on large fields.
+
+    The field is split into a grid of tiles, and the simulation runs in epochs of
+    `epoch_steps` steps. In each epoch every tile is simulated in a worker process with
+    Field._simulate_fleet, on the cars that start the epoch within `epoch_steps` grid points
+    of it: every car that can reach one of the tile's grid points during the epoch.
+    Cars move independently of each other, so those cars follow the same paths, in the
+    same order within each step, as in the whole simulation; a tile therefore sees
+    every collision on its grid points exactly as the loop-based engine does, and never
+    reports one that engine would not. The first collision is the earliest one reported
+    by a tile, ties within a step going to the car that moved first. At the end of an
+    epoch each car is passed on to the tile it has reached.
+
+    executor: SimulationExecutor running the tiles. Defaults to a shared executor sending
+    one tile per task. Small epochs are run in the calling process (see SimulationExecutor).
+    In a worker process the default is a single tile run in the worker itself.
+    tiles: Optional (columns, rows) of the tile grid. Defaults to one tile per worker.
+    epoch_steps: Steps per epoch. Longer epochs exchange cars less often but widen the
+    margin of cars each tile simulates around it.
+
+    Returns the same output as Field.simulate_multiple_cars. The cars (or CarFleet) and
+    field.occupied_positions are left as the loop-based engine leaves them, except that
+    after a collision the cars are left as they were at the start of the collision's epoch.
+    Car identifiers are assumed to be unique.
+
+    The field's budget is checked at epoch boundaries; if it runs out, BudgetExceeded is
+    raised with every car at the step reached.
+    """
+    if epoch_steps < 1:
+        raise ValueError("Epoch steps must be at least 1.")
+    if isinstance(cars_with_commands, CarFleet):
+        fleet = cars_with_commands
+        cars = None
+    else:
+        fleet = CarFleet.from_cars(cars_with_commands)
+        cars = [car for car, _ in cars_with_commands]
+    executor = executor or _get_default_executor()
+    columns, rows = tiles or _tile_grid(executor.max_workers, field.width, field.height)
+    if columns < 1 or rows < 1:
+        raise ValueError("The tile grid must have at least one column and one row.")
+
+    try:
+        return _simulate(field, fleet, executor, columns, rows, epoch_steps)
+    finally:
+        if cars is not None:
+            for index, car in enumerate(cars):
+                car.x, car.y, car.heading = fleet.xs[index], fleet.ys[index], fleet.headings[index]
+
+
+def _simulate(field, fleet, executor, columns, rows, epoch_steps):
+    """
+    Runs the epochs on a CarFleet and returns the output.
+    """
+    command_sequences = [command_string(commands) for commands in fleet.commands]
+    # Cars without commands never occupy a grid point, so they take no part in the simulation
+    placed = [index for index, commands in enumerate(command_sequences) if commands]
+    max_steps = max((len(command_sequences[index]) for index in placed), default=0)
+    x_bounds = [field.width * column // columns for column in range(1, columns)]
+    y_bounds = [field.height * row // rows for row in range(1, rows)]
+    obstacles = None
+    if field.obstacles is not None:
+        obstacles = bytes(field.obstacles.data)
+
+    xs, ys, headings = fleet.xs, fleet.ys, fleet.headings
+    for step in range(0, max_steps, epoch_steps):
+        if field.budget is not None:
+            try:
+                field.budget.check(step)
+            except BudgetExceeded:
+                if step > 0:
+                    _place_cars(field, fleet, placed)
+                raise
+        members = [[] for _ in range(columns * rows)]
+        for index in placed:
+            x, y = xs[index], ys[index]
+            for row in range(bisect_right(y_bounds, y - epoch_steps), bisect_right(y_bounds, y + epoch_steps) + 1):
+                for column in range(bisect_right(x_bounds, x - epoch_steps),
+                                    bisect_right(x_bounds, x + epoch_steps) + 1):
+                    members[row * columns + column].append(index)
+
+        jobs = []
+        for tile, indices in enumerate(members):
+            if not indices:
+                continue
+            row, column = divmod(tile, columns)
+            jobs.append((
+                field.width, field.height, obstacles, step,
+                _tile_box(x_bounds, column), _tile_box(y_bounds, row),
+                indices,
+                [fleet.identifiers[index] for index in indices],
+                [xs[index] for index in indices],
+                [ys[index] for index in indices],
+                [headings[index] for index in indices],
+                [command_sequences[index][step:step + epoch_steps] for index in indices],
+            ))
+        results = executor.map(simulate_tile, jobs, cost=_tile_cost)
+
+        collisions = [result for result in results if result[0] == 'collision']
+        if collisions:
+            _place_cars(field, fleet, placed)
+            return min(collisions)[3]
+
+        # Every tile simulating a car computes the same path for it, so any of them gives its state
+        states = {}
+        for job, (_, tile_states) in zip(jobs, results):
+            states.update(zip(job[6], tile_states))
+        for index in placed:
+            xs[index], ys[index], headings[index] = states[index]
+
+    _place_cars(field, fleet, placed)
+    return "no collision"
+
+
+def simulate_tile(job):
+    """
+    Simulates one tile for an epoch in a worker process.
+    Returns ('collision', step, car index, output) for the first collision seen on the tile's
+    grid points, otherwise ('states', states) with the final (x, y, heading) of the job's cars.
+    """
+    (width, height, obstacle_data, step, (left, right), (bottom, top),
+     indices, identifiers, xs, ys, headings, commands) = job
+    obstacles = None
+    if obstacle_data is not None:
+        obstacles = ObstacleMap(width, height, obstacle_data)
+    field = _TileField(width, height, obstacles, (left, right, bottom, top))
+
+    fleet = CarFleet()
+    fleet.identifiers, fleet.commands = identifiers, commands
+    fleet.xs.extend(xs)
+    fleet.ys.extend(ys)
+    fleet.headings.extend(headings)
+    if step > 0:
+        # Every car has executed a command by now, so every car occupies its grid point
+        for car_id, x, y in zip(identifiers, xs, ys):
+            field.occupy_position(car_id, x, y)
+
+    output = field._simulate_fleet(fleet, active=list(enumerate(commands)), first_step=step)
+    if output != "no collision":
+        return 'collision', int(output.split()[-1]), indices[identifiers.index(field.colliding_car)], output
+    return 'states', list(zip(fleet.xs, fleet.ys, fleet.headings))
+
+
+class _TileField(Field):
+    """
+    A Field simulating the cars around one tile. Collisions off the tile are left to the tiles
+    they happen on, and the car whose move caused a collision is remembered.
+    """
+
+    def __init__(self, width, height, obstacles, box):
+        """
+        box: (left, right, bottom, top) bounds of the tile, right and top excluded.
+        """
+        super().__init__(width, height, obstacles)
+        self.box = box
+        self.colliding_car = None
+
+    def check_collision_at(self, car_id, x, y, step):
+        left, right, bottom, top = self.box
+        if not (left <= x < right and bottom <= y < top):
+            return False, None
+        collision, output = super().check_collision_at(car_id, x, y, step)
+        if collision:
+            self.colliding_car = car_id
+        return collision, output
+
+
+def _tile_box(bounds, position):
+    """
+    Returns the (start, stop) coordinates of the tile at the given position along one axis.
+    The outer tiles extend past the field, so cars off the field belong to a tile too.
+    """
+    start = bounds[position - 1] if position > 0 else -math.inf
+    stop = bounds[position] if position < len(bounds) else math.inf
+    return start, stop
+
+
+def _tile_grid(workers, width, height):
+    """
+    Returns (columns, rows) of a grid of about `workers` tiles whose tiles are close to square.
+    """
+    columns = round(math.sqrt(workers * max(width, 1) / max(height, 1)))
+    columns = min(max(columns, 1), workers)
+    return columns, max(workers // columns, 1)
+
+
+def _tile_cost(job):
+    """
+    Estimates the work of a tile as its number of commands.
+    """
+    return sum(map(len, job[-1]))
+
+
+def _place_cars(field, fleet, placed):
+    """
+    Records the positions of the cars that have executed a command in field.occupied_positions.
+    """
+    for index in placed:
+        field.occupy_position(fleet.identifiers[index], fleet.xs[index], fleet.ys[index])
+
+
+def _get_default_executor():
+    """
+    Returns the executor shared by the tiled simulations, creating it on first use,
+    or the in-process one when called from a worker process.
+    """
+    if multiprocessing.parent_process() is not None:
+        return _worker_executor
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = SimulationExecutor(chunk_size=1)
+        return _default_executor
@@ -0,0 +1,131 @@
+from array import array
+from src.car import DELTAS, Car
+
+
+# Bit set in a step's byte when the car moved forward during that step; the low two bits hold the direction code
+MOVED = 4
+
+
+class Track:
+    """
+    The recorded trajectory of one car.
+
+    Each executed command is stored as a single byte: the car's direction code after the command,
+    and whether it moved one grid point forward. Absolute positions are kept every
+    keyframe_interval steps, so any step can be reconstructed without replaying the whole track.
+    Step 0 is the starting state; step k is the state after the k-th command.
+    """
+
+    __slots__ = ('keyframe_interval', 'steps', 'keyframes', 'start_heading', 'x', 'y')
+
+    def __init__(self, x, y, heading, keyframe_interval):
+        """
+        Starts a track at the given state.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.steps = bytearray()
+        self.keyframes = array('q', (x, y))  # (x, y) at steps 0, interval, 2 * interval, ...
+        self.start_heading = heading
+        self.x, self.y = x, y
+
+    def __len__(self):
+        """
+        Returns the number of recorded steps, not counting the starting state.
+        """
+        return len(self.steps)
+
+    def record(self, x, y, heading):
+        """
+        Records the car's state after one command.
+        """
+        if x != self.x or y != self.y:
+            self.steps.append(heading | MOVED)
+            self.x, self.y = x, y
+        else:
+            self.steps.append(heading)
+        if len(self.steps) % self.keyframe_interval == 0:
+            self.keyframes.append(x)
+            self.keyframes.append(y)
+
+    def state_at(self, step):
+        """
+        Returns the (x, y, direction) of the car at the given step.
+        Raises IndexError if the step was not recorded.
+        """
+        if not 0 <= step <= len(self.steps):
+            raise IndexError("Step out of range.")
+        for state in self.states(step, step + 1):
+            return state[1:]
+
+    def states(self, start=0, stop=None, every=1):
+        """
+        Yields (step, x, y, direction) for every `every`-th step in [start, stop), one at a time.
+        Only the steps from the nearest keyframe onwards are replayed.
+        """
+        if every < 1:
+            raise ValueError("Step interval must be at least 1.")
+        last = len(self.steps) if stop is None else min(stop - 1, len(self.steps))
+        if start > last:
+            return
+
+        interval = self.keyframe_interval
+        if every >= interval:
+            # Sparse samples: seek from the nearest keyframe for each one
+            for step in range(start, last + 1, every):
+                yield from self._replay(step, step)
+        else:
+            yield from self._replay(start, last, every)
+
+    def _replay(self, first, last, every=1):
+        """
+        Yields the sampled states from `first` to `last` (inclusive), replaying from the keyframe at or before `first`.
+        """
+        keyframe = first // self.keyframe_interval
+        step = keyframe * self.keyframe_interval
+        x, y = self.keyframes[2 * keyframe], self.keyframes[2 * keyframe + 1]
+        heading = self.steps[step - 1] & 3 if step else self.start_heading
+        steps = self.steps
+        directions = Car.directions
+
+        while True:
+            if step >= first and (step - first) % every == 0:
+                yield step, x, y, directions[heading]
+            if step >= last:
+                return
+            code = steps[step]
+            heading = code & 3
+            if code & MOVED:
+                delta_x, delta_y = DELTAS[heading]
+                x, y = x + delta_x, y + delta_y
+            step += 1
+
+
+class TrajectoryRecorder:
+    """
+    Records the per-step trajectories of the cars in a simulation, keyed by car identifier.
+    Pass it to Car.execute_commands or Field.simulate_multiple_cars.
+    """
+
+    def __init__(self, keyframe_interval=1024):
+        """
+        keyframe_interval: Number of steps between stored absolute positions.
+        """
+        if keyframe_interval < 1:
+            raise ValueError("Keyframe interval must be at least 1.")
+        self.keyframe_interval = keyframe_interval
+        self.tracks = {}  # car identifier -> Track, in the order the cars were first seen
+
+    def start(self, identifier, x, y, heading):
+        """
+        Returns the track of the car with the given identifier, starting it at the given state if it is new.
+        """
+        track = self.tracks.get(identifier)
+        if track is None:
+            track = self.tracks[identifier] = Track(x, y, heading, self.keyframe_interval)
+        return track
+
+    def track(self, car):
+        """
+        Returns the track of a Car, starting it at the car's current state if it is new.
+        """
+        return self.start(car.identifier, car.x, car.y, car.heading)
@@ -0,0 +1,181 @@
+from array import array
+import numpy as np
+from src.batch import DELTA_X, DELTA_Y, FORWARD, LEFT, RIGHT
+from src.budget import BudgetExceeded
+from src.fleet import CarFleet
+from src.program import CommandProgram
+
+
+# Number of steps whose commands are encoded into the command matrix at a time
+STEP_CHUNK = 1024
+
+
+def simulate_multiple_cars(field, cars_with_commands):
+    """
+    Step-synchronous multi-car simulation on coordinate and direction arrays.
+
+    Follows the rules of Field.simulate_multiple_cars: within a step the cars
+    move in order, a car only occupies its grid point once it has executed a
+    command, and a car whose commands ran out stays parked where it is.
+    Car identifiers are assumed to be unique.
+
+    The cars (or CarFleet) and field.occupied_positions are left in the same state as the
+    loop-based engine leaves them. Returns the same output string, or raises BudgetExceeded
+    if the field's budget runs out.
+    """
+    if isinstance(cars_with_commands, CarFleet):
+        fleet = cars_with_commands
+        cars = None
+        identifiers, command_strings = fleet.identifiers, fleet.commands
+        x = np.array(fleet.xs, dtype=np.int64)
+        y = np.array(fleet.ys, dtype=np.int64)
+        heading = np.array(fleet.headings, dtype=np.int64)
+    else:
+        fleet = None
+        cars = [car for car, _ in cars_with_commands]
+        identifiers = [car.identifier for car in cars]
+        command_strings = [commands for _, commands in cars_with_commands]
+        x = np.array([car.x for car in cars], dtype=np.int64)
+        y = np.array([car.y for car in cars], dtype=np.int64)
+        heading = np.array([car.heading for car in cars], dtype=np.int64)
+
+    lengths = np.array([len(commands) for commands in command_strings], dtype=np.int64)
+    max_steps = int(lengths.max())
+    width, height = field.width, field.height
+
+    # Positions never grow beyond the field or the starting positions, so they can be encoded as integers
+    stride = max(int(y.max()), height) + 1
+    indices = np.arange(len(identifiers))
+    bitmap = None
+    if field.obstacles is not None:
+        bitmap = np.frombuffer(field.obstacles.data, dtype=np.uint8)
+    has_commands = lengths > 0
+    no_cars = np.zeros(len(identifiers), dtype=bool)
+    budget = field.budget
+
+    for chunk_start in range(0, max_steps, STEP_CHUNK):
+        chunk = _encode_step_chunk(command_strings, chunk_start, min(chunk_start + STEP_CHUNK, max_steps))
+
+        for offset, column in enumerate(chunk):
+            step = chunk_start + offset
+            moving = lengths > step
+            occupied = has_commands if step > 0 else no_cars
+            if budget is not None:
+                try:
+                    budget.check(step)
+                except BudgetExceeded:
+                    _write_back(field, fleet, cars, identifiers, x, y, heading, occupied, None)
+                    raise
+
+            new_heading = (heading - (column == LEFT) + (column == RIGHT)) % 4
+            new_x = x + DELTA_X[new_heading]
+            new_y = y + DELTA_Y[new_heading]
+            move = (column == FORWARD) & (new_x >= 0) & (new_x < width) & (new_y >= 0) & (new_y < height)
+            if bitmap is not None:
+                move &= ~_is_blocked(bitmap, width, new_x, new_y, move)
+            new_x = np.where(move, new_x, x)
+            new_y = np.where(move, new_y, y)
+
+            collision = _find_collision(x * stride + y, new_x * stride + new_y, moving, occupied, indices)
+            if collision is not None:
+                car_index, other_index = collision
+                # Cars up to and including the colliding car have executed this step's command
+                executed = indices <= car_index
+                x = np.where(executed, new_x, x)
+                y = np.where(executed, new_y, y)
+                heading = np.where(executed, new_heading, heading)
+                _write_back(field, fleet, cars, identifiers, x, y, heading, occupied | (moving & executed), car_index)
+
+                car_ids = sorted([identifiers[car_index], identifiers[other_index]])
+                return f"{car_ids[0]} {car_ids[1]}\n{x[car_index]} {y[car_index]}\n{step + 1}"
+
+            x, y, heading = new_x, new_y, new_heading
+
+    _write_back(field, fleet, cars, identifiers, x, y, heading, has_commands, None)
+    return "no collision"
+
+
+def _encode_step_chunk(command_strings, start, stop):
+    """
+    Encodes the commands of steps [start, stop) as a (steps, cars) uint8 matrix.
+    Cars without a command at a step get 0, which is ignored. Compiled programs
+    contribute their opcodes without being encoded again.
+    """
+    chunk = np.zeros((stop - start, len(command_strings)), dtype=np.uint8)
+    for column, commands in enumerate(command_strings):
+        if len(commands) > start:
+            if isinstance(commands, CommandProgram):
+                encoded = np.frombuffer(commands.opcodes, dtype=np.uint8, count=min(stop, len(commands)) - start,
+                                        offset=start)
+            else:
+                encoded = np.frombuffer(commands[start:stop].encode('ascii'), dtype=np.uint8)
+            chunk[:len(encoded), column] = encoded
+    return chunk
+
+
+def _is_blocked(bitmap, width, x, y, on_field):
+    """
+    Looks up the grid points (x, y) in a packed obstacle bitmap. Grid points off the field,
+    where on_field is False, are reported as not blocked.
+    """
+    index = np.where(on_field, y * width + x, 0)
+    return on_field & (((bitmap[index >> 3] >> (index & 7)) & 1) == 1)
+
+
+def _find_collision(old_keys, new_keys, moving, occupied, indices):
+    """
+    Finds the first car (in processing order) whose move in this step lands on an occupied grid point.
+
+    Each car contributes entries describing where it is seen by the other cars during the step:
+    - a parked or stationary car that already occupies a grid point is seen there by every car;
+    - a car that moves is seen at its new position by the cars after it,
+      and (if it already occupied a grid point) at its old position by the cars before it.
+
+    Returns (car index, other car index), or None if the step has no collision.
+    """
+    stationary = occupied & (~moving | (old_keys == new_keys))
+    arriving = moving & ~stationary
+    leaving = arriving & occupied
+
+    keys = np.concatenate((old_keys[stationary], new_keys[arriving], old_keys[leaving]))
+    if len(keys) < 2:
+        return None
+
+    sorted_keys = np.sort(keys)
+    duplicated = sorted_keys[1:] == sorted_keys[:-1]
+    if not duplicated.any():
+        return None
+
+    # Only a few grid points are shared, so the exact order-dependent check is done on those alone
+    shared_keys = np.unique(sorted_keys[1:][duplicated])
+    candidates = indices[moving & np.isin(new_keys, shared_keys)]
+    for car_index in candidates.tolist():
+        key = new_keys[car_index]
+        for other_index in np.flatnonzero(stationary & (old_keys == key)).tolist():
+            if other_index != car_index:
+                return car_index, other_index
+        for other_index in np.flatnonzero(arriving[:car_index] & (new_keys[:car_index] == key)).tolist():
+            return car_index, other_index
+        later = car_index + 1
+        for other_index in np.flatnonzero(leaving[later:] & (old_keys[later:] == key)).tolist():
+            return car_index, later + other_index
+    return None
+
+
+def _write_back(field, fleet, cars, identifiers, x, y, heading, occupied, collided_index):
+    """
+    Copies the final array state back onto the fleet or Car objects and the field's occupied positions.
+    """
+    if fleet is not None:
+        fleet.xs, fleet.ys, fleet.headings = array('q', x.tolist()), array('q', y.tolist()), array('b', heading.tolist())
+    else:
+        for car, car_x, car_y, car_heading in zip(cars, x.tolist(), y.tolist(), heading.tolist()):
+            car.x, car.y, car.heading = car_x, car_y, car_heading
+
+    x, y = x.tolist(), y.tolist()
+    for index in np.flatnonzero(occupied).tolist():
+        if index == collided_index:
+            # The colliding car was removed from the field before its move and never re-added
+            field.release_position(identifiers[index])
+        else:
+            field.occupy_position(identifiers[index], x[index], y[index])
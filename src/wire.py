@@ -0,0 +1,233 @@
+"""
+Binary wire format for bulk simulation traffic. All integers are little-endian and unsigned.
+
+A request body holds one or more scenario frames, back to back:
+- REQUEST_HEADER: magic b'ADC1', part (1 or 2), field width, field height and car count;
+- one CAR_RECORD per car: x, y, direction code (0-3 for N, E, S, W), identifier length in
+  bytes and number of commands;
+- the car identifiers (UTF-8), concatenated (Part 1 cars have none);
+- each car's commands packed 2 bits per command (F = 0, L = 1, R = 2), four commands per
+  byte from the least significant bits, every car starting on a new byte.
+
+The response holds one RESULT_RECORD per frame, in order: a status, then
+- RESULT_POSITION (Part 1): the car's x, y and direction code;
+- RESULT_NO_COLLISION (Part 2);
+- RESULT_COLLISION (Part 2): x, y and (1-based) step of the collision and the indices of the
+  two cars in the frame, in the order the text output names them;
+- RESULT_ERROR and RESULT_PARTIAL: `length` bytes of UTF-8 text follow the record: the error
+  message, or the partial result of a simulation that ran out of its budget.
+"""
+import io
+import struct
+from itertools import product
+from src.car import DIRECTION_CODES, Car
+from src.parser import InputError, Part1Scenario, Part2Scenario
+
+
+MAGIC = b'ADC1'
+
+# magic, part, width, height, car count
+REQUEST_HEADER = struct.Struct('<4sB3xIII')
+
+# x, y, direction code, identifier length, command count
+CAR_RECORD = struct.Struct('<IIBB2xI')
+
+# status, direction code, x, y, step, first car, second car, length of the text that follows
+RESULT_RECORD = struct.Struct('<BB2xIIIIII')
+
+# Result statuses
+RESULT_POSITION = 0
+RESULT_NO_COLLISION = 1
+RESULT_COLLISION = 2
+RESULT_ERROR = 3
+RESULT_PARTIAL = 4
+
+# 2-bit command codes, as a bytes.translate table from command characters
+PACK_CODES = bytes.maketrans(b'FLR', b'\x00\x01\x02')
+
+# Packed byte of each group of four command codes
+PACK_TABLE = {codes: codes[0] | codes[1] << 2 | codes[2] << 4 | codes[3] << 6 for codes in product(range(3), repeat=4)}
+
+# The four commands of each packed byte. Code 3 is not a command and decodes as 'X'.
+UNPACK_TABLE = tuple(bytes(b'FLRX'[(byte >> shift) & 3] for shift in (0, 2, 4, 6)) for byte in range(256))
+
+
+def pack_commands(commands):
+    """
+    Packs a command string (of 'F', 'L' and 'R' only) 2 bits per command.
+    """
+    codes = iter(commands.encode('ascii').translate(PACK_CODES) + b'\x00' * (-len(commands) % 4))
+    return bytes(map(PACK_TABLE.__getitem__, zip(codes, codes, codes, codes)))
+
+
+def unpack_commands(packed, count):
+    """
+    Returns the first `count` commands of packed bytes (any buffer) as a string,
+    expanding whole bytes through a lookup table.
+    """
+    return b''.join(map(UNPACK_TABLE.__getitem__, memoryview(packed)[:(count + 3) // 4])).decode('ascii')[:count]
+
+
+def encode_scenario(scenario):
+    """
+    Encodes a Part1Scenario or Part2Scenario (with plain command strings) as a request frame.
+    """
+    if isinstance(scenario, Part1Scenario):
+        part, cars = 1, [('', scenario.x, scenario.y, scenario.direction, scenario.commands)]
+    else:
+        part, cars = 2, scenario.cars
+    identifiers = [car_id.encode() for car_id, *_ in cars]
+    chunks = [REQUEST_HEADER.pack(MAGIC, part, scenario.width, scenario.height, len(cars))]
+    chunks.extend(CAR_RECORD.pack(x, y, DIRECTION_CODES[direction], len(identifier), len(commands))
+                  for identifier, (_, x, y, direction, commands) in zip(identifiers, cars))
+    chunks.extend(identifiers)
+    chunks.extend(pack_commands(str(commands)) for *_, commands in cars)
+    return b''.join(chunks)
+
+
+def read_scenarios(stream, part):
+    """
+    Yields the scenarios of the request frames read from a binary stream: a Part1Scenario
+    or Part2Scenario, or the InputError describing an invalid frame. A frame that cannot be
+    delimited (wrong magic or truncated) ends the stream after its error.
+    """
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    while True:
+        header = stream.read(REQUEST_HEADER.size)
+        if not header:
+            return
+        try:
+            if len(header) < REQUEST_HEADER.size:
+                raise InputError("Truncated request frame.")
+            magic, frame_part, width, height, car_count = REQUEST_HEADER.unpack(header)
+            if magic != MAGIC:
+                raise InputError("Invalid request frame.")
+            records = _read_exactly(stream, CAR_RECORD.size * car_count)
+            cars = list(CAR_RECORD.iter_unpack(records))
+            identifiers = _read_exactly(stream, sum(car[3] for car in cars))
+            commands = _read_exactly(stream, sum((car[4] + 3) // 4 for car in cars))
+        except InputError as e:
+            yield e
+            return
+
+        try:
+            if frame_part != part:
+                raise InputError(f"Expected a Part {part} request frame.")
+            yield _decode_scenario(part, width, height, cars, memoryview(identifiers), memoryview(commands))
+        except InputError as e:
+            yield e
+
+
+def _read_exactly(stream, size):
+    """
+    Reads `size` bytes from the stream. Raises InputError if it ends before.
+    """
+    if not size:
+        return b''
+    data = stream.read(size)
+    if len(data) < size:
+        raise InputError("Truncated request frame.")
+    return data
+
+
+def _decode_scenario(part, width, height, cars, identifiers, commands):
+    """
+    Builds the scenario of a frame from its unpacked car records and its identifier
+    and command buffers. Raises InputError with the text parser's messages if it is invalid.
+    """
+    if part == 1 and len(cars) != 1:
+        raise InputError("Please provide exactly 3 lines of input.")
+    if part == 2 and len(cars) < 2:
+        raise InputError("Invalid input format. Please provide field size and details for each car.")
+
+    decoded = []
+    id_offset = command_offset = 0
+    for x, y, direction_code, id_length, command_count in cars:
+        car_id = str(identifiers[id_offset:id_offset + id_length], 'utf-8', 'replace')
+        id_offset += id_length
+        car_commands = unpack_commands(commands[command_offset:], command_count)
+        command_offset += (command_count + 3) // 4
+
+        if direction_code >= len(Car.directions):
+            if part == 1:
+                raise InputError("Initial direction must be one of 'N', 'E', 'S', or 'W'.")
+            raise InputError(f"Invalid direction for car {car_id}. Must be one of 'N', 'E', 'S', 'W'.")
+        if 'X' in car_commands:
+            if part == 1:
+                raise InputError("Commands must be a sequence of 'R', 'L', and 'F' only.")
+            raise InputError(f"Invalid commands for car {car_id}. Must be 'R', 'L', 'F' only.")
+        decoded.append((car_id, x, y, Car.directions[direction_code], car_commands))
+
+    if part == 1:
+        _, x, y, direction, car_commands = decoded[0]
+        return Part1Scenario(width, height, x, y, direction, car_commands)
+    return Part2Scenario(width, height, tuple(decoded))
+
+
+def encode_result(scenario, outcome, output):
+    """
+    Encodes the ('result', output) or ('error', message) outcome of a scenario
+    (see simulate_batch_item) as a result record.
+    """
+    if outcome == 'error' or output.startswith('budget exceeded'):
+        text = output.encode()
+        status = RESULT_ERROR if outcome == 'error' else RESULT_PARTIAL
+        return RESULT_RECORD.pack(status, 0, 0, 0, 0, 0, 0, len(text)) + text
+
+    if isinstance(scenario, Part1Scenario):
+        x, y, direction = output.split()
+        return RESULT_RECORD.pack(RESULT_POSITION, DIRECTION_CODES[direction], int(x), int(y), 0, 0, 0, 0)
+    if output == "no collision":
+        return RESULT_RECORD.pack(RESULT_NO_COLLISION, 0, 0, 0, 0, 0, 0, 0)
+
+    names, position, step = output.split('\n')
+    x, y = position.split()
+    first, second = _collision_cars(scenario, names)
+    return RESULT_RECORD.pack(RESULT_COLLISION, 0, int(x), int(y), int(step), first, second, 0)
+
+
+def _collision_cars(scenario, names):
+    """
+    Returns the indices of the two cars named "first second" in a collision output.
+    Identifiers may contain spaces, so every split is tried.
+    """
+    indices = {}
+    for index, (car_id, *_) in enumerate(scenario.cars):
+        indices.setdefault(car_id, index)
+    position = names.find(' ')
+    while position != -1:
+        first, second = indices.get(names[:position]), indices.get(names[position + 1:])
+        if first is not None and second is not None:
+            return first, second
+        position = names.find(' ', position + 1)
+    raise ValueError(f"Unknown cars in collision output: {names}")
+
+
+def iter_results(data):
+    """
+    Yields (status, direction code, x, y, step, first car, second car, text) for each
+    result record in a response body.
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        *fields, length = RESULT_RECORD.unpack_from(view, offset)
+        offset += RESULT_RECORD.size
+        yield (*fields, str(view[offset:offset + length], 'utf-8'))
+        offset += length
+
+
+def format_result(result, identifiers=()):
+    """
+    Formats a decoded result record as the text API would, given the frame's car identifiers.
+    Errors are formatted as the text endpoints report them.
+    """
+    status, direction_code, x, y, step, first, second, text = result
+    if status in (RESULT_ERROR, RESULT_PARTIAL):
+        return text
+    if status == RESULT_POSITION:
+        return f"{x} {y} {Car.directions[direction_code]}"
+    if status == RESULT_NO_COLLISION:
+        return "no collision"
+    return f"{identifiers[first]} {identifiers[second]}\n{x} {y}\n{step}"
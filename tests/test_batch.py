@@ -0,0 +1,66 @@
+import random
+import unittest
+from src.batch import encode_commands, encode_directions, simulate_single_cars
+from src.car import Car
+from src.field import Field
+
+class TestBatch(unittest.TestCase):
+    """
+    Unit tests for the vectorized single-car batch engine.
+    """
+
+    def test_sample_scenario(self):
+        """
+        Test the batch engine with the sample Part 1 scenario.
+        """
+        result = simulate_single_cars([10], [10], [1], [2], ['N'], encode_commands(["FFRFFFRRLF"]))
+        self.assertEqual(result, ["4 3 S"])
+
+    def test_matches_car_reference(self):
+        """
+        Test that the batch engine matches Car.execute_commands on random scenarios,
+        including cars off the field, empty command sequences and invalid commands.
+        """
+        rng = random.Random(3)
+        scenarios = []
+        for _ in range(300):
+            width, height = rng.randint(0, 8), rng.randint(0, 8)
+            x, y = rng.randint(0, width + 1), rng.randint(0, height + 1)
+            direction = rng.choice('NESW')
+            commands = ''.join(rng.choice('FFFLRX') for _ in range(rng.randint(0, 30)))
+            scenarios.append((width, height, x, y, direction, commands))
+
+        expected = []
+        for width, height, x, y, direction, commands in scenarios:
+            car = Car(x, y, direction)
+            car.execute_commands(commands, Field(width, height))
+            expected.append(car.get_position())
+
+        widths, heights, xs, ys, directions, command_strings = zip(*scenarios)
+        result = simulate_single_cars(widths, heights, xs, ys, directions, encode_commands(command_strings))
+        self.assertEqual(result, expected)
+
+    def test_direction_codes(self):
+        """
+        Test that directions can be given as codes as well as strings.
+        """
+        codes = encode_directions(['N', 'E', 'S', 'W'])
+        self.assertEqual(codes.tolist(), [0, 1, 2, 3])
+        result = simulate_single_cars([5] * 4, [5] * 4, [2] * 4, [2] * 4, codes, encode_commands(["F"] * 4))
+        self.assertEqual(result, ["2 3 N", "3 2 E", "2 1 S", "1 2 W"])
+
+    def test_invalid_input(self):
+        """
+        Test the batch engine with invalid parameters.
+        """
+        with self.assertRaises(ValueError):
+            encode_directions(['X'])
+        with self.assertRaises(ValueError):
+            simulate_single_cars([-1], [10], [0], [0], ['N'], encode_commands(["F"]))
+        with self.assertRaises(ValueError):
+            simulate_single_cars([10], [10], [-1], [0], ['N'], encode_commands(["F"]))
+        with self.assertRaises(ValueError):
+            simulate_single_cars([10, 10], [10], [0], [0], ['N'], encode_commands(["F"]))
+
+if __name__ == '__main__':
+    unittest.main()
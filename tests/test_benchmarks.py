@@ -0,0 +1,139 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from app import app
+from benchmarks.load import build_requests, main as load_main, parse_mix, run_load, summarize
+from benchmarks.run import BENCHMARKS, compare, main, percentile
+from benchmarks.scenarios import fleet_scenario, format_part2, generate_route, single_car_scenario
+from src.parser import parse_part2
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Unit tests for the benchmark scenario generators, baseline comparison and load generator.
+    """
+
+    def test_generators_are_seeded(self):
+        """
+        Test that the same seed always generates the same scenarios.
+        """
+        self.assertEqual(single_car_scenario(1, 50, 100, 'forward'), single_car_scenario(1, 50, 100, 'forward'))
+        self.assertEqual(fleet_scenario(2, 50, 10, 30, 'crowd'), fleet_scenario(2, 50, 10, 30, 'crowd'))
+        self.assertNotEqual(fleet_scenario(2, 50, 10, 30), fleet_scenario(3, 50, 10, 30))
+
+    def test_route_shapes(self):
+        """
+        Test that every route shape has the requested length and only valid commands.
+        """
+        rng = random.Random(1)
+        for shape in ('random', 'forward', 'crowd'):
+            route = generate_route(rng, 5000, shape)
+            self.assertEqual(len(route), 5000)
+            self.assertLessEqual(set(route), set('FLR'))
+        self.assertGreater(generate_route(rng, 5000, 'forward').count('F'), 4800)
+        with self.assertRaises(ValueError):
+            generate_route(rng, 10, 'zigzag')
+
+    def test_crowd_positions(self):
+        """
+        Test that crowd scenarios pack distinct starting positions into the middle of the field.
+        """
+        scenario = fleet_scenario(5, 1000, 100, 10, 'crowd')
+        positions = {(x, y) for _, x, y, _, _ in scenario.cars}
+        self.assertEqual(len(positions), 100)
+        self.assertTrue(all(480 <= x < 520 and 480 <= y < 520 for x, y in positions))
+        self.assertEqual(parse_part2(format_part2(scenario)), scenario)
+
+    def test_percentile_and_compare(self):
+        """
+        Test the percentile helper and regression flagging against a baseline.
+        """
+        timings = [0.1 * number for number in range(1, 11)]
+        self.assertAlmostEqual(percentile(timings, 0.5), 0.5)
+        self.assertAlmostEqual(percentile(timings, 0.99), 1.0)
+
+        baseline = {'results': {'fast': {'p50': 1.0}, 'slow': {'p50': 1.0}}}
+        results = {'fast': {'p50': 1.1}, 'slow': {'p50': 1.5}, 'new': {'p50': 9.0}}
+        self.assertEqual(compare(results, baseline, 0.25), [('slow', 1.0, 1.5, 1.5)])
+
+    def test_committed_baseline(self):
+        """
+        Test that the committed baseline is a --quick report covering every case,
+        and that it cannot be compared with a full-size run.
+        """
+        path = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'baseline.json')
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.assertTrue(baseline['meta']['quick'])
+        self.assertEqual(set(baseline['results']), {benchmark.name for benchmark in BENCHMARKS})
+        with self.assertRaises(SystemExit):
+            main(['--only', 'field_check_collision', '--compare', path])
+
+    def test_compare_warns_about_other_platforms(self):
+        """
+        Test that comparing with a baseline recorded on another platform warns about it.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w') as baseline_file:
+                json.dump({'meta': {'platform': 'elsewhere', 'quick': True}, 'results': {}}, baseline_file)
+            errors = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+                self.assertEqual(main(['--quick', '--repeat', '1', '--only', 'field_check_collision',
+                                       '--compare', path]), 0)
+        self.assertIn("Warning: the baseline was recorded on elsewhere", errors.getvalue())
+
+    def test_parse_mix(self):
+        """
+        Test that request mixes are parsed and invalid shapes or weights are rejected.
+        """
+        self.assertEqual(parse_mix(['part1_short=3', 'part2_pair']), {'part1_short': 3.0, 'part2_pair': 1.0})
+        for values in (['zigzag=1'], ['part1_short=x'], ['part1_short=-1'], ['part1_short=0']):
+            with self.assertRaises(ValueError):
+                parse_mix(values)
+
+    def test_load_report(self):
+        """
+        Test that a load run through the test client reports every request, by shape and by endpoint.
+        """
+        app.config['RESULT_CACHE_ENABLED'] = False
+        try:
+            requests = build_requests({'part1_short': 1, 'part2_pair': 1}, 20, 0.1, seed=3)
+            self.assertEqual(requests, build_requests({'part1_short': 1, 'part2_pair': 1}, 20, 0.1, seed=3))
+            elapsed, samples = run_load(app, requests, concurrency=4)
+        finally:
+            app.config['RESULT_CACHE_ENABLED'] = True
+        results = summarize(elapsed, samples)
+        self.assertEqual(len(samples), 20)
+        self.assertEqual(results['/simulate_part1']['requests'] + results['/simulate_part2']['requests'], 20)
+        self.assertEqual(results['part1_short']['requests'], results['/simulate_part1']['requests'])
+        for result in results.values():
+            self.assertEqual(result['error_rate'], 0)
+            self.assertLessEqual(result['p50'], result['p95'])
+            self.assertLessEqual(result['p95'], result['p99'])
+
+    def test_load_compare_requires_same_settings(self):
+        """
+        Test that a load run is only compared with a baseline recorded with the same settings.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            arguments = ['--quick', '--requests', '10', '--mix', 'part1_short', '--concurrency', '2']
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(load_main(arguments + ['--output', path]), 0)
+                    self.assertIn(load_main(arguments + ['--compare', path]), (0, 1))
+                    for changed in (['--mix', 'part2_pair'], ['--concurrency', '4'], ['--transport', 'server'],
+                                    ['--cache']):
+                        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                            load_main(arguments + changed + ['--compare', path])
+                    with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                        load_main(arguments[1:] + ['--compare', path])
+            finally:
+                app.config['RESULT_CACHE_ENABLED'] = True
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import pickle
+import random
+import unittest
+from src.budget import CHECK_INTERVAL, BudgetExceeded, SimulationBudget
+from src.car import Car
+from src.field import ENGINES, Field
+from src.fleet import CarFleet
+from src.obstacles import ObstacleMap
+from src.parser import parse_part1, parse_part2, parse_repetitions
+from src.program import CommandProgram
+from src.session import SimulationSession
+from src.simulation import iter_part2_collisions, simulate_batch_item, simulate_part1, simulate_part2
+from src.trajectory import TrajectoryRecorder
+
+class StepClock:
+    """
+    A fake clock that advances by one second every time it is read.
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+class TestSimulationBudget(unittest.TestCase):
+    """
+    Unit tests for simulation budgets and their checks in the engines.
+    """
+
+    def test_step_limit(self):
+        """
+        Test the number of lockstep steps that fit in a commands budget.
+        """
+        self.assertIsNone(SimulationBudget().step_limit([5, 7]))
+        self.assertIsNone(SimulationBudget(max_commands=12).step_limit([5, 7]))
+        self.assertEqual(SimulationBudget(max_commands=11).step_limit([5, 7]), 6)
+        self.assertEqual(SimulationBudget(max_commands=9).step_limit([5, 7]), 4)
+        self.assertEqual(SimulationBudget(max_commands=0).step_limit([5, 7]), 0)
+        self.assertEqual(SimulationBudget(max_commands=4).step_limit([0, 1, 10]), 3)
+
+    def test_time_limit(self):
+        """
+        Test that the time limit only runs once the budget is started.
+        """
+        budget = SimulationBudget(max_seconds=1, clock=StepClock())
+        budget.check(0)
+        started = budget.start()
+        started.check(0)
+        with self.assertRaises(BudgetExceeded) as context:
+            started.check(5)
+        self.assertEqual((context.exception.reason, context.exception.step), ('time', 5))
+
+        error = pickle.loads(pickle.dumps(BudgetExceeded('time', 3, ["1 2 N"])))
+        self.assertEqual(error.partial_result(), "budget exceeded: time\n3\n1 2 N")
+
+    def test_engines_stop_at_step_boundary(self):
+        """
+        Test that every engine stops with the cars at the step reached when time runs out.
+        """
+        for engine in ENGINES:
+            budget = SimulationBudget(max_seconds=0, clock=StepClock()).start()
+            field = Field(20, 20, budget=budget)
+            fleet = CarFleet()
+            fleet.add(0, 0, 'N', 'A', 'F' * 10)
+            fleet.add(5, 0, 'N', 'B', 'F' * 10)
+            with self.assertRaises(BudgetExceeded) as context:
+                field.simulate_multiple_cars(fleet, engine=engine)
+            step = context.exception.step
+            self.assertLess(step, 10, engine)
+            self.assertEqual([fleet.get_position(index) for index in range(2)],
+                             [f"0 {step} N", f"5 {step} N"], engine)
+
+    def test_long_commands_are_checked(self):
+        """
+        Test that a single car checks the budget between chunks of commands.
+        """
+        car = Car(0, 0, 'E')
+        field = Field(10, 10, budget=SimulationBudget(max_seconds=1, clock=StepClock()).start())
+        with self.assertRaises(BudgetExceeded) as context:
+            car.execute_commands('LR' * CHECK_INTERVAL, field)
+        self.assertEqual(context.exception.step, CHECK_INTERVAL)
+        self.assertEqual(car.get_position(), "0 0 E")
+
+        # Compiled programs run their own segments between checks, with the same result
+        program = CommandProgram('FFL' * CHECK_INTERVAL)
+        segments = program.segments
+        car = Car(1, 1, 'N')
+        field = Field(10, 10, budget=SimulationBudget(max_seconds=1, clock=StepClock()).start())
+        with self.assertRaises(BudgetExceeded) as context:
+            car.execute_commands(program, field)
+        expected = Car(1, 1, 'N')
+        expected.execute_commands(program[:context.exception.step], Field(10, 10))
+        self.assertEqual(car.get_position(), expected.get_position())
+        self.assertEqual(context.exception.step, CHECK_INTERVAL - CHECK_INTERVAL % 12)  # 8 runs of FF and L per segment
+        self.assertIs(program.segments, segments)
+
+        rng = random.Random(3)
+        for _ in range(2):
+            program = CommandProgram(''.join(rng.choices('FFFLR', k=3 * CHECK_INTERVAL)))
+            car, expected = Car(5, 5, 'N'), Car(5, 5, 'N')
+            car.execute_commands(program, Field(50, 50, budget=SimulationBudget(max_seconds=60).start()))
+            expected.execute_commands(program, Field(50, 50))
+            self.assertEqual(car.get_position(), expected.get_position())
+
+        # Repeated programs check it between their iterations, nested ones counting from their first step
+        for commands in ("(FFFF)100000", "F(FFFF)100000"):
+            car = Car(0, 0, 'E')
+            field = Field(500000, 1, ObstacleMap(500000, 1),
+                          budget=SimulationBudget(max_seconds=0, clock=StepClock()).start())
+            with self.assertRaises(BudgetExceeded) as context:
+                car.execute_commands(parse_repetitions(commands), field)
+            self.assertEqual(context.exception.reason, 'time')
+            self.assertEqual(context.exception.step, CHECK_INTERVAL + len(commands) % 2)
+            self.assertEqual(car.get_position(), f"{context.exception.step} 0 E")
+
+    def test_partial_results(self):
+        """
+        Test the partial results of simulations running out of commands or refusing too many cars.
+        """
+        scenario = parse_part1("10 10\n1 2 N\nFFRFFFRRLF")
+        self.assertEqual(simulate_part1(scenario, budget=SimulationBudget(max_commands=10)), "4 3 S")
+        with self.assertRaises(BudgetExceeded) as context:
+            simulate_part1(scenario, budget=SimulationBudget(max_commands=4))
+        self.assertEqual(context.exception.partial_result(), "budget exceeded: commands\n4\n2 4 E")
+        with self.assertRaises(BudgetExceeded) as context:
+            simulate_part1(parse_part1("10 10\n1 2 N\n(FFR)1000000000"), budget=SimulationBudget(max_commands=7))
+        self.assertEqual(context.exception.positions, ("3 3 S",))
+
+        scenario = parse_part2("10 10\nA\n1 2 N\nFFRFFFFRRL\nB\n7 8 W\nFFLFFFFFFF")
+        self.assertEqual(simulate_part2(scenario, budget=SimulationBudget(max_commands=14)), "A B\n5 4\n7")
+        with self.assertRaises(BudgetExceeded) as context:
+            simulate_part2(scenario, 'numpy', budget=SimulationBudget(max_commands=13))
+        self.assertEqual(context.exception.partial_result(), "budget exceeded: commands\n6\nA 4 4 E\nB 5 5 S")
+        with self.assertRaises(ValueError):
+            simulate_part2(scenario, budget=SimulationBudget(max_cars=1))
+
+        item = (scenario, 'python')
+        self.assertEqual(simulate_batch_item(item, budget=SimulationBudget(max_commands=0)),
+                         ('result', "budget exceeded: commands\n0\nA 1 2 N\nB 7 8 W"))
+
+    def test_collisions_sessions_and_recordings(self):
+        """
+        Test budgets on all-collisions simulations, session updates and recorded simulations.
+        """
+        scenario = parse_part2("5 5\nA\n1 1 E\nFF\nB\n3 1 W\nFF\nD\n2 4 S\nFFFF")
+        events = iter_part2_collisions(scenario, budget=SimulationBudget(max_commands=5))
+        self.assertEqual(next(events).car_ids, ('A', 'B'))
+        with self.assertRaises(BudgetExceeded) as context:
+            next(events)
+        self.assertEqual(context.exception.partial_result(), "budget exceeded: commands\n1\nA 2 1 E\nB 2 1 W\nD 2 3 S")
+        self.assertEqual(len(list(iter_part2_collisions(scenario, budget=SimulationBudget(max_commands=8)))), 2)
+        with self.assertRaises(BudgetExceeded) as context:
+            list(iter_part2_collisions(scenario, budget=SimulationBudget(max_seconds=0, clock=StepClock())))
+        self.assertEqual(context.exception.step, 0)
+
+        session = SimulationSession.from_scenario(parse_part2("10 10\nA\n1 2 N\nFF\nB\n7 8 W\nFF"))
+        with self.assertRaises(BudgetExceeded) as context:
+            session.append_commands([('A', 'FFFF'), ('B', 'F')], SimulationBudget(max_commands=3))
+        self.assertEqual(context.exception.partial_result(), "budget exceeded: commands\n4\nA 1 6 N\nB 4 8 W")
+        self.assertEqual((session.step, session.commands_executed), (4, 7))
+        self.assertEqual(session.append_commands([('B', 'L')]), "no collision")
+        with self.assertRaises(ValueError):
+            SimulationSession.from_scenario(scenario, SimulationBudget(max_cars=2))
+
+        recorder = TrajectoryRecorder()
+        budget = SimulationBudget(max_seconds=1, clock=StepClock())
+        with self.assertRaises(BudgetExceeded) as context:
+            simulate_part1(parse_part1("10 10\n1 2 N\n" + 'LR' * CHECK_INTERVAL), recorder=recorder, budget=budget)
+        self.assertEqual(context.exception.step, CHECK_INTERVAL)
+        self.assertEqual(len(list(recorder.tracks[None].states())), CHECK_INTERVAL + 1)
+
+if __name__ == '__main__':
+    unittest.main()
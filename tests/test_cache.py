@@ -0,0 +1,82 @@
+import threading
+import unittest
+from src.cache import ENTRY_OVERHEAD, ResultCache, scenario_key
+from src.parser import parse_part1, parse_part2
+
+class TestResultCache(unittest.TestCase):
+    """
+    Unit tests for the LRU result cache.
+    """
+
+    def test_hits_and_misses(self):
+        """
+        Test that cached results are returned and counted.
+        """
+        cache = ResultCache()
+        self.assertIsNone(cache.get(b'a'))
+        cache.put(b'a', "1 2 N")
+        self.assertEqual(cache.get(b'a'), "1 2 N")
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1,
+                                         'bytes': 1 + 5 + ENTRY_OVERHEAD})
+
+    def test_lru_eviction_by_entries(self):
+        """
+        Test that the least recently used result is evicted first.
+        """
+        cache = ResultCache(max_entries=2)
+        cache.put(b'a', "A")
+        cache.put(b'b', "B")
+        cache.get(b'a')
+        cache.put(b'c', "C")
+        self.assertEqual(cache.get(b'b'), None)
+        self.assertEqual(cache.get(b'a'), "A")
+        self.assertEqual(cache.get(b'c'), "C")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_eviction_by_bytes(self):
+        """
+        Test that the total size stays within the byte limit and oversized results are skipped.
+        """
+        cache = ResultCache(max_bytes=2 * (ENTRY_OVERHEAD + 11))
+        cache.put(b'a', "x" * 10)
+        cache.put(b'b', "x" * 10)
+        cache.put(b'c', "x" * 10)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(b'a'))
+        cache.put(b'd', "x" * 1000)
+        self.assertIsNone(cache.get(b'd'))
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+    def test_concurrent_access(self):
+        """
+        Test that the counters stay consistent when the cache is used from several threads.
+        """
+        cache = ResultCache(max_entries=8)
+
+        def worker(number):
+            for i in range(500):
+                key = bytes([number, i % 16])
+                if cache.get(key) is None:
+                    cache.put(key, str(i))
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.hits + cache.misses, 2000)
+        self.assertLessEqual(len(cache), 8)
+
+    def test_scenario_key(self):
+        """
+        Test that equivalent inputs share a key and different scenarios do not.
+        """
+        key = scenario_key(parse_part1("10 10\n1 2 N\nFFRL"))
+        self.assertEqual(key, scenario_key(parse_part1("\n10  10\r\n1 2 N\nFFRL\n")))
+        self.assertNotEqual(key, scenario_key(parse_part1("10 10\n1 2 N\nFFRR")))
+
+        part2 = parse_part2("10 10\nA\n1 2 N\nFF\nB\n3 3 S\nL")
+        self.assertNotEqual(scenario_key(part2), scenario_key(parse_part2("10 10\nA\n1 2 N\nF\nB\n3 3 S\nFL")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 from src.car import Car
 from src.field import Field
@@ -21,6 +22,20 @@ class TestCar(unittest.TestCase):
         car = Car(1, 2, 'N', 'A')
         self.assertEqual(car.get_position_with_id(), "A 1 2 N")
 
+    def test_compact_representation(self):
+        """
+        Test that the car stores its direction as a code and has no per-instance dictionary.
+        """
+        car = Car(1, 2, 'S', 'A')
+        self.assertEqual(car.heading, 2)
+        self.assertEqual(car.direction, 'S')
+        self.assertFalse(hasattr(car, '__dict__'))
+
+        car.direction = 'W'
+        self.assertEqual(car.get_position_with_id(), "A 1 2 W")
+        with self.assertRaises(ValueError):
+            car.direction = 'X'
+
     def test_rotate_left(self):
         """
         Test the car's rotation to the left.
@@ -98,6 +113,44 @@ class TestCar(unittest.TestCase):
         car.execute_commands(commands, field)
         self.assertEqual(car.get_position(), "4 4 S")
 
+    def test_turn(self):
+        """
+        Test that turning by several quarter turns matches repeated single rotations.
+        """
+        car = Car(1, 2, 'N')
+        car.turn(3)
+        self.assertEqual(car.get_position(), "1 2 W")
+        car.turn(-6)
+        self.assertEqual(car.get_position(), "1 2 E")
+
+    def test_execute_commands_run_length(self):
+        """
+        Test that run-length execution jumps to the field edge and collapses turns.
+        """
+        field = Field(10, 10)
+        car = Car(1, 2, 'N')
+        car.execute_commands("F" * 1000 + "RRRLL" + "FFF", field, run_length=True)
+        self.assertEqual(car.get_position(), "4 9 E")
+
+    def test_run_length_matches_per_command_execution(self):
+        """
+        Test that run-length execution ends in the same state as per-command execution,
+        including cars starting off the field and sequences with invalid commands.
+        """
+        rng = random.Random(7)
+        for _ in range(500):
+            width, height = rng.randint(0, 6), rng.randint(0, 6)
+            field = Field(width, height)
+            x, y = rng.randint(0, width + 1), rng.randint(0, height + 1)
+            direction = rng.choice('NESW')
+            commands = ''.join(rng.choice('FFFFLRX') for _ in range(rng.randint(0, 40)))
+
+            reference = Car(x, y, direction)
+            reference.execute_commands(commands, field)
+            car = Car(x, y, direction)
+            car.execute_commands(commands, field, run_length=True)
+            self.assertEqual(car.get_position(), reference.get_position(), commands)
+
     def test_invalid_initialization(self):
         """
         Test the car initialization with invalid parameters.
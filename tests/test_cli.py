@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from src.cli import main, read_file_lines, run
+from src.parser import iter_lines
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestCli(unittest.TestCase):
+    """
+    Unit tests for the command-line batch runner.
+    """
+
+    def test_text_scenarios(self):
+        """
+        Test that text scenarios get one result each, separated like the input.
+        """
+        output = io.StringIO()
+        failures = run(iter_lines('10 10\n1 2 N\nFFRFF\n---\n5 5\n1 1 X\nF\n'), output)
+        self.assertEqual(output.getvalue(),
+                         "3 4 E\n---\nError: Initial direction must be one of 'N', 'E', 'S', or 'W'.\n")
+        self.assertEqual(failures, 1)
+
+    def test_json_lines(self):
+        """
+        Test that JSON lines input gives JSON lines records.
+        """
+        output = io.StringIO()
+        lines = iter_lines('{"input": "10 10\\n\\nA\\n1 2 N\\nFFRFFFFRRL\\n\\nB\\n7 8 W\\nFFLFFFFFFF", "id": "s"}\n')
+        run(lines, output, part=2, jsonl=True, engine='event')
+        self.assertEqual(json.loads(output.getvalue()), {'index': 0, 'id': 's', 'result': 'A B\n5 4\n7'})
+
+    def test_files_are_memory_mapped(self):
+        """
+        Test reading scenario files, including empty ones, and writing the results to a file.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            first, empty, result = (os.path.join(directory, name) for name in ('a.txt', 'b.txt', 'out.txt'))
+            with open(first, 'w') as file:
+                file.write('10 10\n1 2 N\nFFRFF')
+            open(empty, 'w').close()
+            self.assertEqual(list(read_file_lines(first)), ['10 10\n', '1 2 N\n', 'FFRFF'])
+            self.assertEqual(list(read_file_lines(empty)), [])
+            self.assertEqual(main([first, empty, first, '--output', result]), 0)
+            with open(result) as file:
+                self.assertEqual(file.read(), "3 4 E\n---\n3 4 E\n")
+
+    def test_pipeline_without_web_stack(self):
+        """
+        Test running from stdin to stdout without importing Flask.
+        """
+        script = "import sys, src.cli; code = src.cli.main(); sys.stdout.flush(); " \
+                 "sys.exit(code or ('flask' in sys.modules) * 2)"
+        process = subprocess.run([sys.executable, '-c', script, '--part', '1'], input='5 5\n0 0 N\nFFF\n',
+                                 capture_output=True, text=True, cwd=ROOT)
+        self.assertEqual((process.returncode, process.stdout), (0, "0 3 N\n"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import random
+import unittest
+from src.car import Car
+from src.collisions import CollisionEvent, format_event, iter_collisions, simulate_all_collisions
+from src.field import Field
+from src.fleet import CarFleet
+
+class TestAllCollisions(unittest.TestCase):
+    """
+    Unit tests for the all-collisions simulation mode.
+    """
+
+    def build_fleet(self, cars):
+        """
+        Helper function to build a CarFleet from (id, x, y, direction, commands) tuples.
+        """
+        fleet = CarFleet()
+        for car_id, x, y, direction, commands in cars:
+            fleet.add(x, y, direction, car_id, commands)
+        return fleet
+
+    def test_multi_car_event(self):
+        """
+        Test that cars meeting on one grid point in the same step are reported as one event.
+        """
+        fleet = self.build_fleet([('A', 1, 1, 'E', 'F'), ('B', 3, 1, 'W', 'F'), ('C', 2, 0, 'N', 'F')])
+        events = simulate_all_collisions(Field(5, 5), fleet)
+        self.assertEqual(events, [CollisionEvent(('A', 'B', 'C'), 2, 1, 1)])
+        self.assertEqual(format_event(events[0]), "A B C 2 1 1")
+
+    def test_freeze_and_remove_policies(self):
+        """
+        Test that frozen cars stay on the field and removed cars leave it at the end of the step.
+        """
+        cars = [('A', 1, 1, 'E', 'FF'), ('B', 3, 1, 'W', 'FF'), ('D', 2, 4, 'S', 'FFFF')]
+        frozen = simulate_all_collisions(Field(5, 5), self.build_fleet(cars), policy='freeze')
+        self.assertEqual(frozen, [CollisionEvent(('A', 'B'), 2, 1, 1), CollisionEvent(('A', 'B', 'D'), 2, 1, 3)])
+
+        field = Field(5, 5)
+        removed = simulate_all_collisions(field, self.build_fleet(cars), policy='remove')
+        self.assertEqual(removed, [CollisionEvent(('A', 'B'), 2, 1, 1)])
+        self.assertEqual(field.occupied_positions, {'D': (2, 0)})
+
+    def test_collided_cars_stop(self):
+        """
+        Test that a car hit before its turn in a step does not execute its command.
+        """
+        cars = [(Car(1, 1, 'E', 'A'), 'LRF'), (Car(2, 1, 'N', 'B'), 'RRRR'), (Car(2, 3, 'S', 'C'), 'RF')]
+        events = simulate_all_collisions(Field(5, 5), cars)
+        self.assertEqual(events, [CollisionEvent(('A', 'B'), 2, 1, 3)])
+        self.assertEqual([car.get_position() for car, _ in cars], ['2 1 E', '2 1 S', '1 3 W'])
+
+    def test_first_event_matches_first_collision(self):
+        """
+        Test that the first event is the collision reported by the loop-based engine.
+        """
+        rng = random.Random(15)
+        for _ in range(300):
+            width, height = rng.randint(1, 6), rng.randint(1, 6)
+            cars = [(f"C{number}", rng.randint(0, width), rng.randint(0, height), rng.choice('NESW'),
+                     ''.join(rng.choice('FFFLR') for _ in range(rng.randint(0, 25))))
+                    for number in range(rng.randint(2, 8))]
+            expected = Field(width, height).simulate_multiple_cars(self.build_fleet(cars))
+            event = next(iter_collisions(Field(width, height), self.build_fleet(cars)), None)
+            if event is None:
+                self.assertEqual(expected, "no collision")
+                continue
+            first_pair, cell, step = expected.split('\n')
+            self.assertEqual((f"{event.x} {event.y}", str(event.step)), (cell, step), cars)
+            self.assertTrue(set(first_pair.split()) <= set(event.car_ids), cars)
+
+    def test_unknown_policy(self):
+        """
+        Test that an unknown policy is rejected when the simulation is set up.
+        """
+        with self.assertRaises(ValueError):
+            iter_collisions(Field(5, 5), [], policy='bounce')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import random
+import threading
+import unittest
+from benchmarks.scenarios import fleet_scenario, single_car_scenario
+from src.budget import BudgetExceeded, SimulationBudget
+from src.car import Car
+from src.context import simulation_context
+from src.field import Field
+from src.fleet import CarFleet
+from src.metrics import Metrics
+from src.obstacles import ObstacleMap
+from src.parser import Part1Scenario, Part2Scenario, parse_part2
+from src.simulation import simulate_part1, simulate_part2
+from src.tile_engine import _TileField
+
+class TestSimulationContext(unittest.TestCase):
+    """
+    Unit tests for resetting fields, cars and fleets, and for the per-thread simulation contexts.
+    """
+
+    def test_field_reset(self):
+        """
+        Test that resetting a field removes its cars, obstacles, budget and instrumentation
+        but keeps its dictionaries.
+        """
+        field = Field(5, 5, ObstacleMap(5, 5))
+        Metrics().instrument_field(field)
+        field.occupy_position('A', 1, 1)
+        occupied_positions, position_index = field.occupied_positions, field.position_index
+
+        self.assertIs(field.reset(10, 20), field)
+        self.assertEqual((field.width, field.height, field.obstacles, field.budget), (10, 20, None, None))
+        self.assertEqual(field.occupied_positions, {})
+        self.assertEqual(field.position_index, {})
+        self.assertIs(field.occupied_positions, occupied_positions)
+        self.assertIs(field.position_index, position_index)
+        self.assertFalse(hasattr(field, 'collision_stats'))
+        self.assertEqual(field.check_collision_at.__func__, Field.check_collision_at)
+        self.assertTrue(field.is_open(9, 19))
+        self.assertFalse(field.is_open(10, 0))
+
+        with self.assertRaises(ValueError):
+            field.reset(-1, 5)
+        self.assertEqual((field.width, field.height), (10, 20))
+
+        tile = _TileField(10, 10, None, (0, 5, 0, 5))
+        tile.reset(20, 20)
+        self.assertEqual(tile.box, (0, 5, 0, 5))
+
+    def test_car_and_fleet_reset(self):
+        """
+        Test that a car can be reinitialized and a fleet emptied in place.
+        """
+        car = Car(1, 2, 'E', 'A')
+        self.assertIs(car.reset(3, 4, 'S'), car)
+        self.assertEqual(car.get_position_with_id(), "3 4 S")
+        with self.assertRaises(ValueError):
+            car.reset(0, 0, 'X')
+
+        fleet = CarFleet()
+        fleet.add(1, 2, 'N', 'A', "FF")
+        xs = fleet.xs
+        self.assertIs(fleet.clear(), fleet)
+        self.assertEqual(len(fleet), 0)
+        self.assertEqual((len(fleet.xs), len(fleet.ys), len(fleet.headings), fleet.commands), (0, 0, 0, []))
+        self.assertIs(fleet.xs, xs)
+
+    def test_contexts_are_per_thread_and_cleared(self):
+        """
+        Test that a thread reuses its context, nested and concurrent simulations get their own,
+        and a context is cleared once returned.
+        """
+        with simulation_context() as context:
+            context.field.reset(5, 5).occupy_position('A', 1, 1)
+            context.fleet.add(1, 1, 'N', 'A', "F")
+            with simulation_context() as nested:
+                self.assertIsNot(nested, context)
+        self.assertEqual(context.field.occupied_positions, {})
+        self.assertEqual(len(context.fleet), 0)
+        with simulation_context() as again:
+            self.assertIs(again, context)
+
+        contexts = []
+
+        def simulate():
+            with simulation_context() as other:
+                contexts.append(other)
+
+        thread = threading.Thread(target=simulate)
+        thread.start()
+        thread.join()
+        self.assertIsNot(contexts[0], context)
+
+    def test_reuse_matches_fresh_objects(self):
+        """
+        Test that simulations on reused contexts give the same results as on new objects,
+        whatever ran before them, including failed and budgeted simulations.
+        """
+        rng = random.Random(7)
+        for number in range(60):
+            scenario = fleet_scenario(number, rng.choice([5, 20]), rng.randint(2, 8), rng.randint(1, 40),
+                                      rng.choice(['random', 'crowd']))
+            field = Field(scenario.width, scenario.height)
+            fleet = CarFleet()
+            for car_id, x, y, direction, commands in scenario.cars:
+                fleet.add(x, y, direction, car_id, commands)
+            expected = field.simulate_multiple_cars(fleet)
+            try:
+                simulate_part2(scenario, budget=SimulationBudget(max_commands=5))
+            except BudgetExceeded:
+                pass
+            self.assertEqual(simulate_part2(scenario), expected)
+
+            single = single_car_scenario(number, 10, 30, 'random')
+            car = Car(single.x, single.y, single.direction)
+            car.execute_commands(single.commands, Field(single.width, single.height))
+            self.assertEqual(simulate_part1(single), car.get_position())
+
+            with self.assertRaises(ValueError):
+                simulate_part2(Part2Scenario(5, 5, (('A', 1, 1, 'N', "F"), ('B', 2, 2, 'X', "F"))))
+            with self.assertRaises(ValueError):
+                simulate_part1(Part1Scenario(-1, 5, 0, 0, 'N', "F"))
+
+    def test_metrics_do_not_leak(self):
+        """
+        Test that a field instrumented for one request is not instrumented for the next.
+        """
+        metrics = Metrics()
+        scenario = parse_part2("10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF")
+        simulate_part2(scenario, metrics=metrics)
+        checks = metrics.counters[('collision_checks_total', ())]
+        simulate_part2(scenario)
+        self.assertEqual(metrics.counters[('collision_checks_total', ())], checks)
+        with simulation_context() as context:
+            self.assertFalse(hasattr(context.field, 'collision_stats'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import random
+import unittest
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+from src.program import CommandProgram
+
+class TestEventEngine(unittest.TestCase):
+    """
+    Unit tests for the time-skipping multi-car engine.
+    """
+
+    def run_both_engines(self, width, height, cars):
+        """
+        Helper function to run a scenario on the python and event engines and return both outputs,
+        along with the final states when there is no collision.
+        """
+        results = []
+        for engine in ('python', 'event'):
+            field = Field(width, height)
+            cars_with_commands = [(Car(x, y, direction, car_id), commands) for car_id, x, y, direction, commands in cars]
+            output = field.simulate_multiple_cars(cars_with_commands, engine=engine)
+            if output == "no collision":
+                positions = [car.get_position_with_id() for car, _ in cars_with_commands]
+                results.append((output, positions, field.occupied_positions))
+            else:
+                results.append(output)
+        return results
+
+    def test_sample_scenario(self):
+        """
+        Test the event engine with the sample Part 2 scenario.
+        """
+        field = Field(10, 10)
+        result = field.simulate_multiple_cars([
+            (Car(1, 2, 'N', 'A'), "FFRFFFFRRL"),
+            (Car(7, 8, 'W', 'B'), "FFLFFFFFFF")
+        ], engine='event')
+        self.assertEqual(result, "A B\n5 4\n7")
+
+    def test_order_dependent_rules(self):
+        """
+        Test the processing order, parked cars and cars that have not moved yet.
+        """
+        scenarios = [
+            [('A', 1, 1, 'E', 'F'), ('B', 0, 1, 'E', 'F')],
+            [('B', 0, 1, 'E', 'F'), ('A', 1, 1, 'E', 'FF')],
+            [('A', 2, 2, 'N', 'F'), ('B', 2, 0, 'N', 'FFF')],
+            [('A', 2, 2, 'N', ''), ('B', 2, 0, 'N', 'FFF')],
+            [('A', 2, 2, 'N', 'L'), ('B', 2, 2, 'N', 'R')],
+        ]
+        for cars in scenarios:
+            python_result, event_result = self.run_both_engines(5, 5, cars)
+            self.assertEqual(event_result, python_result, cars)
+
+    def test_matches_python_engine(self):
+        """
+        Test that the event engine matches the loop-based engine on random dense and sparse fleets.
+        """
+        rng = random.Random(14)
+        for _ in range(300):
+            width, height = rng.choice([(rng.randint(1, 6), rng.randint(1, 6)), (60, 60)])
+            cars = []
+            for number in range(rng.randint(2, 8)):
+                commands = ''.join(rng.choice('FFFFLR') for _ in range(rng.randint(0, 120)))
+                cars.append((f"C{number}", rng.randint(0, width), rng.randint(0, height), rng.choice('NESW'), commands))
+            python_result, event_result = self.run_both_engines(width, height, cars)
+            self.assertEqual(event_result, python_result, cars)
+
+    def test_programs_with_segments(self):
+        """
+        Test that cars set aside run the built segments of their CommandPrograms with the same result.
+        """
+        rng = random.Random(25)
+        for _ in range(100):
+            size = rng.choice([8, 200])
+            cars = [(f"C{number}", rng.randint(0, size), rng.randint(0, size), rng.choice('NESW'),
+                     ''.join(rng.choices('FFFFLR', k=rng.randint(0, 300)))) for number in range(rng.randint(2, 12))]
+            results = []
+            for engine in ('python', 'event'):
+                fleet = CarFleet()
+                for car_id, x, y, direction, commands in cars:
+                    program = CommandProgram(commands)
+                    program.segments
+                    fleet.add(x, y, direction, car_id, program)
+                output = Field(size, size).simulate_multiple_cars(fleet, engine=engine)
+                results.append(output if output != "no collision" else
+                               [fleet.get_position_with_id(index) for index in range(len(fleet))])
+            self.assertEqual(results[1], results[0], cars)
+
+    def test_long_horizon_collision(self):
+        """
+        Test a collision found after many skipped steps on a fleet.
+        """
+        fleet = CarFleet()
+        fleet.add(0, 0, 'E', 'A', 'F' * 5000)
+        fleet.add(9999, 0, 'W', 'B', 'F' * 5000)
+        fleet.add(0, 500, 'E', 'C', 'FFLR' * 2000)
+        self.assertEqual(Field(10_000, 1000).simulate_multiple_cars(fleet, engine='event'), "A B\n5000 0\n5000")
+
+if __name__ == '__main__':
+    unittest.main()
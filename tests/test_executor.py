@@ -0,0 +1,57 @@
+import unittest
+from src.executor import SimulationExecutor
+from src.parser import InputError, parse_part1, parse_part2
+from src.simulation import batch_item_cost, simulate_batch_item
+
+class TestSimulationExecutor(unittest.TestCase):
+    """
+    Unit tests for the process-pool simulation executor.
+    """
+
+    def setUp(self):
+        """
+        Set up a batch mixing Part 1 and Part 2 scenarios and a parse error.
+        """
+        self.items = []
+        self.expected = []
+        for x in range(10):
+            self.items.append((parse_part1(f"10 10\n{x} 0 N\nFFFRFF"), None))
+            self.expected.append(('result', f"{min(x + 2, 9)} 3 E"))
+        self.items.append((parse_part2("10 10\nA\n1 2 N\nFFRFFFFRRL\nB\n7 8 W\nFFLFFFFFFF"), 'python'))
+        self.expected.append(('result', "A B\n5 4\n7"))
+        self.items.append((InputError("Field dimensions must be integers."), None))
+        self.expected.append(('error', "Error: Field dimensions must be integers."))
+
+    def test_worker_pool_preserves_order(self):
+        """
+        Test that results from the worker pool come back in input order.
+        """
+        executor = SimulationExecutor(max_workers=2, chunk_size=3, inline_threshold=0)
+        try:
+            self.assertEqual(executor.map(simulate_batch_item, self.items, cost=batch_item_cost), self.expected)
+            self.assertIsNotNone(executor._pool)
+
+            # The pool is reused across jobs
+            pool = executor._pool
+            self.assertEqual(executor.map(simulate_batch_item, self.items[:2]), self.expected[:2])
+            self.assertIs(executor._pool, pool)
+        finally:
+            executor.shutdown()
+
+    def test_small_jobs_run_in_process(self):
+        """
+        Test that a job below the inline threshold never starts the worker pool.
+        """
+        executor = SimulationExecutor(max_workers=2, chunk_size=3, inline_threshold=1000)
+        self.assertEqual(executor.map(simulate_batch_item, self.items, cost=batch_item_cost), self.expected)
+        self.assertIsNone(executor._pool)
+
+    def test_invalid_chunk_size(self):
+        """
+        Test the executor initialization with an invalid chunk size.
+        """
+        with self.assertRaises(ValueError):
+            SimulationExecutor(chunk_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -58,6 +58,21 @@ class TestField(unittest.TestCase):
         car.move_forward(field)
         self.assertEqual(car.get_position(), "9 9 E")
 
+    def test_advance(self):
+        """
+        Test that advancing several grid points stops at the field boundary.
+        """
+        field = Field(10, 10)
+        self.assertEqual(field.advance(5, 5, 0, 1, 3), (5, 8))
+        self.assertEqual(field.advance(5, 5, 0, 1, 100), (5, 9))
+        self.assertEqual(field.advance(5, 5, -1, 0, 100), (0, 5))
+        self.assertEqual(field.advance(5, 5, 1, 0, 0), (5, 5))
+
+        # Off the field, a car only moves if its next grid point is on the field
+        self.assertEqual(field.advance(10, 5, -1, 0, 3), (7, 5))
+        self.assertEqual(field.advance(10, 5, 1, 0, 3), (10, 5))
+        self.assertEqual(field.advance(12, 12, -1, 0, 3), (12, 12))
+
     def test_smallest_field(self):
         """
         Test the field behavior when it is the smallest possible size (1x1).
@@ -102,6 +117,34 @@ class TestField(unittest.TestCase):
         expected_output = "A B\n5 4\n7"
         self.assertEqual(result, expected_output)
 
+    def test_position_index_stays_in_sync(self):
+        """
+        Test that the reverse position index mirrors occupied_positions.
+        """
+        field = Field(10, 10)
+        field.occupy_position('A', 1, 2)
+        field.occupy_position('B', 1, 2)
+        field.occupy_position('A', 3, 4)
+        self.assertEqual(field.occupied_positions, {'A': (3, 4), 'B': (1, 2)})
+        self.assertEqual(field.position_index, {(1, 2): {'B': None}, (3, 4): {'A': None}})
+
+        field.release_position('B')
+        field.release_position('C')  # Unknown cars are ignored
+        self.assertEqual(field.occupied_positions, {'A': (3, 4)})
+        self.assertEqual(field.position_index, {(3, 4): {'A': None}})
+
+    def test_check_collision_uses_position_index(self):
+        """
+        Test that check_collision reports the occupying car with sorted identifiers.
+        """
+        field = Field(10, 10)
+        field.occupy_position('B', 2, 2)
+        car = Car(2, 2, 'N', 'A')
+        self.assertEqual(field.check_collision(car, 4), (True, "A B\n2 2\n5"))
+
+        car = Car(3, 2, 'N', 'A')
+        self.assertEqual(field.check_collision(car, 4), (False, None))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
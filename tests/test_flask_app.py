@@ -1,5 +1,7 @@
+import json
 import unittest
 from app import app
+from src.executor import SimulationExecutor
 
 class FlaskAppTestCase(unittest.TestCase):
     """
@@ -88,6 +90,22 @@ class FlaskAppTestCase(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data.decode(), expected_output)
 
+    def test_simulate_part1_plain_text_body(self):
+        """
+        Test the /simulate_part1 endpoint with the input sent as a plain text body.
+        """
+        response = self.app.post('/simulate_part1', data='10 10\n1 2 N\nFFRFFFRRLF', content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), '4 3 S')
+
+    def test_simulate_part1_repeated_commands(self):
+        """
+        Test the /simulate_part1 endpoint with a route repeated a million times.
+        """
+        response = self.app.post('/simulate_part1', data={'input': '10 10\n1 2 N\n(FFRFFR)1000000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), '1 2 N')
+
     # Part 2 Tests
 
     def test_simulate_part2_valid_input(self):
@@ -108,6 +126,15 @@ class FlaskAppTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data.decode(), 'no collision')
 
+    def test_simulate_part2_plain_text_body(self):
+        """
+        Test the /simulate_part2 endpoint with a plain text body and the engine given in the query string.
+        """
+        input_data = '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'
+        response = self.app.post('/simulate_part2?engine=numpy', data=input_data, content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), 'A B\n5 4\n7')
+
     def test_simulate_part2_invalid_input_format(self):
         """
         Test the /simulate_part2 endpoint with invalid input format.
@@ -132,5 +159,275 @@ class FlaskAppTestCase(unittest.TestCase):
         expected_error_message = "Error: Invalid commands for car A. Must be 'R', 'L', 'F' only."
         self.perform_invalid_input_test('/simulate_part2', input_data, expected_error_message)
 
+    # Trajectory Tests
+
+    def test_simulate_part1_trajectory(self):
+        """
+        Test the /simulate_part1/trajectory endpoint with a step range and downsampling.
+        """
+        input_data = '10 10\n1 2 N\nFFRFFFRRLF'
+        response = self.app.post('/simulate_part1/trajectory?start=2&stop=9&every=3', data={'input': input_data})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), '2 1 4 N\n5 3 4 E\n8 4 4 W\n')
+
+    def test_simulate_part2_trajectory(self):
+        """
+        Test the /simulate_part2/trajectory endpoint for a single car.
+        """
+        input_data = '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'
+        response = self.app.post('/simulate_part2/trajectory?car=B&start=5', data={'input': input_data})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), 'B 5 5 6 S\nB 6 5 5 S\nB 7 5 4 S\n')
+
+    def test_trajectory_invalid_range(self):
+        """
+        Test the trajectory endpoints with an invalid range or an unknown car.
+        """
+        self.perform_invalid_input_test('/simulate_part1/trajectory?every=0', '10 10\n1 2 N\nF',
+                                        "Error: Trajectory start and stop must be non-negative and 'every' at least 1.")
+        self.perform_invalid_input_test('/simulate_part1/trajectory?start=x', '10 10\n1 2 N\nF',
+                                        'Error: Trajectory range must be integers.')
+        self.perform_invalid_input_test('/simulate_part2/trajectory?car=C',
+                                        '10 10\n\nA\n1 2 N\nF\n\nB\n7 8 W\nF', 'Error: Unknown car C.')
+
+    # Result Cache Tests
+
+    def test_repeated_scenarios_use_result_cache(self):
+        """
+        Test that repeating a scenario is served from the result cache.
+        """
+        cache = app.extensions.get('result_cache')
+        hits = cache.hits if cache else 0
+        input_data = '10 10\n3 3 E\nFFLFFRRF'
+        for _ in range(2):
+            response = self.app.post('/simulate_part1', data={'input': input_data})
+            self.assertEqual(response.data.decode(), '5 4 S')
+        self.assertEqual(app.extensions['result_cache'].hits, hits + 1)
+
+        # Every engine gives the same result, so they share the cached one
+        input_data = '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'
+        self.app.post('/simulate_part2', data={'input': input_data, 'engine': 'python'})
+        hits = app.extensions['result_cache'].hits
+        for engine in ('numpy', 'event'):
+            response = self.app.post('/simulate_part2', data={'input': input_data, 'engine': engine})
+            self.assertEqual(response.data.decode(), 'A B\n5 4\n7')
+        self.assertEqual(app.extensions['result_cache'].hits, hits + 2)
+
+        # An unknown engine is still refused once the scenario is cached
+        response = self.app.post('/simulate_part2', data={'input': input_data, 'engine': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data.decode(),
+                         "Error: Unknown engine 'bogus'. Must be one of: python, numpy, event, tiled.")
+        self.assertEqual(app.extensions['result_cache'].hits, hits + 2)
+
+    def test_result_cache_can_be_disabled(self):
+        """
+        Test that no results are cached when the cache is switched off.
+        """
+        app.config['RESULT_CACHE_ENABLED'] = False
+        try:
+            cache = app.extensions.get('result_cache')
+            stats = cache.stats() if cache else None
+            response = self.app.post('/simulate_part1', data={'input': '10 10\n4 4 W\nFRF'})
+            self.assertEqual(response.data.decode(), '3 5 N')
+            self.assertEqual(cache.stats() if cache else None, stats)
+        finally:
+            app.config['RESULT_CACHE_ENABLED'] = True
+
+    def test_offloaded_simulations(self):
+        """
+        Test that long inputs are simulated on the offloader, and refused with a 503 when it is full.
+        """
+        app.config.update(OFFLOAD_ENABLED=True, OFFLOAD_THRESHOLD=5, RESULT_CACHE_ENABLED=False)
+        try:
+            response = self.app.post('/simulate_part2', data={
+                'input': '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'})
+            self.assertEqual(response.data.decode(), 'A B\n5 4\n7')
+            offloader = app.extensions['simulation_offloader']
+            self.assertIsNotNone(offloader._pool)
+
+            # Short inputs are answered in the request thread even when the offloader is full
+            offloader.in_flight = offloader.max_workers + offloader.max_queue
+            response = self.app.post('/simulate_part1', data={'input': '10 10\n1 2 N\nFFRF'})
+            self.assertEqual((response.status_code, response.data.decode()), (200, '2 4 E'))
+            response = self.app.post('/simulate_part1', data={'input': '10 10\n1 2 N\nFFRFFFRRLF'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            self.assertIn('offload_rejected_total 1', self.app.get('/metrics').data.decode())
+        finally:
+            app.config.update(OFFLOAD_ENABLED=False, OFFLOAD_THRESHOLD=100_000, RESULT_CACHE_ENABLED=True)
+            offloader = app.extensions.pop('simulation_offloader', None)
+            if offloader is not None:
+                offloader.in_flight = 0
+                offloader.shutdown()
+
+    def test_simulation_budgets(self):
+        """
+        Test that endpoints stop simulations at their configured budgets with a partial result.
+        """
+        budgets = app.config['SIMULATION_BUDGETS']
+        app.config['SIMULATION_BUDGETS'] = {'part1': {'max_commands': 4}, 'part2': {'max_cars': 1},
+                                            'part1_batch': {'max_commands': 2}, 'part2_all': {'max_commands': 5},
+                                            'trajectory': {'max_commands': 3}, 'sessions': {'max_commands': 6}}
+        try:
+            response = self.app.post('/simulate_part1', data={'input': '10 10\n1 2 N\nFFRFLLRRFF'})
+            self.assertEqual((response.status_code, response.data.decode()),
+                             (200, 'budget exceeded: commands\n4\n2 4 E'))
+            response = self.app.post('/simulate_part2', data={
+                'input': '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'})
+            self.assertEqual((response.status_code, response.data.decode()),
+                             (400, 'Error: At most 1 cars can be simulated.'))
+            response = self.app.post('/simulate_part1/batch', data='10 10\n1 2 N\nFFR\n---\n10 10\n1 2 N\nF',
+                                     content_type='text/plain')
+            self.assertEqual(self.read_records(response), [
+                {'index': 0, 'result': 'budget exceeded: commands\n2\n1 4 N'},
+                {'index': 1, 'result': '1 3 N'},
+            ])
+
+            response = self.app.post('/simulate_part2?mode=all', data={
+                'input': '5 5\n\nA\n1 1 E\nFF\n\nB\n3 1 W\nFF\n\nD\n2 4 S\nFFFF'})
+            self.assertEqual(response.data.decode(),
+                             'A B 2 1 1\nbudget exceeded: commands\n1\nA 2 1 E\nB 2 1 W\nD 2 3 S\n')
+            response = self.app.post('/simulate_part1/trajectory', data={'input': '10 10\n1 2 N\nFFRFF'})
+            self.assertEqual((response.status_code, response.data.decode()),
+                             (200, 'budget exceeded: commands\n3\n1 4 E'))
+
+            response = self.app.post('/sessions', data={'input': '10 10\n\nA\n1 2 N\nFF\n\nB\n7 8 W\nFF'})
+            self.assertEqual(response.status_code, 201)
+            session_id = response.get_json()['session']
+            response = self.app.post(f'/sessions/{session_id}/commands', data={'input': 'A FFFFFF\nB F'})
+            self.assertEqual((response.status_code, response.data.decode()),
+                             (200, 'budget exceeded: commands\n7\nA 1 9 N\nB 4 8 W'))
+            self.assertEqual(self.app.get(f'/sessions/{session_id}').get_json()['step'], 7)
+        finally:
+            app.config['SIMULATION_BUDGETS'] = budgets
+
+    def test_simulate_part2_all_collisions(self):
+        """
+        Test that mode=all streams every collision event.
+        """
+        input_data = '5 5\n\nA\n1 1 E\nFF\n\nB\n3 1 W\nFF\n\nD\n2 4 S\nFFFF'
+        response = self.app.post('/simulate_part2?mode=all', data={'input': input_data})
+        self.assertEqual(response.data.decode(), 'A B 2 1 1\nA B D 2 1 3\n')
+        response = self.app.post('/simulate_part2?mode=all&policy=remove', data={'input': input_data})
+        self.assertEqual(response.data.decode(), 'A B 2 1 1\n')
+        response = self.app.post('/simulate_part2?mode=all&policy=bounce', data={'input': input_data})
+        self.assertEqual(response.status_code, 400)
+
+    # Session Tests
+
+    def test_session_lifecycle(self):
+        """
+        Test creating a session, appending commands, reading its state and deleting it.
+        """
+        response = self.app.post('/sessions', data={'input': '10 10\n\nA\n1 2 N\nFF\n\nB\n1 6 S\nF'})
+        self.assertEqual(response.status_code, 201)
+        state = response.get_json()
+        self.assertEqual((state['step'], state['result']), (2, 'no collision'))
+        session_url = f"/sessions/{state['session']}"
+
+        response = self.app.post(f"{session_url}/commands", data={'input': 'A F\nB F'})
+        self.assertEqual(response.get_json()['result'], 'A B\n1 5\n3')
+        response = self.app.post(f"{session_url}/commands", data={'input': 'A F'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.app.get(session_url)
+        self.assertEqual(response.get_json()['cars'], ['A 1 5 N', 'B 1 5 S'])
+        self.assertEqual(self.app.delete(session_url).status_code, 204)
+        self.assertEqual(self.app.get(session_url).status_code, 404)
+
+    def test_session_invalid_input(self):
+        """
+        Test that invalid session inputs and unknown sessions are reported.
+        """
+        self.perform_invalid_input_test('/sessions', '10 10\n\nA\n1 2 X\nF\n\nB\n1 1 N\nF', 'Invalid direction for car A')
+        response = self.app.post('/sessions/unknown/commands', data={'input': 'A F'})
+        self.assertEqual(response.status_code, 404)
+
+    # Metrics Tests
+
+    def test_metrics_endpoint(self):
+        """
+        Test that instrumented requests are reported by the /metrics endpoint.
+        """
+        app.config['METRICS_ENABLED'] = True
+        try:
+            response = self.app.post('/simulate_part2', data={
+                'input': '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFFLL'})
+            self.assertEqual(response.data.decode(), 'A B\n5 4\n7')
+        finally:
+            app.config['METRICS_ENABLED'] = False
+
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.data.decode()
+        self.assertIn('# TYPE simulator_parse_seconds histogram', body)
+        self.assertIn('simulator_requests_total{endpoint="part2"}', body)
+        self.assertIn('simulator_collision_checks_total', body)
+        self.assertIn('simulator_cars_per_request_bucket{le="2"}', body)
+
+    # Batch Tests
+
+    def read_records(self, response):
+        """
+        Helper function to decode a JSON lines batch response.
+        """
+        return [json.loads(line) for line in response.data.decode().splitlines()]
+
+    def test_simulate_part1_batch_text(self):
+        """
+        Test the /simulate_part1/batch endpoint with '---' separated text scenarios.
+        """
+        input_data = '10 10\n1 2 N\nFFRFFFRRLF\n---\n10 A\n1 2 N\nF\n---\n10 10\n0 0 S\nFFFF\n'
+        response = self.app.post('/simulate_part1/batch', data=input_data, content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(self.read_records(response), [
+            {'index': 0, 'result': '4 3 S'},
+            {'index': 1, 'error': 'Error: Field dimensions must be integers.'},
+            {'index': 2, 'result': '0 0 S'},
+        ])
+
+        # A form-encoded batch is read from its 'input' field
+        response = self.app.post('/simulate_part1/batch', data={'input': input_data})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([record.get('result') for record in self.read_records(response)], ['4 3 S', None, '0 0 S'])
+
+    def test_simulate_part2_batch_json_lines(self):
+        """
+        Test the /simulate_part2/batch endpoint with JSON lines scenarios.
+        """
+        scenarios = [
+            {'id': 'collision', 'input': '10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF'},
+            {'id': 'vectorized', 'engine': 'numpy', 'input': '10 10\n\nA\n1 2 N\nFFF\n\nB\n7 8 W\nFFFL'},
+            {'id': 'missing car', 'input': '10 10\nA\n1 2 N\nFFRFFFFRRL'},
+        ]
+        input_data = '\n'.join(json.dumps(scenario) for scenario in scenarios) + '\nnot json\n'
+        response = self.app.post('/simulate_part2/batch', data=input_data, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read_records(response), [
+            {'index': 0, 'id': 'collision', 'result': 'A B\n5 4\n7'},
+            {'index': 1, 'id': 'vectorized', 'result': 'no collision'},
+            {'index': 2, 'id': 'missing car',
+             'error': 'Error: Invalid input format. Please provide field size and details for each car.'},
+            {'index': 3, 'error': 'Error: Invalid JSON line.'},
+        ])
+
+    def test_simulate_part1_batch_worker_pool(self):
+        """
+        Test the /simulate_part1/batch endpoint when scenarios are sent to worker processes.
+        """
+        executor = SimulationExecutor(max_workers=2, chunk_size=2, inline_threshold=0)
+        previous = app.extensions.get('simulation_executor')
+        app.extensions['simulation_executor'] = executor
+        try:
+            input_data = '\n---\n'.join(f'10 10\n{x} 0 N\nFFF' for x in range(5))
+            response = self.app.post('/simulate_part1/batch', data=input_data, content_type='text/plain')
+            self.assertEqual(self.read_records(response), [{'index': x, 'result': f'{x} 3 N'} for x in range(5)])
+        finally:
+            executor.shutdown()
+            app.extensions['simulation_executor'] = previous
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
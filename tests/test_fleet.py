@@ -0,0 +1,70 @@
+import random
+import unittest
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+
+class TestCarFleet(unittest.TestCase):
+    """
+    Unit tests for the CarFleet container.
+    """
+
+    def test_add_and_positions(self):
+        """
+        Test adding cars and reading their positions in the Car string format.
+        """
+        fleet = CarFleet()
+        fleet.add(1, 2, 'N', 'A', "FF")
+        fleet.add(3, 4, 'W')
+        self.assertEqual(len(fleet), 2)
+        self.assertEqual(fleet.get_position(0), "1 2 N")
+        self.assertEqual(fleet.get_position_with_id(0), "A 1 2 N")
+        self.assertEqual(fleet.get_position_with_id(1), "3 4 W")
+        self.assertEqual(fleet.car(0).get_position_with_id(), "A 1 2 N")
+        self.assertEqual(fleet.commands, ["FF", ""])
+
+    def test_from_cars(self):
+        """
+        Test building a fleet from (Car, commands) tuples.
+        """
+        fleet = CarFleet.from_cars([(Car(1, 2, 'E', 'A'), "F"), (Car(5, 6, 'S', 'B'), "L")])
+        self.assertEqual(list(fleet.xs), [1, 5])
+        self.assertEqual(list(fleet.ys), [2, 6])
+        self.assertEqual(list(fleet.headings), [1, 2])
+        self.assertEqual(fleet.identifiers, ['A', 'B'])
+
+    def test_invalid_car(self):
+        """
+        Test adding a car with invalid parameters.
+        """
+        fleet = CarFleet()
+        with self.assertRaises(ValueError):
+            fleet.add(-1, 2, 'N')
+        with self.assertRaises(ValueError):
+            fleet.add(1, 2, 'X')
+        self.assertEqual(len(fleet), 0)
+
+    def test_field_simulates_fleet(self):
+        """
+        Test that simulating a fleet matches simulating Car objects, on both engines.
+        """
+        rng = random.Random(17)
+        for _ in range(200):
+            width, height = rng.randint(1, 6), rng.randint(1, 6)
+            cars = []
+            for number in range(rng.randint(2, 8)):
+                commands = ''.join(rng.choice('FFFLR') for _ in range(rng.randint(0, 20)))
+                cars.append((Car(rng.randint(0, width), rng.randint(0, height), rng.choice('NESW'), f"C{number}"), commands))
+
+            fleet = CarFleet.from_cars(cars)
+            expected = Field(width, height).simulate_multiple_cars(cars)
+            expected_positions = [car.get_position_with_id() for car, _ in cars]
+            for engine in ('python', 'numpy'):
+                engine_fleet = CarFleet.from_cars([(fleet.car(index), fleet.commands[index]) for index in range(len(fleet))])
+                result = Field(width, height).simulate_multiple_cars(engine_fleet, engine=engine)
+                self.assertEqual(result, expected)
+                positions = [engine_fleet.get_position_with_id(index) for index in range(len(engine_fleet))]
+                self.assertEqual(positions, expected_positions)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from src.field import Field
+from src.metrics import NULL_TIMER, Metrics
+from src.parser import parse_part1, parse_part2
+from src.simulation import commands_executed, simulate_part1, simulate_part2
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit tests for the metrics registry and its Prometheus rendering.
+    """
+
+    def test_counters_and_histograms(self):
+        """
+        Test that counters add up and histograms count values into cumulative buckets.
+        """
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.increment('requests_total', endpoint='part1')
+        metrics.increment('requests_total', 2, endpoint='part1')
+        metrics.observe('parse_seconds', 0.5)
+        metrics.observe('parse_seconds', 0.05)
+        lines = metrics.render().splitlines()
+        self.assertIn('simulator_requests_total{endpoint="part1"} 3', lines)
+        self.assertIn('# TYPE simulator_parse_seconds histogram', lines)
+        self.assertIn('simulator_parse_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('simulator_parse_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('simulator_parse_seconds_bucket{le="+Inf"} 2', lines)
+        self.assertIn('simulator_parse_seconds_count 2', lines)
+
+    def test_disabled_metrics_record_nothing(self):
+        """
+        Test that disabled metrics return the shared no-op timer and leave fields untouched.
+        """
+        metrics = Metrics(enabled=False)
+        self.assertIs(metrics.timer('parse_seconds'), NULL_TIMER)
+        metrics.increment('requests_total')
+        field = metrics.instrument_field(Field(5, 5))
+        self.assertNotIn('check_collision_at', vars(field))
+        self.assertEqual(metrics.render(), '\n')
+
+    def test_gauges_and_label_escaping(self):
+        """
+        Test that extra gauges are rendered and label values are escaped.
+        """
+        metrics = Metrics()
+        metrics.increment('requests_total', endpoint='a"b\\c')
+        body = metrics.render({'result_cache_hits': 4})
+        self.assertIn('simulator_requests_total{endpoint="a\\"b\\\\c"} 1', body)
+        self.assertIn('# TYPE simulator_result_cache_hits gauge\nsimulator_result_cache_hits 4', body)
+
+    def test_simulation_counts_work(self):
+        """
+        Test that the simulations count executed commands and collision checks.
+        """
+        metrics = Metrics()
+        simulate_part1(parse_part1('10 10\n1 2 N\nFFRFF'), metrics=metrics)
+        scenario = parse_part2('10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF')
+        self.assertEqual(simulate_part2(scenario, metrics=metrics), 'A B\n5 4\n7')
+        self.assertEqual(metrics.counters[('commands_executed_total', ())], 5 + 14)
+        self.assertGreater(metrics.counters[('collision_checks_total', ())], 0)
+        self.assertEqual(metrics.histograms[('collision_seconds', ())][3], 1)
+
+    def test_commands_executed(self):
+        """
+        Test that commands are counted up to the end of the collision step.
+        """
+        self.assertEqual(commands_executed(['FFF', 'F'], 'no collision'), 4)
+        self.assertEqual(commands_executed(['FFFFF', 'F'], 'A B\n1 1\n3'), 4)
+
+if __name__ == '__main__':
+    unittest.main()
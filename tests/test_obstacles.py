@@ -0,0 +1,109 @@
+import os
+import random
+import tempfile
+import unittest
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+from src.obstacles import ObstacleMap
+
+class TestObstacleMap(unittest.TestCase):
+    """
+    Unit tests for the packed obstacle bitmap and how cars treat obstacles.
+    """
+
+    def random_map(self, rng, width, height, density=0.2):
+        """
+        Helper function to build a map with randomly blocked grid points.
+        """
+        return ObstacleMap.from_cells(width, height, [
+            (x, y) for x in range(width) for y in range(height) if rng.random() < density])
+
+    def test_bitmap_layout(self):
+        """
+        Test that grid points are packed row by row, least significant bit first.
+        """
+        obstacles = ObstacleMap.from_cells(10, 2, [(0, 0), (9, 0), (1, 1)])
+        self.assertEqual(bytes(obstacles.data), bytes([0b1, 0b1010, 0]))
+        self.assertTrue(obstacles.is_blocked(9, 0))
+        self.assertFalse(obstacles.is_blocked(8, 0))
+        obstacles.unblock(9, 0)
+        self.assertFalse(obstacles.is_blocked(9, 0))
+        with self.assertRaises(ValueError):
+            obstacles.block(10, 0)
+        with self.assertRaises(ValueError):
+            ObstacleMap(10, 10, bytearray(12))
+
+    def test_blocked_grid_point_acts_like_edge(self):
+        """
+        Test that a car does not drive onto a blocked grid point.
+        """
+        field = Field(5, 5, ObstacleMap.from_cells(5, 5, [(2, 3)]))
+        car = Car(2, 1, 'N')
+        car.execute_commands("FFFF", field)
+        self.assertEqual(car.get_position(), "2 2 N")
+        car.execute_commands("RFLFF", field)
+        self.assertEqual(car.get_position(), "3 4 N")
+        self.assertFalse(field.is_open(2, 3))
+        self.assertTrue(field.is_open(2, 2))
+
+    def test_advance_matches_single_steps(self):
+        """
+        Test that jumps stop before obstacles exactly as single steps do.
+        """
+        rng = random.Random(16)
+        for _ in range(300):
+            width, height = rng.randint(1, 40), rng.randint(1, 40)
+            field = Field(width, height, self.random_map(rng, width, height, rng.random() * 0.3))
+            for direction in 'NESW':
+                x, y = rng.randint(0, width), rng.randint(0, height)
+                steps = rng.randint(0, 50)
+                jumped, stepped = Car(x, y, direction), Car(x, y, direction)
+                jumped.move_forward_steps(steps, field)
+                for _ in range(steps):
+                    stepped.move_forward(field)
+                self.assertEqual(jumped.get_position(), stepped.get_position())
+
+    def test_engines_agree_with_obstacles(self):
+        """
+        Test that every engine treats obstacles the same way.
+        """
+        rng = random.Random(61)
+        for _ in range(100):
+            width, height = rng.randint(2, 8), rng.randint(2, 8)
+            obstacles = self.random_map(rng, width, height)
+            cars = [(f"C{number}", rng.randrange(width), rng.randrange(height), rng.choice('NESW'),
+                     ''.join(rng.choice('FFFLR') for _ in range(rng.randint(1, 30))))
+                    for number in range(rng.randint(2, 5))]
+            results = set()
+            for engine in ('python', 'numpy', 'event'):
+                fleet = CarFleet()
+                for car_id, x, y, direction, commands in cars:
+                    fleet.add(x, y, direction, car_id, commands)
+                output = Field(width, height, obstacles).simulate_multiple_cars(fleet, engine=engine)
+                results.add((output, tuple(fleet.xs), tuple(fleet.ys)) if output == "no collision" else output)
+            self.assertEqual(len(results), 1, cars)
+
+    def test_memory_mapped_file(self):
+        """
+        Test saving a map and loading it back through a memory mapping.
+        """
+        obstacles = ObstacleMap.from_cells(100, 50, [(99, 49), (0, 10)])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'map.bin')
+            obstacles.save(path)
+            loaded = ObstacleMap.from_file(path, 100, 50)
+            try:
+                self.assertTrue(loaded.is_blocked(99, 49))
+                self.assertTrue(loaded.is_blocked(0, 10))
+                self.assertFalse(loaded.is_blocked(1, 10))
+                car = Car(0, 0, 'N')
+                car.move_forward_steps(20, Field(100, 50, loaded))
+                self.assertEqual(car.get_position(), "0 9 N")
+            finally:
+                loaded.close()
+            with self.assertRaises(ValueError):
+                ObstacleMap.from_file(path, 100, 51)
+
+if __name__ == '__main__':
+    unittest.main()
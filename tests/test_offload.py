@@ -0,0 +1,52 @@
+import threading
+import time
+import unittest
+from src.offload import Overloaded, SimulationOffloader
+from src.parser import parse_part2
+from src.simulation import simulate_part2
+
+class TestSimulationOffloader(unittest.TestCase):
+    """
+    Unit tests for the bounded simulation offloader.
+    """
+
+    def setUp(self):
+        """
+        Set up an offloader with one worker and room for one waiting simulation.
+        """
+        self.offloader = SimulationOffloader(max_workers=1, max_queue=1)
+
+    def tearDown(self):
+        self.offloader.shutdown()
+
+    def test_runs_in_worker(self):
+        """
+        Test that a simulation runs in a worker process and frees its place when done.
+        """
+        scenario = parse_part2("10 10\nA\n1 2 N\nFFRFFFFRRL\nB\n7 8 W\nFFLFFFFFFF")
+        self.assertEqual(self.offloader.run(simulate_part2, scenario, 'numpy'), "A B\n5 4\n7")
+        self.assertIsNotNone(self.offloader._pool)
+        self.assertEqual(self.offloader.stats(), {'running': 0, 'queued': 0, 'rejected_total': 0})
+
+    def test_refuses_when_full(self):
+        """
+        Test that simulations beyond the workers and the queue are refused at once.
+        """
+        threads = [threading.Thread(target=self.offloader.run, args=(time.sleep, 0.5)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while self.offloader.stats()['queued'] < 1:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        with self.assertRaises(Overloaded):
+            self.offloader.run(time.sleep, 0.5)
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertEqual(self.offloader.stats(), {'running': 1, 'queued': 1, 'rejected_total': 1})
+
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.offloader.run(abs, -3), 3)
+
+if __name__ == '__main__':
+    unittest.main()
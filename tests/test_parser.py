@@ -0,0 +1,136 @@
+import io
+import unittest
+from src.parser import (InputError, Part1Scenario, Part2Scenario, iter_lines, parse_commands, parse_part1,
+                        parse_part2, read_json_lines, read_lines, split_scenarios)
+
+class TestParser(unittest.TestCase):
+    """
+    Unit tests for the input parser shared by the endpoints.
+    """
+
+    def assert_input_error(self, parse, input_data, expected_error_message):
+        """
+        Helper function to check that parsing fails with the expected message.
+        """
+        with self.assertRaises(InputError) as context:
+            parse(input_data)
+        self.assertEqual(str(context.exception), expected_error_message)
+
+    def test_iter_lines(self):
+        """
+        Test that lines keep their line breaks and only '\\n' splits lines.
+        """
+        self.assertEqual(list(iter_lines("a\nb\r\n\nc")), ["a\n", "b\r\n", "\n", "c"])
+        self.assertEqual(list(iter_lines("a\n")), ["a\n"])
+        self.assertEqual(list(iter_lines("")), [])
+
+    def test_read_lines(self):
+        """
+        Test that a binary stream is decoded into lines incrementally.
+        """
+        stream = io.BytesIO("10 10\r\n1 2 N\nFFé".encode())
+        self.assertEqual(list(read_lines(stream)), ["10 10\r\n", "1 2 N\n", "FFé"])
+
+    def test_parse_part1(self):
+        """
+        Test parsing a Part 1 input, with surrounding blank lines and Windows line breaks.
+        """
+        expected = Part1Scenario(10, 10, 1, 2, 'N', 'FFRFFFRRLF')
+        self.assertEqual(parse_part1("10 10\n1 2 N\nFFRFFFRRLF"), expected)
+        self.assertEqual(parse_part1("\n  \n10 10\r\n1 2 N\r\nFFRFFFRRLF\r\n\n \n"), expected)
+        self.assertEqual(parse_part1(iter(["10 10\n", "1 2 N\n", "FFRFFFRRLF"])), expected)
+
+    def test_parse_part1_errors(self):
+        """
+        Test that Part 1 errors are reported with the same messages as before.
+        """
+        self.assert_input_error(parse_part1, "10 10\n1 2 N", "Please provide exactly 3 lines of input.")
+        self.assert_input_error(parse_part1, "10 10\n\n1 2 N\nF", "Please provide exactly 3 lines of input.")
+        self.assert_input_error(parse_part1, "10 10\n\nF", "Initial position must be integers.")
+        self.assert_input_error(parse_part1, "10 A\n1 2 N\nF", "Field dimensions must be integers.")
+        self.assert_input_error(parse_part1, "10 10\n1 2\nF", "Initial position must be integers.")
+        self.assert_input_error(parse_part1, "10 10\n1 2 X\nF",
+                                "Initial direction must be one of 'N', 'E', 'S', or 'W'.")
+        self.assert_input_error(parse_part1, "10 10\n1 2 N\nFFX",
+                                "Commands must be a sequence of 'R', 'L', and 'F' only.")
+
+    def test_parse_part2(self):
+        """
+        Test parsing a Part 2 input into car tuples.
+        """
+        scenario = parse_part2("10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF\n")
+        self.assertEqual(scenario, Part2Scenario(10, 10, (
+            ('A', 1, 2, 'N', 'FFRFFFFRRL'),
+            ('B', 7, 8, 'W', 'FFLFFFFFFF'),
+        )))
+
+    def test_parse_part2_errors(self):
+        """
+        Test that Part 2 errors are reported with the same messages and precedence as before.
+        """
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 N\nF",
+                                "Invalid input format. Please provide field size and details for each car.")
+        # The overall format is checked before the cars, even when a car error comes first
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 X\nF\nB\n1 1 N\nF\nC",
+                                "Invalid input format. Please provide field size and details for each car.")
+        self.assert_input_error(parse_part2, "10 A\nA\n1 2 X\nF\nB\n1 1 N\nF",
+                                "Field dimensions must be integers.")
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2\nF\nB\n1 1 N\nF", "Invalid position format for car A.")
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 N\nF\nB\n1 -1 N\nF",
+                                "Invalid position or command format for car B.")
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 N\nF\nB\n1 1 Q\nF",
+                                "Invalid direction for car B. Must be one of 'N', 'E', 'S', 'W'.")
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 N\nFX\nB\n1 1 Q\nF",
+                                "Invalid commands for car A. Must be 'R', 'L', 'F' only.")
+
+    def test_parse_repetitions(self):
+        """
+        Test that repeated commands stay compact for Part 1 and are expanded for Part 2 cars.
+        """
+        scenario = parse_part1("10 10\n1 2 N\nF(FFR(L)2)1000000")
+        self.assertEqual(str(scenario.commands), "F(FFR(L)2)1000000")
+        self.assertEqual(len(scenario.commands), 1 + 5 * 1000000)
+        self.assertEqual(scenario.commands.expand()[:11], "FFFRLLFFRLL")
+
+        scenario = parse_part2("10 10\nA\n1 2 N\n(FR)2F\nB\n7 8 W\nFF")
+        self.assertEqual(scenario.cars[0][4], "FRFRF")
+        self.assertEqual(parse_commands("A (F)3\nB L"), [('A', "FFF"), ('B', "L")])
+
+        malformed = "Repeated commands must be written as (commands)count."
+        for commands in ("(FF", "FF)2", "(FF)", "2", ")"):
+            self.assert_input_error(parse_part1, f"10 10\n1 2 N\n{commands}", malformed)
+        self.assert_input_error(parse_part1, "10 10\n1 2 N\n(FX)2",
+                                "Commands must be a sequence of 'R', 'L', and 'F' only.")
+        self.assert_input_error(parse_part1, "10 10\n1 2 N\n(((F)999999999)999999999)999999999",
+                                "Repeated commands stand for too many commands.")
+        self.assert_input_error(parse_part2, "10 10\nA\n1 2 N\n(F)2000000\nB\n1 1 N\nF",
+                                "Commands for car A must expand to at most 1048576 commands.")
+
+        # Repetitions are also limited over all the cars of an input or lines of an update
+        over_all_cars = "Repeated commands must expand to at most 4194304 commands over all cars."
+        cars = [f"{car_id}\n1 1 N\n(F)1048576" for car_id in "ABCDE"]
+        self.assertEqual(len(parse_part2('\n'.join(["10 10", *cars[:4]])).cars), 4)
+        self.assert_input_error(parse_part2, '\n'.join(["10 10", *cars]), over_all_cars)
+        self.assert_input_error(parse_commands, ''.join(f"{car_id} (F)1048576\n" for car_id in "ABCDE"),
+                                over_all_cars)
+
+    def test_split_scenarios(self):
+        """
+        Test splitting a text batch on '---' lines, skipping blank scenarios.
+        """
+        lines = iter_lines("\n---\na\nb\n --- \n\n\nc\n---\n\n")
+        self.assertEqual([list(scenario) for scenario in split_scenarios(lines)], [["a\n", "b\n"], ["c\n"]])
+
+    def test_read_json_lines(self):
+        """
+        Test reading a JSON lines batch, with error entries for invalid lines.
+        """
+        lines = iter_lines('{"input": "x", "id": 1}\n\n[1]\n{\n')
+        self.assertEqual(list(read_json_lines(lines)), [
+            {'input': 'x', 'id': 1},
+            {'error': "Each JSON line must be an object with a string 'input'."},
+            {'error': "Invalid JSON line."},
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
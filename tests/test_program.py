@@ -0,0 +1,170 @@
+import pickle
+import random
+import unittest
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+from src.obstacles import ObstacleMap
+from src.parser import Part1Scenario, parse_repetitions
+from src.program import (MAX_CACHED_LENGTH, PROGRAM_CACHE_COMMANDS, CommandProgram, cached_program,
+                         command_string, compile_commands)
+from src.simulation import simulate_part1
+
+class TestProgram(unittest.TestCase):
+    """
+    Unit tests for compiled command programs.
+    """
+
+    def test_compile(self):
+        """
+        Test the opcodes and the collapsed segments of a compiled program.
+        """
+        program = CommandProgram("FFRRRLFX")
+        self.assertEqual(program.opcodes, b"FFRRRLFX")
+        self.assertEqual((len(program), program[2], program[:3], str(program)), (8, 'R', "FFR", "FFRRRLFX"))
+        (runs, quarter_turns, frames), = program.segments
+        self.assertEqual(runs, ((2, 0), (0, 2), (1, 0)))
+        self.assertEqual(quarter_turns, 2)
+        self.assertEqual(frames[0], (0, 1, 0, 0, 0, 2))  # Heading north: up 2, back down 1
+        self.assertEqual(command_string(program), "FFRRRLFX")
+        self.assertEqual(command_string("FF"), "FF")
+
+    def test_programs_are_cached(self):
+        """
+        Test that compiling the same route twice gives the same program.
+        """
+        route = "FFRFFLFF" * 10
+        program = compile_commands(route)
+        self.assertIs(compile_commands(''.join([route])), program)
+        self.assertIs(compile_commands(program), program)
+        self.assertEqual(pickle.loads(pickle.dumps(program)).opcodes, program.opcodes)
+
+    def test_program_cache_is_bounded(self):
+        """
+        Test that the program cache keeps neither long routes nor more commands than its limit.
+        """
+        long_route = 'F' * (MAX_CACHED_LENGTH + 1)
+        self.assertIsNot(compile_commands(long_route), compile_commands(long_route))
+        self.assertIsNone(cached_program(long_route))
+
+        routes = [f"{number:b}".replace('0', 'L').replace('1', 'F') * (MAX_CACHED_LENGTH // 16)
+                  for number in range(64)]
+        for route in routes:
+            compile_commands(route)
+        cached = [route for route in routes if cached_program(route) is not None]
+        self.assertIn(routes[-1], cached)
+        self.assertLessEqual(sum(map(len, cached)), PROGRAM_CACHE_COMMANDS)
+
+    def test_part1_routes_run_by_segments_once_repeated(self):
+        """
+        Test that a Part 1 route runs without building segments the first time it is seen,
+        and by segments, with the same result, once it repeats.
+        """
+        route = "FFRFFFLFFFFFRFFLLFFF" * 40
+        scenario = Part1Scenario(50, 50, 10, 10, 'E', route)
+        car = Car(10, 10, 'E')
+        car.execute_commands(route, Field(50, 50))
+
+        self.assertEqual(simulate_part1(scenario), car.get_position())
+        self.assertFalse(cached_program(route).has_segments)
+        self.assertEqual(simulate_part1(scenario), car.get_position())
+        self.assertTrue(cached_program(route).has_segments)
+
+    def test_matches_per_command_execution(self):
+        """
+        Test that executing a program ends in the same state as per-command execution,
+        including cars starting off the field, fields with obstacles and invalid commands.
+        """
+        rng = random.Random(11)
+        for trial in range(500):
+            width, height = rng.randint(0, 12), rng.randint(0, 12)
+            obstacles = None
+            if trial % 3 == 0:
+                obstacles = ObstacleMap(width, height)
+                for _ in range(rng.randint(0, 6)):
+                    if width and height:
+                        obstacles.block(rng.randrange(width), rng.randrange(height))
+            field = Field(width, height, obstacles)
+            x, y = rng.randint(0, width + 1), rng.randint(0, height + 1)
+            direction = rng.choice('NESW')
+            commands = ''.join(rng.choice('FFFFLRX') for _ in range(rng.randint(0, 80)))
+
+            reference = Car(x, y, direction)
+            reference.execute_commands(commands, field)
+            car = Car(x, y, direction)
+            car.execute_commands(CommandProgram(commands), field)
+            self.assertEqual(car.get_position(), reference.get_position(), commands)
+
+    def test_repeated_matches_expanded_execution(self):
+        """
+        Test that executing repeated commands ends in the same state as executing them expanded,
+        with nested repetitions, walls and obstacles.
+        """
+        rng = random.Random(19)
+        for trial in range(300):
+            width, height = rng.randint(1, 9), rng.randint(1, 9)
+            obstacles = None
+            if trial % 3 == 0:
+                obstacles = ObstacleMap(width, height)
+                for _ in range(rng.randint(0, 4)):
+                    obstacles.block(rng.randrange(width), rng.randrange(height))
+            field = Field(width, height, obstacles)
+            x, y, direction = rng.randrange(width), rng.randrange(height), rng.choice('NESW')
+            inner = ''.join(rng.choice('FFFLR') for _ in range(rng.randint(1, 4)))
+            outer = ''.join(rng.choice('FFLR') for _ in range(rng.randint(0, 3)))
+            commands = f"{outer}(F({inner}){rng.randint(0, 5)}{outer}){rng.randint(1, 40)}"
+            program = parse_repetitions(commands)
+            self.assertEqual(str(program), commands)
+
+            reference = Car(x, y, direction)
+            reference.execute_commands(program.expand(), field)
+            car = Car(x, y, direction)
+            car.execute_commands(program, field)
+            self.assertEqual(car.get_position(), reference.get_position(), commands)
+
+    def test_repeated_cost_is_independent_of_count(self):
+        """
+        Test that huge repeat counts fast-forward through straight runs, slides along walls and cycles.
+        """
+        program = parse_repetitions("(FFRFFR)1000000000000")
+        self.assertEqual(len(program), 6 * 10 ** 12)
+        car = Car(1, 2, 'N')
+        car.execute_commands(program, Field(10, 10))
+        self.assertEqual(car.get_position(), "1 2 N")  # The route is a loop of period 2
+
+        car = Car(0, 0, 'E')
+        car.execute_commands(parse_repetitions("(F)123456789012(R)3"), Field(1000, 5))
+        self.assertEqual(car.get_position(), "999 0 N")
+
+        # Each iteration tries to leave the field on the left, then moves up
+        for count, position in ((1000000, "0 1000000 N"), (10 ** 12, "0 2999999 N")):
+            car = Car(0, 0, 'N')
+            car.execute_commands(parse_repetitions(f"(LFRF){count}"), Field(10, 3000000))
+            self.assertEqual(car.get_position(), position)
+
+        obstacles = ObstacleMap(50, 50)
+        obstacles.block(10, 10)
+        car = Car(0, 0, 'N')
+        car.execute_commands(parse_repetitions("((FFFR)7L)99999999999"), Field(50, 50, obstacles))
+        reference = Car(0, 0, 'N')
+        reference.execute_commands("FFFRFFFRFFFRFFFRFFFRFFFRFFFRL" * (99999999999 % 4), Field(50, 50, obstacles))
+        self.assertEqual(car.get_position(), reference.get_position())
+
+    def test_shared_by_multiple_cars(self):
+        """
+        Test that every engine accepts programs shared by the cars of a fleet.
+        """
+        route = compile_commands("FFRFFFFRRL")
+        for engine in ('python', 'numpy', 'event'):
+            fleet = CarFleet()
+            fleet.add(1, 2, 'N', 'A', route)
+            fleet.add(7, 8, 'W', 'B', compile_commands("FFLFFFFFFF"))
+            self.assertEqual(Field(10, 10).simulate_multiple_cars(fleet, engine=engine), "A B\n5 4\n7")
+
+            field = Field(10, 10)
+            cars = [(Car(0, 0, 'N', 'A'), route), (Car(9, 0, 'N', 'B'), route)]
+            self.assertEqual(field.simulate_multiple_cars(cars, engine=engine), "no collision")
+            self.assertEqual([car.get_position() for car, _ in cars], ["4 2 S", "9 2 S"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import random
+import unittest
+from src.parser import Part2Scenario, parse_commands, parse_part2
+from src.session import SessionStore, SimulationSession
+from src.simulation import simulate_part2
+
+class TestSimulationSession(unittest.TestCase):
+    """
+    Unit tests for resumable simulation sessions.
+    """
+
+    def test_resume_matches_full_simulation(self):
+        """
+        Test that sending commands a few steps at a time gives the same result as the full input.
+        """
+        rng = random.Random(13)
+        for _ in range(200):
+            width, height = rng.randint(1, 6), rng.randint(1, 6)
+            cars = tuple(
+                (f"C{index}", rng.randrange(width), rng.randrange(height), rng.choice('NESW'),
+                 ''.join(rng.choice('FFLR') for _ in range(rng.randint(1, 20))))
+                for index in range(rng.randint(1, 5))
+            )
+            scenario = Part2Scenario(width, height, cars)
+            chunk = rng.randint(1, 7)
+
+            session = SimulationSession.from_scenario(
+                Part2Scenario(width, height, tuple((*car[:4], car[4][:chunk]) for car in cars)))
+            start = chunk
+            while not session.collided and start < max(len(car[4]) for car in cars):
+                session.append_commands((car[0], car[4][start:start + chunk]) for car in cars)
+                start += chunk
+            self.assertEqual(session.result, simulate_part2(scenario))
+
+    def test_state_and_positions(self):
+        """
+        Test that the session keeps its step and car positions between updates.
+        """
+        session = SimulationSession.from_scenario(parse_part2('10 10\n\nA\n1 2 N\nFF\n\nB\n7 8 W\nF'))
+        self.assertEqual(session.step, 2)
+        self.assertEqual(session.positions(), ['A 1 4 N', 'B 6 8 W'])
+        self.assertEqual(session.append_commands([('B', 'LL'), ('A', 'R')]), "no collision")
+        self.assertEqual(session.step, 4)
+        self.assertEqual(session.positions(), ['A 1 4 E', 'B 6 8 E'])
+        self.assertEqual(session.commands_executed, 6)
+
+    def test_collision_reports_global_step(self):
+        """
+        Test that a collision after resuming is reported at the session's step, and ends the session.
+        """
+        session = SimulationSession.from_scenario(parse_part2('5 5\n\nA\n0 0 E\nF\n\nB\n3 0 W\nF'))
+        self.assertEqual(session.append_commands(parse_commands('A F\nB F\n')), "A B\n2 0\n2")
+        self.assertTrue(session.collided)
+        with self.assertRaises(ValueError):
+            session.append_commands([('A', 'F')])
+
+    def test_invalid_updates(self):
+        """
+        Test that unknown cars and invalid commands are rejected.
+        """
+        session = SimulationSession.from_scenario(parse_part2('5 5\n\nA\n0 0 E\nF\n\nB\n4 4 N\nL'))
+        with self.assertRaises(ValueError):
+            session.append_commands([('Z', 'F')])
+        with self.assertRaises(ValueError):
+            session.append_commands([('A', 'FX')])
+        with self.assertRaises(ValueError):
+            parse_commands('A\n')
+
+
+class TestSessionStore(unittest.TestCase):
+    """
+    Unit tests for the session store and its eviction policy.
+    """
+
+    def test_idle_sessions_are_evicted(self):
+        """
+        Test that sessions unused for longer than the timeout are evicted.
+        """
+        now = [0.0]
+        store = SessionStore(idle_timeout=10, clock=lambda: now[0])
+        first = store.add(SimulationSession(5, 5))
+        now[0] = 6
+        second = store.add(SimulationSession(5, 5))
+        now[0] = 12
+        self.assertIsNone(store.get(first))
+        self.assertIsNotNone(store.get(second))
+        now[0] = 21
+        self.assertIsNotNone(store.get(second))
+        self.assertEqual(store.evictions, 1)
+
+    def test_full_store_evicts_least_recently_used(self):
+        """
+        Test that adding to a full store evicts the least recently used session.
+        """
+        store = SessionStore(max_sessions=2)
+        first = store.add(SimulationSession(5, 5))
+        second = store.add(SimulationSession(5, 5))
+        store.get(first)
+        store.add(SimulationSession(5, 5))
+        self.assertIsNone(store.get(second))
+        self.assertIsNotNone(store.get(first))
+        self.assertEqual(len(store), 2)
+        self.assertTrue(store.remove(first))
+        self.assertFalse(store.remove(first))
+
+if __name__ == '__main__':
+    unittest.main()
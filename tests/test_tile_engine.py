@@ -0,0 +1,129 @@
+import random
+import unittest
+from src.car import Car
+from src.executor import SimulationExecutor
+from src.field import Field
+from src.fleet import CarFleet
+from src.obstacles import ObstacleMap
+from src.parser import parse_part2
+from src.simulation import simulate_batch_item
+from src.tile_engine import _get_default_executor, simulate_multiple_cars
+
+def default_executor_workers(_):
+    """
+    Returns the number of workers of the tiled engine's default executor, in a worker process.
+    """
+    return _get_default_executor().max_workers
+
+class TestTileEngine(unittest.TestCase):
+    """
+    Unit tests for the sharded multi-car engine.
+    """
+
+    def setUp(self):
+        """
+        Set up an executor running the tiles in-process.
+        """
+        self.executor = SimulationExecutor(max_workers=4, chunk_size=1)
+
+    def run_both_engines(self, width, height, cars, obstacles=None, tiles=(2, 2), epoch_steps=4):
+        """
+        Helper function to run a scenario on the python and tiled engines and return both outputs,
+        along with the final states when there is no collision.
+        """
+        results = []
+        for engine in ('python', 'tiled'):
+            field = Field(width, height, obstacles)
+            cars_with_commands = [(Car(x, y, direction, car_id), commands) for car_id, x, y, direction, commands in cars]
+            if engine == 'python':
+                output = field.simulate_multiple_cars(cars_with_commands)
+            else:
+                output = simulate_multiple_cars(field, cars_with_commands, executor=self.executor, tiles=tiles,
+                                                epoch_steps=epoch_steps)
+            if output == "no collision":
+                positions = [car.get_position_with_id() for car, _ in cars_with_commands]
+                results.append((output, positions, field.occupied_positions))
+            else:
+                results.append(output)
+        return results
+
+    def test_sample_scenario(self):
+        """
+        Test the tiled engine with the sample Part 2 scenario.
+        """
+        field = Field(10, 10)
+        result = field.simulate_multiple_cars([
+            (Car(1, 2, 'N', 'A'), "FFRFFFFRRL"),
+            (Car(7, 8, 'W', 'B'), "FFLFFFFFFF")
+        ], engine='tiled')
+        self.assertEqual(result, "A B\n5 4\n7")
+
+    def test_order_dependent_rules_across_tile_edges(self):
+        """
+        Test the processing order, parked cars and cars that have not moved yet on a tile edge.
+        """
+        scenarios = [
+            [('A', 2, 1, 'E', 'F'), ('B', 1, 1, 'E', 'F')],
+            [('B', 1, 1, 'E', 'F'), ('A', 2, 1, 'E', 'FF')],
+            [('A', 2, 3, 'N', 'F'), ('B', 2, 1, 'N', 'FFF')],
+            [('A', 2, 3, 'N', ''), ('B', 2, 1, 'N', 'FFF')],
+            [('A', 2, 2, 'N', 'L'), ('B', 2, 2, 'N', 'R')],
+            # Two collisions in the same step on different tiles: the first car to move wins
+            [('C', 0, 0, 'E', 'F'), ('D', 1, 0, 'N', 'L'), ('A', 4, 4, 'W', 'F'), ('B', 3, 4, 'N', 'L')],
+        ]
+        for cars in scenarios:
+            python_result, tiled_result = self.run_both_engines(5, 5, cars)
+            self.assertEqual(tiled_result, python_result, cars)
+
+    def test_matches_python_engine(self):
+        """
+        Test that the tiled engine matches the loop-based engine on random fleets, tile grids and epochs,
+        including cars off the field and fields with obstacles.
+        """
+        rng = random.Random(20)
+        for trial in range(300):
+            width, height = rng.choice([(rng.randint(1, 8), rng.randint(1, 8)), (40, 40)])
+            obstacles = None
+            if trial % 4 == 0:
+                obstacles = ObstacleMap.from_cells(width, height, [(rng.randrange(width), rng.randrange(height))
+                                                                    for _ in range(3)])
+            cars = []
+            for number in range(rng.randint(2, 12)):
+                commands = ''.join(rng.choice('FFFFLR') for _ in range(rng.randint(0, 100)))
+                cars.append((f"C{number}", rng.randint(0, width), rng.randint(0, height), rng.choice('NESW'), commands))
+            tiles = (rng.randint(1, 4), rng.randint(1, 4))
+            python_result, tiled_result = self.run_both_engines(width, height, cars, obstacles, tiles,
+                                                                rng.choice([1, 3, 64]))
+            self.assertEqual(tiled_result, python_result, (cars, tiles))
+
+    def test_worker_pool(self):
+        """
+        Test a fleet whose tiles are simulated in worker processes.
+        """
+        executor = SimulationExecutor(max_workers=2, chunk_size=1, inline_threshold=0)
+        try:
+            fleet = CarFleet()
+            for number in range(40):
+                fleet.add(number, 0, 'N', f"N{number}", 'F' * 60)
+            fleet.add(0, 99, 'E', 'A', 'F' * 70)
+            fleet.add(99, 99, 'W', 'B', 'F' * 70)
+            output = simulate_multiple_cars(Field(100, 100), fleet, executor=executor, tiles=(3, 2), epoch_steps=16)
+            self.assertEqual(output, "A B\n50 99\n50")
+            self.assertIsNotNone(executor._pool)
+        finally:
+            executor.shutdown()
+
+    def test_no_nested_pools(self):
+        """
+        Test that tiled simulations run in a worker process use a single in-process tile.
+        """
+        executor = SimulationExecutor(max_workers=1, chunk_size=1, inline_threshold=0)
+        try:
+            self.assertEqual(executor.map(default_executor_workers, [None]), [1])
+            scenario = parse_part2("10 10\n\nA\n1 2 N\nFFRFFFFRRL\n\nB\n7 8 W\nFFLFFFFFFF")
+            self.assertEqual(executor.map(simulate_batch_item, [(scenario, 'tiled')]), [('result', "A B\n5 4\n7")])
+        finally:
+            executor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import random
+import unittest
+from src.car import Car
+from src.field import Field
+from src.fleet import CarFleet
+from src.trajectory import TrajectoryRecorder
+
+class TestTrajectory(unittest.TestCase):
+    """
+    Unit tests for trajectory recording and retrieval.
+    """
+
+    def reference_states(self, x, y, direction, commands, field):
+        """
+        Helper function to compute every state of a car by executing one command at a time.
+        """
+        car = Car(x, y, direction)
+        states = [(0, car.x, car.y, car.direction)]
+        for step, command in enumerate(commands, 1):
+            car.execute_commands(command, field)
+            states.append((step, car.x, car.y, car.direction))
+        return states
+
+    def test_record_single_car(self):
+        """
+        Test that the recorded track replays every state of the car.
+        """
+        field = Field(10, 10)
+        recorder = TrajectoryRecorder()
+        car = Car(1, 2, 'N')
+        car.execute_commands("FFRFFFRRLF", field, recorder=recorder)
+        self.assertEqual(car.get_position(), "4 3 S")
+
+        track = recorder.tracks[None]
+        self.assertEqual(len(track), 10)
+        self.assertEqual(list(track.states()), self.reference_states(1, 2, 'N', "FFRFFFRRLF", field))
+        self.assertEqual(track.state_at(3), (1, 4, 'E'))
+
+    def test_ranges_and_downsampling_with_keyframes(self):
+        """
+        Test step ranges and downsampled views across keyframes.
+        """
+        rng = random.Random(5)
+        field = Field(6, 6)
+        commands = ''.join(rng.choice('FFFLR') for _ in range(500))
+        expected = self.reference_states(2, 3, 'E', commands, field)
+
+        recorder = TrajectoryRecorder(keyframe_interval=16)
+        Car(2, 3, 'E').execute_commands(commands, field, recorder=recorder)
+        track = recorder.tracks[None]
+        self.assertEqual(len(track.keyframes), 2 * (1 + 500 // 16))
+
+        self.assertEqual(list(track.states(100, 140)), expected[100:140])
+        self.assertEqual(list(track.states(7, 300, 5)), expected[7:300:5])
+        self.assertEqual(list(track.states(3, None, 50)), expected[3::50])
+        self.assertEqual(list(track.states(495, 1000)), expected[495:])
+        self.assertEqual(list(track.states(600)), [])
+        for step in (0, 15, 16, 17, 333, 500):
+            self.assertEqual(track.state_at(step), expected[step][1:])
+        with self.assertRaises(IndexError):
+            track.state_at(501)
+
+    def test_record_multiple_cars(self):
+        """
+        Test recording a multi-car simulation, with cars and with a fleet.
+        """
+        cars = [(Car(1, 2, 'N', 'A'), "FFRFFFFRRL"), (Car(7, 8, 'W', 'B'), "FFLFFFFFFF")]
+        fleet = CarFleet.from_cars(cars)
+
+        recorder = TrajectoryRecorder()
+        self.assertEqual(Field(10, 10).simulate_multiple_cars(cars, recorder=recorder), "A B\n5 4\n7")
+        fleet_recorder = TrajectoryRecorder()
+        self.assertEqual(Field(10, 10).simulate_multiple_cars(fleet, recorder=fleet_recorder), "A B\n5 4\n7")
+
+        for current in (recorder, fleet_recorder):
+            self.assertEqual(list(current.tracks), ['A', 'B'])
+            self.assertEqual(len(current.tracks['A']), 7)
+            self.assertEqual(len(current.tracks['B']), 7)
+            self.assertEqual(current.tracks['A'].state_at(7), (5, 4, 'E'))
+            self.assertEqual(current.tracks['B'].state_at(7), (5, 4, 'S'))
+
+    def test_recording_requires_python_engine(self):
+        """
+        Test that recording is rejected by the vectorized engine.
+        """
+        with self.assertRaises(ValueError):
+            Field(10, 10).simulate_multiple_cars([(Car(1, 2, 'N', 'A'), "F")], engine='numpy',
+                                                 recorder=TrajectoryRecorder())
+
+if __name__ == '__main__':
+    unittest.main()
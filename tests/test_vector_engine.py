@@ -0,0 +1,77 @@
+import random
+import unittest
+from src.car import Car
+from src.field import Field
+
+class TestVectorEngine(unittest.TestCase):
+    """
+    Unit tests for the vectorized multi-car engine.
+    """
+
+    def run_both_engines(self, width, height, cars):
+        """
+        Helper function to run a scenario on both engines and return both results and final states.
+        """
+        results = []
+        for engine in ('python', 'numpy'):
+            field = Field(width, height)
+            cars_with_commands = [(Car(x, y, direction, car_id), commands) for car_id, x, y, direction, commands in cars]
+            output = field.simulate_multiple_cars(cars_with_commands, engine=engine)
+            positions = [car.get_position_with_id() for car, _ in cars_with_commands]
+            results.append((output, positions, field.occupied_positions))
+        return results
+
+    def test_sample_scenario(self):
+        """
+        Test the numpy engine with the sample Part 2 scenario.
+        """
+        field = Field(10, 10)
+        result = field.simulate_multiple_cars([
+            (Car(1, 2, 'N', 'A'), "FFRFFFFRRL"),
+            (Car(7, 8, 'W', 'B'), "FFLFFFFFFF")
+        ], engine='numpy')
+        self.assertEqual(result, "A B\n5 4\n7")
+
+    def test_order_dependent_rules(self):
+        """
+        Test the processing order, parked cars and cars that have not moved yet.
+        """
+        scenarios = [
+            # B moves onto A's old position after A has moved away: no collision
+            [('A', 1, 1, 'E', 'F'), ('B', 0, 1, 'E', 'F')],
+            # B moves onto A's position before A moves away: collision
+            [('B', 0, 1, 'E', 'F'), ('A', 1, 1, 'E', 'FF')],
+            # A's commands ran out, B drives into the parked car
+            [('A', 2, 2, 'N', 'F'), ('B', 2, 0, 'N', 'FFF')],
+            # A car without commands never occupies its position
+            [('A', 2, 2, 'N', ''), ('B', 2, 0, 'N', 'FFF')],
+            # Cars starting on the same position collide at the first step
+            [('A', 2, 2, 'N', 'L'), ('B', 2, 2, 'N', 'R')],
+        ]
+        for cars in scenarios:
+            python_result, numpy_result = self.run_both_engines(5, 5, cars)
+            self.assertEqual(numpy_result, python_result, cars)
+
+    def test_matches_python_engine(self):
+        """
+        Test that the numpy engine matches the loop-based engine on random dense fleets.
+        """
+        rng = random.Random(11)
+        for _ in range(300):
+            width, height = rng.randint(1, 6), rng.randint(1, 6)
+            cars = []
+            for number in range(rng.randint(2, 8)):
+                commands = ''.join(rng.choice('FFFLR') for _ in range(rng.randint(0, 25)))
+                cars.append((f"C{number}", rng.randint(0, width), rng.randint(0, height), rng.choice('NESW'), commands))
+            python_result, numpy_result = self.run_both_engines(width, height, cars)
+            self.assertEqual(numpy_result, python_result, cars)
+
+    def test_unknown_engine(self):
+        """
+        Test that an unknown engine name is rejected.
+        """
+        with self.assertRaises(ValueError):
+            Field(10, 10).simulate_multiple_cars([(Car(1, 2, 'N', 'A'), "F")], engine='fortran')
+
+if __name__ == '__main__':
+    unittest.main()
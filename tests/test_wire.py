@@ -0,0 +1,123 @@
+import io
+import random
+import unittest
+from app import app
+from src.parser import InputError, parse_part1, parse_part2
+from src.wire import (CAR_RECORD, REQUEST_HEADER, RESULT_COLLISION, RESULT_ERROR, encode_scenario, format_result,
+                      iter_results, pack_commands, read_scenarios, unpack_commands)
+
+class TestWireFormat(unittest.TestCase):
+    """
+    Unit tests for the binary wire format and the binary endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up the test client.
+        """
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def post_binary(self, endpoint, body):
+        """
+        Helper function to post a binary body and return the decoded result records.
+        """
+        response = self.app.post(endpoint, data=body, content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/octet-stream')
+        return list(iter_results(response.data))
+
+    def test_pack_commands(self):
+        """
+        Test that commands pack 2 bits per command and unpack to the same string.
+        """
+        self.assertEqual(pack_commands("FLRF" + "RR"), bytes([0b00100100, 0b1010]))
+        for length in range(0, 13):
+            commands = ''.join(random.choice('FLR') for _ in range(length))
+            packed = pack_commands(commands)
+            self.assertEqual(len(packed), (length + 3) // 4)
+            self.assertEqual(unpack_commands(packed, length), commands)
+        self.assertEqual(unpack_commands(b'\xff', 2), "XX")
+
+    def test_scenarios_round_trip(self):
+        """
+        Test that encoded scenarios decode to the scenarios the text parser gives.
+        """
+        scenarios = [
+            parse_part2("10 10\nA\n1 2 N\nFFRFFFFRRL\ncar two\n7 8 W\nFFLFFFFFFF"),
+            parse_part2("5 7\nA\n0 0 E\nL\nB\n4 6 S\nR"),
+        ]
+        stream = io.BytesIO(b''.join(encode_scenario(scenario) for scenario in scenarios))
+        self.assertEqual(list(read_scenarios(stream, 2)), scenarios)
+
+        scenario = parse_part1("10 10\n1 2 N\nFFRFFFRRLF")
+        self.assertEqual(list(read_scenarios(io.BytesIO(encode_scenario(scenario)), 1)), [scenario])
+
+    def test_matches_text_api(self):
+        """
+        Test that the binary endpoints give the same results as the text endpoints on random scenarios.
+        """
+        rng = random.Random(23)
+        for part in (1, 2):
+            texts, frames, identifiers = [], [], []
+            for _ in range(30):
+                lines = [f"{rng.randint(1, 12)} {rng.randint(1, 12)}"]
+                for number in range(1 if part == 1 else rng.randint(2, 5)):
+                    if part == 2:
+                        lines.append(f"C{number}")
+                    lines.append(f"{rng.randint(0, 12)} {rng.randint(0, 12)} {rng.choice('NESW')}")
+                    lines.append(''.join(rng.choice('FFFLR') for _ in range(rng.randint(1, 40))))
+                text = '\n'.join(lines)
+                scenario = parse_part1(text) if part == 1 else parse_part2(text)
+                texts.append(text)
+                frames.append(encode_scenario(scenario))
+                identifiers.append([car_id for car_id, *_ in scenario.cars] if part == 2 else [])
+
+            results = self.post_binary(f'/simulate_part{part}/binary', b''.join(frames))
+            for text, result, car_ids in zip(texts, results, identifiers):
+                expected = self.app.post(f'/simulate_part{part}', data={'input': text}).data.decode()
+                self.assertEqual(format_result(result, car_ids), expected, text)
+
+    def test_collision_result(self):
+        """
+        Test the packed collision record, with identifiers containing spaces.
+        """
+        scenario = parse_part2("10 10\nA\n1 2 N\nFFRFFFFRRL\ncar B\n7 8 W\nFFLFFFFFFF")
+        result, = self.post_binary('/simulate_part2/binary?engine=numpy', encode_scenario(scenario))
+        self.assertEqual(result[:7], (RESULT_COLLISION, 0, 5, 4, 7, 0, 1))
+        self.assertEqual(format_result(result, ['A', 'car B']), "A car B\n5 4\n7")
+
+    def test_errors(self):
+        """
+        Test that invalid frames are reported with the text API's messages, and truncated ones end the body.
+        """
+        valid = encode_scenario(parse_part1("10 10\n1 2 N\nF"))
+        bad_direction = bytearray(valid)
+        bad_direction[REQUEST_HEADER.size + 8] = 7
+        bad_commands = valid[:-1] + b'\x03'
+        one_car = encode_scenario(parse_part2("5 5\nA\n1 1 N\nF\nB\n2 2 N\nF"))
+        one_car = (REQUEST_HEADER.pack(b'ADC1', 2, 5, 5, 1) + one_car[REQUEST_HEADER.size:][:CAR_RECORD.size]
+                   + b'A' + b'\x00')
+
+        results = self.post_binary('/simulate_part1/binary', b''.join([bytes(bad_direction), bad_commands,
+                                                                          one_car, valid, valid[:-3]]))
+        self.assertEqual([format_result(result) for result in results], [
+            "Error: Initial direction must be one of 'N', 'E', 'S', or 'W'.",
+            "Error: Commands must be a sequence of 'R', 'L', and 'F' only.",
+            "Error: Expected a Part 1 request frame.",
+            "1 3 N",
+            "Error: Truncated request frame.",
+        ])
+        self.assertEqual(results[0][0], RESULT_ERROR)
+
+        results = self.post_binary('/simulate_part2/binary', one_car + b'nope' + bytes(16))
+        self.assertEqual([format_result(result) for result in results], [
+            "Error: Invalid input format. Please provide field size and details for each car.",
+            "Error: Invalid request frame.",
+        ])
+        with self.assertRaises(StopIteration):
+            next(read_scenarios(io.BytesIO(b''), 1))
+        self.assertIsInstance(next(read_scenarios(io.BytesIO(b'ADC'), 1)), InputError)
+
+if __name__ == '__main__':
+    unittest.main()